@@ -1,5 +1,61 @@
+from django import forms
 from django.contrib import admin
-from .models import Hotel, Room, Reservation
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Hotel, Room, Reservation, ArchivedReservation, Review, WaitlistEntry, Job
+from .jobs import enqueue
+from .tasks import send_booking_confirmation
+from .images import queue_thumbnails
+from .inventory import SoldOut, move, rebuild
+
+def estimate_row_count(model, using='default'):
+    """Return the planner's row estimate for a table, or None if unavailable."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table]),
+        'mysql': ('SELECT table_rows FROM information_schema.tables '
+                  'WHERE table_schema = DATABASE() AND table_name = %s', [table]),
+        # Filled in by ANALYZE; the first number of "stat" is the row count
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Skip COUNT(*) on unfiltered changelists of big tables and use the
+    database's row estimate instead. Filtered lists are still counted exactly.
+    """
+    # Below this many rows an exact count is cheap enough
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+def bump_version(obj, change):
+    """Invalidate API ETags for objects edited through the admin."""
+    if change:
+        obj.version += 1
 
 # Inline for managing rooms within hotel admin
 class RoomInline(admin.TabularInline):
@@ -9,25 +65,170 @@ class RoomInline(admin.TabularInline):
 
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
-    list_display = ('name', 'address', 'rating', 'room_count')
+    list_display = ('name', 'address', 'rating', 'review_average', 'review_count', 'room_count')
     list_filter = ('rating',)
     search_fields = ('name', 'address')
     inlines = [RoomInline]
+    exclude = ('thumbnails',)
+
+    def get_queryset(self, request):
+        # One grouped query instead of a COUNT per row
+        return super().get_queryset(request).annotate(room_total=Count('rooms'))
+
+    def save_model(self, request, obj, form, change):
+        bump_version(obj, change)
+        super().save_model(request, obj, form, change)
+        if 'photo' in form.changed_data:
+            queue_thumbnails(obj)
+        if 'inventory_by_type' in form.changed_data and obj.inventory_by_type:
+            rebuild(obj)
     
+    def save_formset(self, request, form, formset, change):
+        rooms = formset.save(commit=False)
+        for room in rooms:
+            bump_version(room, room.pk is not None)
+            room.save()
+        for room in formset.deleted_objects:
+            room.delete()
+        formset.save_m2m()
+
+    @admin.display(description='Number of Rooms', ordering='room_total')
     def room_count(self, obj):
-        return obj.rooms.count()
-    room_count.short_description = 'Number of Rooms'
+        return obj.room_total
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     list_display = ('room_number', 'hotel', 'room_type', 'price_per_night', 'capacity')
-    list_filter = ('room_type', 'hotel')
-    search_fields = ('room_number', 'hotel__name')
+    # No hotel sidebar filter: it would list every hotel. Search by hotel
+    # name instead, or filter with ?hotel__id__exact=<id>.
+    list_filter = ('room_type',)
+    search_fields = ('=room_number', '^hotel__name')
+    autocomplete_fields = ('hotel',)
+    list_select_related = ('hotel',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # __str__ uses hotel.name, e.g. in autocomplete results
+        return super().get_queryset(request).select_related('hotel')
+
+    def save_model(self, request, obj, form, change):
+        bump_version(obj, change)
+        super().save_model(request, obj, form, change)
+
+class ReservationAdminForm(forms.ModelForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        room, check_in, check_out = (cleaned_data.get(name) for name in ('room', 'check_in', 'check_out'))
+        if room is not None:
+            hotel, room_type = room.hotel, room.room_type
+        else:
+            hotel, room_type = cleaned_data.get('hotel'), cleaned_data.get('room_type')
+        if hotel is None or not room_type or not check_in or not check_out or check_in >= check_out:
+            return cleaned_data
+        try:
+            # A dry run for the error message; save_model claims for real
+            with transaction.atomic():
+                move(self.stored(), hotel, room_type, check_in, check_out)
+                transaction.set_rollback(True)
+        except SoldOut as exc:
+            raise forms.ValidationError(str(exc))
+        return cleaned_data
+
+    def stored(self):
+        if self.instance.pk is None:
+            return None
+        return Reservation.objects.select_related('hotel').get(pk=self.instance.pk)
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'room', 'check_in', 'check_out', 'created_at')
-    list_filter = ('check_in', 'check_out', 'created_at')
-    search_fields = ('user__username', 'room__room_number')
-    date_hierarchy = 'created_at'
+    form = ReservationAdminForm
+    list_display = ('id', 'user', 'hotel', 'room_type', 'room', 'check_in', 'check_out', 'created_at')
+    # Both filters are backed by indexes; date_hierarchy is not used because
+    # building its year/month links scans the whole table.
+    list_filter = ('check_in', 'created_at')
+    search_fields = ('=id', '^user__username', '=room__room_number')
+    ordering = ('-id',)
+    autocomplete_fields = ('user', 'hotel', 'room')
+    raw_id_fields = ('itinerary',)
+    list_select_related = ('user', 'hotel', 'room__hotel')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['resend_confirmation']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'hotel', 'room__hotel')
+
+    def save_model(self, request, obj, form, change):
+        # Counters move with the reservation, as in the API; deletes give
+        # them back through the inventory's post_delete receiver.
+        with transaction.atomic():
+            old = form.stored()
+            super().save_model(request, obj, form, change)
+            move(old, obj.hotel, obj.room_type, obj.check_in, obj.check_out)
+
+    @admin.action(description='Queue confirmation email')
+    def resend_confirmation(self, request, queryset):
+        for reservation_id in queryset.values_list('id', flat=True):
+            enqueue(send_booking_confirmation, reservation_id=reservation_id)
+        self.message_user(request, 'Confirmation emails queued.')
+
+@admin.register(ArchivedReservation)
+class ArchivedReservationAdmin(admin.ModelAdmin):
+    list_display = ('original_id', 'user', 'hotel_name', 'room_number', 'check_in', 'check_out', 'archived_at')
+    search_fields = ('=original_id', '^user__username', '^hotel_name')
+    list_select_related = ('user',)
+    ordering = ('-original_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ('id', 'hotel', 'user', 'rating', 'created_at')
+    list_filter = ('rating',)
+    search_fields = ('^hotel__name', '^user__username')
+    list_select_related = ('hotel', 'user')
+    raw_id_fields = ('reservation',)
+    autocomplete_fields = ('hotel', 'user')
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Hotel averages are kept by the API (api/reviews.py); deleting here is fine
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'hotel', 'room', 'check_in', 'check_out', 'status', 'created_at')
+    list_filter = ('status',)
+    list_select_related = ('user', 'hotel', 'room__hotel')
+    search_fields = ('^user__username', '^hotel__name')
+    autocomplete_fields = ('user', 'hotel', 'room')
+    raw_id_fields = ('offered_room',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('name', '=key')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['retry']
 
+    @admin.action(description='Retry selected jobs')
+    def retry(self, request, queryset):
+        queryset.update(status='PENDING', attempts=0, run_at=timezone.now())
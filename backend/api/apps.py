@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import changes, concurrency, inventory, pricing, reviews
+        changes.connect_signals()
+        concurrency.connect_signals()
+        inventory.connect_signals()
+        pricing.connect_signals()
+        reviews.connect_signals()
@@ -0,0 +1,129 @@
+"""
+Move finished stays out of the hot ``Reservation`` table.
+
+Overlap checks and history queries only ever need recent and upcoming
+reservations, so anything that checked out more than
+``RESERVATION_ARCHIVE_AFTER_DAYS`` ago is copied into
+``ArchivedReservation`` and deleted, one batch per transaction. Run it with
+``python manage.py archive_reservations``.
+
+Archiving is not a cancellation: the deletes it makes are left out of the
+change log and the live stream, and don't release inventory or reprice
+nights, all of which are in the past anyway. The receivers check
+``is_archiving()`` for this.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedReservation, Reservation
+
+_state = threading.local()
+
+HISTORY_FIELDS = ('id', 'user_id', 'room_id', 'hotel_id', 'room_number', 'hotel_name',
+                  'check_in', 'check_out', 'created_at', 'archived')
+
+
+@contextmanager
+def archiving():
+    """Mark reservations deleted in this block, on this thread, as archived."""
+    previous = is_archiving()
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def is_archiving():
+    return getattr(_state, 'active', False)
+
+
+def archive_cutoff(today=None):
+    """Reservations with ``check_out`` before this date are archived."""
+    days = getattr(settings, 'RESERVATION_ARCHIVE_AFTER_DAYS', 365)
+    return (today or timezone.localdate()) - timedelta(days=days)
+
+
+def _archivable(cutoff):
+    # check_in < check_out, so bounding check_in as well lets the check_in
+    # index serve the scan instead of reading the whole table
+    return Reservation.objects.filter(check_in__lt=cutoff, check_out__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """Archive up to ``batch_size`` reservations in one transaction; return how many."""
+    with transaction.atomic(), archiving():
+        reservations = list(
+            _archivable(cutoff).select_related('room', 'hotel').select_for_update(of=('self',))
+            .order_by('id')[:batch_size]
+        )
+        if not reservations:
+            return 0
+        ArchivedReservation.objects.bulk_create([
+            ArchivedReservation(
+                original_id=r.id,
+                user_id=r.user_id,
+                room_id=r.room_id,
+                hotel_id=r.hotel_id,
+                itinerary_id=r.itinerary_id,
+                # Room-type bookings that never got a room have no number
+                room_number=r.room.room_number if r.room else '',
+                hotel_name=r.hotel.name,
+                check_in=r.check_in,
+                check_out=r.check_out,
+                created_at=r.created_at,
+            )
+            for r in reservations
+        ], ignore_conflicts=True)
+        Reservation.objects.filter(id__in=[r.id for r in reservations]).delete()
+    return len(reservations)
+
+
+def check_cutoff(cutoff, force=False):
+    """
+    Refuse cutoffs that would archive stays still needed by overlap checks:
+    anything after today, and without ``force`` anything after the horizon.
+    """
+    today = timezone.localdate()
+    if cutoff > today:
+        raise ValueError(f'Cannot archive stays that have not checked out yet (cutoff {cutoff} is after today).')
+    if cutoff > archive_cutoff(today) and not force:
+        raise ValueError(f'Cutoff {cutoff} is after the archive horizon {archive_cutoff(today)}; '
+                         f'pass force to archive more recent stays.')
+
+
+def archive_reservations(cutoff=None, batch_size=1000, force=False):
+    """Archive every reservation that checked out before ``cutoff``; return how many."""
+    cutoff = cutoff or archive_cutoff()
+    check_cutoff(cutoff, force)
+    archived = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return archived
+        archived += moved
+
+
+def stay_history(**filters):
+    """
+    Live and archived stays as one ``values_list()`` queryset (a UNION ALL)
+    for reports that need the full history. Rows are tuples in
+    ``HISTORY_FIELDS`` order. ``filters`` apply to both tables, so they may
+    only use fields the two share, e.g. ``stay_history(user=user, check_in__gte=start)``.
+    """
+    live = Reservation.objects.filter(**filters).values_list(
+        'id', 'user_id', 'room_id', 'hotel_id', Coalesce('room__room_number', Value('')),
+        F('hotel__name'), 'check_in', 'check_out', 'created_at', Value(False),
+    )
+    archived = ArchivedReservation.objects.filter(**filters).values_list(
+        'original_id', 'user_id', 'room_id', 'hotel_id', 'room_number',
+        'hotel_name', 'check_in', 'check_out', 'created_at', Value(True),
+    )
+    return live.union(archived, all=True)
@@ -0,0 +1,153 @@
+"""
+Re-shuffle room assignments within a hotel so free nights stay together.
+
+A stay can go to any room of its type, and which one it gets decides
+whether the nights left over form long runs, sellable to long stays, or
+are scattered a night here and two there. ``plan_assignment`` replays a
+hotel's upcoming stays in check-in order (interval partitioning) and gives
+each the room of its type that became free most recently (best fit). That
+packs stays back to back and keeps the other rooms empty for as long as
+possible. In check-in order every stay finds a room whenever no night is
+sold beyond the rooms there are, so room-type bookings still waiting for a
+room are placed as well.
+
+Guests already in house on ``start`` keep their rooms, as do stays put in a
+room of another type (upgrades). A room type sold beyond its rooms is left
+as it is. ``python manage.py optimize_rooms`` prints the plans of all
+hotels, then applies them together in one transaction.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .changes import record_changes
+from .models import Change, Reservation, Room
+
+FIELDS = ('id', 'room_id', 'hotel_id', 'room_type', 'check_in', 'check_out')
+
+
+def _load(hotel, start, lock=False):
+    reservations = Reservation.objects.filter(hotel=hotel, check_out__gt=start)
+    if lock:
+        reservations = reservations.select_for_update()
+    stays = [dict(zip(FIELDS, row)) for row in reservations.order_by('check_in', 'id').values_list(*FIELDS)]
+    rooms = list(Room.objects.filter(hotel=hotel).order_by('room_number').values_list('id', 'room_number', 'room_type'))
+    return stays, rooms
+
+
+def fragmentation(stays, rooms, start):
+    """
+    Free runs of nights between ``start`` and the last checkout, over all
+    rooms: ``{'free_runs': count, 'longest_free_run': nights}``.
+    """
+    end = max((stay['check_out'] for stay in stays), default=start)
+    busy = defaultdict(list)
+    for stay in stays:
+        if stay['room_id'] is not None:
+            busy[stay['room_id']].append((stay['check_in'], stay['check_out']))
+    runs, longest = 0, 0
+    for room_id, _, _ in rooms:
+        free_from = start
+        for check_in, check_out in sorted(busy[room_id]) + [(end, end)]:
+            if check_in > free_from:
+                runs += 1
+                longest = max(longest, (check_in - free_from).days)
+            free_from = max(free_from, check_out)
+    return {'free_runs': runs, 'longest_free_run': longest}
+
+
+def _place(stays, room_ids, blocks, start):
+    """New room per stay for one room type, or None if the type is overbooked."""
+    free_from = dict.fromkeys(room_ids, start)
+    blocked = {room_id: blocks[room_id] for room_id in room_ids if blocks.get(room_id)}
+    placed = {}
+    for stay in stays:
+        best, best_from = None, None
+        for room_id in room_ids:
+            room_from = free_from[room_id]
+            if room_from > stay['check_in']:
+                continue
+            if room_id in blocked:
+                if any(check_in < stay['check_out'] and check_out > stay['check_in']
+                       for check_in, check_out in blocked[room_id]):
+                    continue
+                room_from = max([room_from] + [check_out for _, check_out in blocked[room_id]
+                                               if check_out <= stay['check_in']])
+            # Latest free wins; on a tie keep the stay where it is
+            if (best is None or room_from > best_from
+                    or room_from == best_from and room_id == stay['room_id']):
+                best, best_from = room_id, room_from
+        if best is None:
+            return None
+        placed[stay['id']] = best
+        free_from[best] = stay['check_out']
+    return placed
+
+
+def plan_assignment(hotel, start, stays=None, rooms=None):
+    """
+    Work out better rooms for the stays of ``hotel`` checking in on or
+    after ``start``. Returns ``(moves, before, after)``: ``moves`` lists
+    ``(stay, new_room_id)`` for stays whose room changes, ``before`` and
+    ``after`` are ``fragmentation()`` of the current and planned rooms.
+    """
+    if stays is None:
+        stays, rooms = _load(hotel, start)
+    room_type = {room_id: kind for room_id, _, kind in rooms}
+    blocks = defaultdict(list)
+    movable = defaultdict(list)
+    for stay in stays:
+        if stay['check_in'] < start or (stay['room_id'] is not None
+                                        and room_type.get(stay['room_id']) != stay['room_type']):
+            blocks[stay['room_id']].append((stay['check_in'], stay['check_out']))
+        else:
+            movable[stay['room_type']].append(stay)
+
+    moves = []
+    planned = {}
+    for kind, kind_stays in movable.items():
+        room_ids = [room_id for room_id, _, other in rooms if other == kind]
+        placed = _place(kind_stays, room_ids, blocks, start)
+        if placed is None:
+            continue
+        for stay in kind_stays:
+            if placed[stay['id']] != stay['room_id']:
+                moves.append((stay, placed[stay['id']]))
+            planned[stay['id']] = placed[stay['id']]
+
+    after = [dict(stay, room_id=planned.get(stay['id'], stay['room_id'])) for stay in stays]
+    return moves, fragmentation(stays, rooms, start), fragmentation(after, rooms, start)
+
+
+def apply_moves(moves, batch_size=1000):
+    """Give each stay in ``moves`` its new room; call with the stays locked."""
+    if not moves:
+        return
+    # Rooms are swapped between stays, so empty them all first: the
+    # PostgreSQL no-overlap constraint is checked row by row
+    ids = [stay['id'] for stay, _ in moves]
+    for i in range(0, len(ids), batch_size):
+        Reservation.objects.filter(id__in=ids[i:i + batch_size]).update(room=None)
+    # One UPDATE per room rather than a CASE over every moved stay
+    by_room = defaultdict(list)
+    for stay, room_id in moves:
+        by_room[room_id].append(stay['id'])
+    for room_id, stay_ids in by_room.items():
+        for i in range(0, len(stay_ids), batch_size):
+            Reservation.objects.filter(id__in=stay_ids[i:i + batch_size]).update(room_id=room_id)
+    # update() sends no post_save
+    record_changes([Reservation(**dict(stay, room_id=room_id)) for stay, room_id in moves], Change.UPDATE)
+
+
+@transaction.atomic
+def optimize_rooms(hotel, start, apply=True, batch_size=1000):
+    """
+    Plan with the hotel's stays locked and, if ``apply``, move them all in
+    this one transaction. Returns what ``plan_assignment`` returned. Called
+    inside an outer transaction, the locks are held until it ends.
+    """
+    stays, rooms = _load(hotel, start, lock=True)
+    moves, before, after = plan_assignment(hotel, start, stays, rooms)
+    if apply:
+        apply_moves(moves, batch_size)
+    return moves, before, after
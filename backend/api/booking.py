@@ -0,0 +1,92 @@
+"""
+All-or-nothing booking of multi-room itineraries.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from .changes import record_changes
+from .inventory import SoldOut, claim
+from .pricing import touch
+from .models import Change, Itinerary, Reservation, Room
+
+
+@transaction.atomic
+def book_itinerary(user, segments):
+    """
+    Book every ``{'room', 'check_in', 'check_out'}`` segment or none of them.
+
+    Rooms are locked in primary key order, so two itineraries sharing rooms
+    always acquire their locks in the same order and cannot deadlock. All
+    segments are checked against existing bookings with a single overlap
+    query, then inserted together. On PostgreSQL the api_res_no_overlap
+    exclusion constraint already rejects overlaps, so that query is skipped
+    and constraint violations are reported instead. Segments in hotels that
+    sell by room type also take their nights from the type's inventory.
+    """
+    room_ids = sorted({segment['room'].pk for segment in segments})
+    rooms = {
+        room.pk: room
+        for room in Room.objects.select_for_update(of=('self',)).filter(pk__in=room_ids)
+        .select_related('hotel').order_by('pk')
+    }
+
+    # Segments of the same itinerary must not collide with each other either
+    for i, segment in enumerate(segments):
+        for other in segments[:i]:
+            if (segment['room'].pk == other['room'].pk
+                    and segment['check_in'] < other['check_out']
+                    and segment['check_out'] > other['check_in']):
+                raise serializers.ValidationError(
+                    f"Segment {i + 1}: overlaps another segment for the same room."
+                )
+
+    clashes = []
+    if connection.vendor != 'postgresql':
+        overlap = reduce(or_, (
+            Q(room=segment['room'], check_in__lt=segment['check_out'], check_out__gt=segment['check_in'])
+            for segment in segments
+        ))
+        clashes = list(Reservation.objects.filter(overlap).values_list('room_id', 'check_in', 'check_out'))
+    for i, segment in enumerate(segments):
+        for room_id, check_in, check_out in clashes:
+            if (room_id == segment['room'].pk
+                    and check_in < segment['check_out']
+                    and check_out > segment['check_in']):
+                raise serializers.ValidationError(
+                    f"Segment {i + 1}: Room is already booked for these dates."
+                )
+
+    # Counter rows are locked in one global order, like the rooms above, so
+    # two itineraries over the same nights can't deadlock each other
+    def claim_order(item):
+        room = rooms[item[1]['room'].pk]
+        return room.hotel_id, room.room_type, item[1]['check_in']
+
+    for i, segment in sorted(enumerate(segments), key=claim_order):
+        room = rooms[segment['room'].pk]
+        try:
+            claim(room.hotel, room.room_type, segment['check_in'], segment['check_out'])
+        except SoldOut as exc:
+            raise serializers.ValidationError(f"Segment {i + 1}: {exc}")
+
+    itinerary = Itinerary.objects.create(user=user)
+    try:
+        with transaction.atomic():
+            reservations = Reservation.objects.bulk_create([
+                Reservation(user=user, itinerary=itinerary, hotel_id=rooms[segment['room'].pk].hotel_id,
+                            room_type=rooms[segment['room'].pk].room_type, **segment)
+                for segment in segments
+            ])
+            # bulk_create sends no post_save
+            record_changes(reservations, Change.CREATE)
+            for reservation in reservations:
+                touch(reservation.hotel_id, reservation.room_type, reservation.check_in, reservation.check_out)
+    except IntegrityError as exc:
+        if 'api_res_' not in str(exc):
+            raise
+        raise serializers.ValidationError("A room in this itinerary is already booked for these dates.")
+    return itinerary
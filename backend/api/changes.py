@@ -0,0 +1,116 @@
+"""
+Append-only change log for incremental sync.
+
+Every create, update and delete of a ``Hotel``, ``Room`` or ``Reservation``
+appends a ``Change`` row in the same transaction, from the model signals
+below or explicitly where the ORM skips signals (``bulk_create`` and
+``update()``). ``GET /api/changes/?since=<cursor>`` returns what changed
+after the cursor, so clients no longer re-download whole lists.
+
+Reservations are logged as availability only (room and dates), never who
+booked them, and keep those for deletes so the freed nights are known.
+Finished stays moved out by api/archive.py are not logged.
+Committed reservation changes are also pushed to live subscribers, see
+api/live.py.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .archive import is_archiving
+from .models import Change, Hotel, Reservation, Room
+
+RESERVATION_FIELDS = ('id', 'room_id', 'hotel_id', 'room_type', 'check_in', 'check_out')
+
+
+def snapshot(instance):
+    """The stored state of ``instance`` as a JSON-ready dict."""
+    if isinstance(instance, Reservation):
+        fields = [instance._meta.get_field(name) for name in RESERVATION_FIELDS]
+    else:
+        fields = instance._meta.concrete_fields
+    data = {}
+    for field in fields:
+        value = field.value_from_object(instance)
+        if isinstance(value, FieldFile):
+            value = value.name or None
+        data[field.attname] = value
+    return data
+
+
+def _hotel_id(instance):
+    if isinstance(instance, Hotel):
+        return instance.pk
+    if isinstance(instance, Room) or instance.hotel_id is not None:
+        return instance.hotel_id
+    if Reservation.room.is_cached(instance):
+        return instance.room.hotel_id
+    return Room.objects.filter(pk=instance.room_id).values_list('hotel_id', flat=True).first()
+
+
+def record_changes(instances, action):
+    """Log ``action`` for each of ``instances``, which share one model."""
+    changes = Change.objects.bulk_create([
+        Change(
+            model=instance._meta.model_name,
+            object_id=instance.pk,
+            action=action,
+            hotel_id=_hotel_id(instance),
+            data=snapshot(instance) if action != Change.DELETE or isinstance(instance, Reservation) else None,
+        )
+        for instance in instances
+    ])
+    if changes and changes[0].model == 'reservation':
+        from .live import publish_changes
+        transaction.on_commit(lambda: publish_changes(changes))
+
+
+def changes_since(cursor, limit, hotel_id=None, model=None, settle_seconds=None):
+    """
+    Up to ``limit`` changes after ``cursor``, oldest first, plus whether more
+    are waiting, optionally only those touching one hotel or model. Changes
+    younger than ``settle_seconds`` (``CHANGE_FEED_SETTLE_SECONDS`` by
+    default) are held back: ids are handed out before commit, so a slow
+    transaction can still commit a lower id than one a client has already seen.
+    """
+    if settle_seconds is None:
+        settle_seconds = getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 1)
+    changes = Change.objects.filter(id__gt=cursor)
+    if settle_seconds:
+        changes = changes.filter(created_at__lte=timezone.now() - timedelta(seconds=settle_seconds))
+    if hotel_id is not None:
+        changes = changes.filter(hotel_id=hotel_id)
+    if model is not None:
+        changes = changes.filter(model=model)
+    rows = list(
+        changes.order_by('id')
+        .values('id', 'model', 'object_id', 'action', 'hotel_id', 'data', 'created_at')[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def compact(rows):
+    """Keep only the latest change per object, in log order."""
+    latest = {(row['model'], row['object_id']): row for row in rows}
+    return sorted(latest.values(), key=lambda row: row['id'])
+
+
+def _saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_changes([instance], Change.CREATE if created else Change.UPDATE)
+
+
+def _deleted(sender, instance, **kwargs):
+    if is_archiving():
+        return
+    record_changes([instance], Change.DELETE)
+
+
+def connect_signals():
+    for model in (Hotel, Room, Reservation):
+        post_save.connect(_saved, sender=model, dispatch_uid=f'changes-save-{model._meta.model_name}')
+        post_delete.connect(_deleted, sender=model, dispatch_uid=f'changes-delete-{model._meta.model_name}')
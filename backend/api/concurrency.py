@@ -0,0 +1,118 @@
+"""
+Optimistic concurrency for admin edits.
+
+Versioned models carry a ``version`` column that every update bumps. Detail
+responses send it as the ``ETag``; a client that sends it back in
+``If-Match`` only overwrites the row if nobody else changed it in the
+meantime, otherwise it gets 412 and can reload. The check is a conditional
+``UPDATE ... WHERE version = n``, so no row is locked while the client edits.
+
+A hotel's version also moves when anything else in its detail response
+does: its rooms (see ``connect_signals``), reviews, thumbnails and
+coordinates. Tonight's room prices change with every booking elsewhere in
+the hotel and with the date, so views that show them add a digest of them
+to the tag, ``"<version>-<digest>"``; ``If-Match`` only compares the
+version. ``If-None-Match`` on a detail GET answers 304 from the version
+column and, for priced views, one price-grid lookup.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import Hotel, Room
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'This record was changed by someone else. Reload it and try again.'
+    default_code = 'precondition_failed'
+
+
+def etag(version, live=''):
+    return f'"{version}-{live}"' if live else f'"{version}"'
+
+
+def parse_etags(header):
+    """Tags listed in an ``If-Match``/``If-None-Match`` header, unquoted; ``None`` for ``*`` or no header."""
+    if not header or header.strip() == '*':
+        return None
+    tags = set()
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tags.add(tag.strip('"'))
+    return tags
+
+
+def tag_versions(tags):
+    """The versions ``tags`` were issued for."""
+    versions = set()
+    for tag in tags:
+        version = tag.split('-', 1)[0]
+        if version.isdigit():
+            versions.add(int(version))
+    return versions
+
+
+def bump_hotel_version(hotel_id):
+    """Invalidate ETags of a hotel whose response changed without a save of its own."""
+    Hotel.objects.filter(pk=hotel_id).update(version=F('version') + 1)
+
+
+class VersionedUpdateMixin:
+    """ETag/If-Match handling for a ``ModelViewSet`` whose model has a ``version`` field."""
+
+    def live_etag(self, pk, data=None):
+        """
+        Digest of values in the response that change without a save, ``''``
+        if there are none; read off the response ``data`` when given.
+        """
+        return ''
+
+    def retrieve(self, request, *args, **kwargs):
+        cached = parse_etags(request.headers.get('If-None-Match'))
+        if cached:
+            lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+            current = self.get_queryset().filter(**lookup).values_list('pk', 'version').first()
+            if current is not None:
+                tag = etag(current[1], self.live_etag(current[0]))
+                if tag.strip('"') in cached:
+                    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': tag})
+        response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag(response.data['version'], self.live_etag(response.data['id'], response.data))
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = etag(response.data['version'], self.live_etag(response.data['id'], response.data))
+        return response
+
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        expected = parse_etags(self.request.headers.get('If-Match'))
+        if expected is not None:
+            expected = tag_versions(expected)
+        rows = type(instance).objects.filter(pk=instance.pk)
+        with transaction.atomic():
+            if expected is not None:
+                if not rows.filter(version__in=expected).update(version=F('version') + 1):
+                    raise PreconditionFailed()
+            else:
+                rows.update(version=F('version') + 1)
+            instance.version = rows.values_list('version', flat=True).get()
+            serializer.save()
+
+
+def _room_changed(sender, instance, raw=False, **kwargs):
+    # Rooms are nested in the hotel's detail response
+    if not raw:
+        bump_hotel_version(instance.hotel_id)
+
+
+def connect_signals():
+    post_save.connect(_room_changed, sender=Room, dispatch_uid='concurrency-room-save')
+    post_delete.connect(_room_changed, sender=Room, dispatch_uid='concurrency-room-delete')
@@ -0,0 +1,144 @@
+"""
+Read-only serialization fast path for list endpoints.
+
+``ModelSerializer(many=True)`` runs every attribute of every instance through
+DRF's per-field machinery. For read-only lists we instead fetch plain rows
+with ``values()`` and pass them through converters compiled once per
+serializer class. The output is identical to the regular serializer.
+"""
+import decimal
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+
+def _compile_field(field):
+    """Return a converter for a raw ``values()`` value, or None to pass it through."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            return field.pk_field.to_representation
+        return None
+
+    if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField)):
+        return None
+
+    if isinstance(field, serializers.DecimalField):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if coerce_to_string and not field.localize and not field.normalize_output and field.decimal_places is not None:
+            exponent = decimal.Decimal('.1') ** field.decimal_places
+            context = decimal.getcontext().copy()
+            if field.max_digits is not None:
+                context.prec = field.max_digits
+            rounding = field.rounding
+
+            def convert_decimal(value):
+                return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+            return convert_decimal
+
+    if isinstance(field, serializers.DateField) and not isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() == ISO_8601:
+            return lambda value: value.isoformat()
+
+    # DateTimeField depends on the active timezone, ChoiceField on the
+    # choices map, etc. -- the bound method is still only looked up once.
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Compiled, read-only counterpart of a ``ModelSerializer``.
+
+    Supports plain model fields, dotted sources (fetched through joins),
+    nested ``many=True`` serializers over reverse foreign keys, which are
+    loaded with one extra query per nested field, and computed fields that
+    declare the ``values_lookups`` they need and a ``represent_values(rows)``
+    that returns one value per row.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk_lookup = self.model._meta.pk.attname
+        self.field_names = []
+        self.columns = []
+        self.nested = []
+        self.computed = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self.field_names.append(name)
+            if isinstance(field, serializers.ListSerializer):
+                self.nested.append((name, self._compile_nested(field)))
+                continue
+            if hasattr(field, 'values_lookups'):
+                self.computed.append((name, field))
+                continue
+            if field.source == '*' or isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} cannot be served from values()."
+                )
+            self.columns.append((name, field.source.replace('.', '__'), _compile_field(field)))
+
+        self.lookups = [lookup for _, lookup, _ in self.columns]
+        for _, field in self.computed:
+            self.lookups += [lookup for lookup in field.values_lookups if lookup not in self.lookups]
+        if self.nested and self.pk_lookup not in self.lookups:
+            self.lookups.append(self.pk_lookup)
+
+    def _compile_nested(self, field):
+        relation = self.model._meta.get_field(field.source)
+        if not relation.one_to_many:
+            raise ImproperlyConfigured(
+                f"Nested field '{field.field_name}' must be a reverse foreign key."
+            )
+        child = ValuesSerializer(field.child)
+        fk = relation.field.attname
+        if fk not in child.lookups:
+            child.lookups.append(fk)
+        return child, fk
+
+    def values(self, queryset):
+        """Turn a model queryset into a ``values()`` queryset of the needed columns."""
+        return queryset.values(*self.lookups)
+
+    def represent(self, rows):
+        """Serialize ``values()`` rows into the regular serializer's output."""
+        rows = list(rows)
+        data = []
+        for row in rows:
+            # Pre-seed keys so the output keeps the serializer's field order.
+            item = dict.fromkeys(self.field_names)
+            for name, lookup, convert in self.columns:
+                value = row[lookup]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+
+        for name, field in self.computed:
+            for item, value in zip(data, field.represent_values(rows)):
+                item[name] = value
+
+        if self.nested and rows:
+            ids = [row[self.pk_lookup] for row in rows]
+            for name, (child, fk) in self.nested:
+                child_rows = list(child.values(
+                    child.model._default_manager.filter(**{f'{fk}__in': ids})
+                    .order_by(*(child.model._meta.ordering or ['pk']))
+                ))
+                grouped = {}
+                for child_row, child_item in zip(child_rows, child.represent(child_rows)):
+                    grouped.setdefault(child_row[fk], []).append(child_item)
+                for row, item in zip(rows, data):
+                    item[name] = grouped.get(row[self.pk_lookup], [])
+        return data
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    """Return the cached ``ValuesSerializer`` compiled from ``serializer_class``."""
+    return ValuesSerializer(serializer_class())
@@ -0,0 +1,90 @@
+"""
+Distance search over ``Hotel.latitude``/``Hotel.longitude``.
+
+``nearby`` first narrows the table to a latitude/longitude bounding box,
+which the ``(latitude, longitude)`` index can serve, and only then computes
+the exact haversine distance for the remaining candidates.
+"""
+import csv
+import math
+from pathlib import Path
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+CITY_TABLE = Path(__file__).resolve().parent / 'data' / 'city_coordinates.csv'
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return a ``Q`` matching every point within ``radius_km`` (and a few more)."""
+    dlat = radius_km / KM_PER_DEGREE
+    box = Q(latitude__gte=max(lat - dlat, -90.0), latitude__lte=min(lat + dlat, 90.0))
+
+    # Near a pole every longitude is in range
+    if abs(lat) + dlat >= 90.0:
+        return box
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+    if dlng >= 180.0:
+        return box
+
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        return box & (Q(longitude__gte=west + 360.0) | Q(longitude__lte=east))
+    if east > 180.0:
+        return box & (Q(longitude__gte=west) | Q(longitude__lte=east - 360.0))
+    return box & Q(longitude__gte=west, longitude__lte=east)
+
+
+def nearby(queryset, lat, lng, radius_km):
+    """Hotels within ``radius_km`` of a point, nearest first, annotated with ``distance_km``."""
+    dlat = Radians(F('latitude') - Value(lat))
+    dlng = Radians(F('longitude') - Value(lng))
+    a = (Power(Sin(dlat / 2), 2)
+         + Value(math.cos(math.radians(lat))) * Cos(Radians(F('latitude'))) * Power(Sin(dlng / 2), 2))
+    distance = Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)))
+
+    return (
+        queryset.filter(bounding_box(lat, lng, radius_km))
+        .annotate(distance_km=distance)
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', 'id')
+    )
+
+
+def load_city_table(path=CITY_TABLE):
+    """Read the offline ``city,region,latitude,longitude`` table, keyed by lower-cased "city, region"."""
+    table = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            coordinates = (float(row['latitude']), float(row['longitude']))
+            city = row['city'].strip().lower()
+            table[f"{city}, {row['region'].strip().lower()}"] = coordinates
+            table.setdefault(city, coordinates)
+    return table
+
+
+def lookup_address(address, table):
+    """Match the trailing "City, Region" (or "City") of a free-text address."""
+    parts = [part.strip().lower() for part in address.split(',') if part.strip()]
+    if len(parts) >= 2:
+        match = table.get(f'{parts[-2]}, {parts[-1]}')
+        if match:
+            return match
+        # "..., Paris, France 75001" style addresses
+        match = table.get(parts[-2])
+        if match:
+            return match
+    if parts:
+        return table.get(parts[-1])
+    return None
@@ -0,0 +1,117 @@
+"""
+``Idempotency-Key`` support for create endpoints.
+
+The first successful POST with a given key stores its response; retries
+with the same key and body replay it with one indexed lookup instead of
+re-running password hashing or overlap checks. Keys expire after
+``IDEMPOTENCY_KEY_TTL`` seconds and are removed by
+``python manage.py purge_idempotency_keys`` using the ``expires_at`` index.
+
+A key is claimed before the request runs, so a concurrent retry gets a 409
+instead of running it twice. If the first request never finishes (a killed
+worker), its key stays pending; a retry takes it over once it has been
+pending for ``IDEMPOTENCY_PENDING_TIMEOUT`` seconds.
+
+Bodies are compared by an HMAC keyed with ``SECRET_KEY``, not a plain
+hash: a registration body holds a password, which a stored unsalted digest
+would let anyone reading the table guess offline.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def _digest(*parts):
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _body_digest(data):
+    return salted_hmac(HEADER, json.dumps(data, sort_keys=True, default=str), algorithm='sha256').hexdigest()
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches so no single DELETE holds locks for long."""
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """Replay the stored response when ``create`` is retried with the same key."""
+
+    def create(self, request, *args, **kwargs):
+        client_key = request.headers.get(HEADER)
+        if not client_key:
+            return super().create(request, *args, **kwargs)
+
+        user = request.user.pk if request.user and request.user.is_authenticated else 'anon'
+        key = _digest(user, request.path, client_key)
+        request_hash = _body_digest(request.data)
+        now = timezone.now()
+
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None and record.expires_at <= now:
+            record.delete()
+            record = None
+
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+        expires_at = now + timedelta(seconds=ttl)
+        if record is not None:
+            if record.request_hash != request_hash:
+                return Response(
+                    {'detail': f'{HEADER} was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is not None:
+                return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+            timeout = getattr(settings, 'IDEMPOTENCY_PENDING_TIMEOUT', 60)
+            # Only one retry wins the conditional UPDATE of a stale key
+            if record.created_at > now - timedelta(seconds=timeout) or not IdempotencyKey.objects.filter(
+                pk=record.pk, status_code__isnull=True, created_at=record.created_at,
+            ).update(created_at=now, expires_at=expires_at):
+                return Response(
+                    {'detail': 'A request with this key is still being processed.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+        else:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(key=key, request_hash=request_hash, expires_at=expires_at)
+            except IntegrityError:
+                # A concurrent retry claimed the key first
+                return Response(
+                    {'detail': 'A request with this key is still being processed.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            # Nothing was created, so let a retry run the request again
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=['status_code', 'response'])
+        return response
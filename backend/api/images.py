@@ -0,0 +1,91 @@
+"""
+Uploaded hotel photos and their WebP thumbnails.
+
+Files are stored under content-hashed names, so a URL always points to the
+same bytes and can be served with a far-future ``Cache-Control: immutable``
+header by the web server or CDN in front of ``MEDIA_URL``. Thumbnails are
+generated once by a background job after a photo is uploaded.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+
+
+class ContentHashedStorage(FileSystemStorage):
+    """Save files as ``<dir>/<stem>.<hash><ext>``; identical content is stored once."""
+
+    def save(self, name, content, max_length=None):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, filename = os.path.split(name)
+        stem, ext = os.path.splitext(filename)
+        hashed = os.path.join(directory, f'{stem}.{digest.hexdigest()[:12]}{ext.lower()}')
+        if self.exists(hashed):
+            return hashed.replace('\\', '/')
+        return super().save(hashed, content, max_length=max_length)
+
+
+image_storage = ContentHashedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def generate_thumbnails(hotel_id):
+    """Render the hotel photo at each ``HOTEL_THUMBNAIL_WIDTHS`` width as WebP."""
+    from PIL import Image, ImageOps
+
+    from .models import Change, Hotel
+
+    hotel = Hotel.objects.filter(pk=hotel_id).first()
+    if hotel is None or not hotel.photo:
+        return
+    photo_name = hotel.photo.name
+
+    with hotel.photo.open('rb') as f:
+        image = Image.open(f)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    thumbnails = {}
+    for width in sorted(getattr(settings, 'HOTEL_THUMBNAIL_WIDTHS', (320, 640, 1024))):
+        resized = image.copy()
+        resized.thumbnail((min(width, image.width), image.height))
+        buffer = BytesIO()
+        resized.save(buffer, 'WEBP', quality=getattr(settings, 'HOTEL_THUMBNAIL_QUALITY', 80))
+        name = image_storage.save(f'hotels/thumbs/{resized.width}.webp', ContentFile(buffer.getvalue()))
+        thumbnails[str(resized.width)] = name
+        # Never upscale; a narrow original just yields fewer sizes
+        if resized.width == image.width:
+            break
+
+    # Skip the write if the photo was replaced while we were working
+    if Hotel.objects.filter(pk=hotel_id, photo=photo_name).update(thumbnails=thumbnails,
+                                                                   version=F('version') + 1):
+        from .changes import record_changes
+        record_changes(Hotel.objects.filter(pk=hotel_id), Change.UPDATE)
+
+
+def queue_thumbnails(hotel):
+    """Drop thumbnails of the previous photo and queue new ones."""
+    from .jobs import enqueue
+    from .models import Hotel
+
+    Hotel.objects.filter(pk=hotel.pk).update(thumbnails={}, version=F('version') + 1)
+    # The caller may still serialize the hotel, with its new ETag
+    hotel.refresh_from_db(fields=['thumbnails', 'version'])
+    if hotel.photo:
+        enqueue(generate_thumbnails, hotel_id=hotel.pk)
@@ -0,0 +1,172 @@
+"""
+Room-type inventory for hotels with ``inventory_by_type`` set.
+
+Such a hotel sells "a DOUBLE for these nights" instead of a given room.
+Every booking in it, with or without a room, adds one to a
+``RoomTypeNight`` counter per night, and is refused when a counter would
+pass the number of rooms of that type plus the hotel's
+``overbooking_limit``. Availability is then one row per night instead of
+every room's reservations. Room-type bookings get a room number later,
+from ``assign_rooms`` (``python manage.py assign_rooms``).
+
+Counters change in the same transaction as the reservations they count:
+``claim`` when booking, ``move`` when editing, ``release`` when a reservation is
+deleted (a signal receiver, so cascades are covered too) and
+``rebuild`` when a hotel switches to this mode.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from .archive import is_archiving
+from .models import Reservation, Room, RoomTypeNight
+
+
+class SoldOut(Exception):
+    """No room of the requested type is left for one of the nights."""
+
+
+def nights(check_in, check_out):
+    return [check_in + timedelta(days=n) for n in range((check_out - check_in).days)]
+
+
+def room_counts(hotel):
+    """Physical rooms per type in ``hotel``."""
+    return dict(
+        Room.objects.filter(hotel=hotel).values_list('room_type').annotate(total=Count('id')).order_by()
+    )
+
+
+@transaction.atomic
+def claim(hotel, room_type, check_in, check_out):
+    """
+    Take one ``room_type`` room of ``hotel`` for each night of the stay, or
+    raise ``SoldOut`` and take none. A no-op for hotels that sell rooms.
+    """
+    if not hotel.inventory_by_type:
+        return
+    stay = nights(check_in, check_out)
+    RoomTypeNight.objects.bulk_create(
+        [RoomTypeNight(hotel=hotel, room_type=room_type, night=night) for night in stay],
+        ignore_conflicts=True,
+    )
+    limit = room_counts(hotel).get(room_type, 0) + hotel.overbooking_limit
+    # One conditional UPDATE: a night at the limit is not incremented, so
+    # fewer updated rows than nights means the stay does not fit
+    taken = RoomTypeNight.objects.filter(
+        hotel=hotel, room_type=room_type, night__gte=check_in, night__lt=check_out, sold__lt=limit,
+    ).update(sold=F('sold') + 1)
+    if taken < len(stay):
+        raise SoldOut(f"No {room_type.lower()} room left for these dates.")
+
+
+def release(hotel_id, room_type, check_in, check_out):
+    """Give back what ``claim`` took for a stay."""
+    RoomTypeNight.objects.filter(
+        hotel_id=hotel_id, room_type=room_type, night__gte=check_in, night__lt=check_out, sold__gt=0,
+    ).update(sold=F('sold') - 1)
+
+
+@transaction.atomic
+def move(old, hotel, room_type, check_in, check_out):
+    """
+    Give back what ``old`` (a stored reservation, or None for a new one)
+    took and claim the new stay instead, or raise ``SoldOut`` and change
+    nothing.
+    """
+    if old is not None and old.hotel.inventory_by_type:
+        release(old.hotel_id, old.room_type, old.check_in, old.check_out)
+    claim(hotel, room_type, check_in, check_out)
+
+
+def availability(hotel, check_in, check_out):
+    """Rooms left per type for the whole of ``[check_in, check_out)``, overbooking included."""
+    if not hotel.inventory_by_type:
+        booked = Reservation.objects.filter(room=OuterRef('pk'), check_in__lt=check_out, check_out__gt=check_in)
+        return dict(
+            Room.objects.filter(hotel=hotel).filter(~Exists(booked))
+            .values_list('room_type').annotate(free=Count('id')).order_by()
+        )
+    busiest = dict(
+        RoomTypeNight.objects.filter(hotel=hotel, night__gte=check_in, night__lt=check_out)
+        .values_list('room_type').annotate(peak=Max('sold')).order_by()
+    )
+    return {
+        room_type: max(total + hotel.overbooking_limit - busiest.get(room_type, 0), 0)
+        for room_type, total in room_counts(hotel).items()
+    }
+
+
+@transaction.atomic
+def rebuild(hotel):
+    """Recount the hotel's counters from its upcoming reservations."""
+    today = timezone.localdate()
+    sold = Counter()
+    for room_type, check_in, check_out in Reservation.objects.filter(
+        hotel=hotel, check_out__gt=today
+    ).values_list('room_type', 'check_in', 'check_out').iterator():
+        for night in nights(max(check_in, today), check_out):
+            sold[room_type, night] += 1
+    RoomTypeNight.objects.filter(hotel=hotel).delete()
+    RoomTypeNight.objects.bulk_create([
+        RoomTypeNight(hotel=hotel, room_type=room_type, night=night, sold=count)
+        for (room_type, night), count in sold.items()
+    ], batch_size=1000)
+
+
+def _free_room(candidates, busy, check_in, check_out):
+    for room_id in candidates:
+        if not any(start < check_out and end > check_in for start, end in busy[room_id]):
+            return room_id
+    return None
+
+
+@transaction.atomic
+def assign_rooms(hotel, arriving_before):
+    """
+    Give a room of the booked type to every room-type booking of ``hotel``
+    that checks in before ``arriving_before``, earliest arrival first.
+    Returns the reservations still without a room (overbooked stays).
+    """
+    pending = list(
+        Reservation.objects.select_for_update().filter(
+            hotel=hotel, room__isnull=True, check_in__lt=arriving_before
+        ).order_by('check_in', 'id')
+    )
+    if not pending:
+        return []
+    rooms = defaultdict(list)
+    for room_id, room_type in Room.objects.filter(hotel=hotel).order_by('room_number').values_list('id', 'room_type'):
+        rooms[room_type].append(room_id)
+    busy = defaultdict(list)
+    for room_id, check_in, check_out in Reservation.objects.filter(
+        hotel=hotel, room__isnull=False, check_in__lt=max(r.check_out for r in pending),
+        check_out__gt=min(r.check_in for r in pending),
+    ).values_list('room_id', 'check_in', 'check_out'):
+        busy[room_id].append((check_in, check_out))
+
+    unassigned = []
+    for reservation in pending:
+        room_id = _free_room(rooms[reservation.room_type], busy, reservation.check_in, reservation.check_out)
+        if room_id is None:
+            unassigned.append(reservation)
+            continue
+        reservation.room_id = room_id
+        # save() rather than update() so the change log sees the assignment
+        reservation.save(update_fields=['room'])
+        busy[room_id].append((reservation.check_in, reservation.check_out))
+    return unassigned
+
+
+def _deleted(sender, instance, **kwargs):
+    # Archived stays are over; their nights are never sold again
+    if instance.hotel_id is not None and instance.room_type and not is_archiving():
+        release(instance.hotel_id, instance.room_type, instance.check_in, instance.check_out)
+
+
+def connect_signals():
+    post_delete.connect(_deleted, sender=Reservation, dispatch_uid='inventory-release')
@@ -0,0 +1,91 @@
+"""
+Database-backed background job queue.
+
+``enqueue`` inserts a row in the caller's transaction, so when the caller
+saves and enqueues in one ``transaction.atomic()`` (as the views do), the
+job exists if and only if the booking (or admin change) that queued it was
+committed, and the request only pays for one INSERT. ``python manage.py run_jobs`` picks
+the jobs up, retrying failures with exponential backoff.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(func, key=None, delay=0, **payload):
+    """
+    Queue ``func(**payload)`` to run in the background.
+
+    ``func`` is a module-level function (or its dotted path) and ``payload``
+    must be JSON-serializable. Jobs with the same ``key`` are queued only
+    once, so retried requests do not duplicate side effects.
+    """
+    name = func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+    fields = dict(
+        name=name,
+        payload=payload,
+        max_attempts=_setting('JOB_MAX_ATTEMPTS', 5),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if key is None:
+        return Job.objects.create(**fields)
+    job, _ = Job.objects.get_or_create(key=key, defaults=fields)
+    return job
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome."""
+    try:
+        import_string(job.name)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'FAILED'
+        else:
+            job.status = 'PENDING'
+            backoff = _setting('JOB_RETRY_BACKOFF', 30) * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=backoff)
+    else:
+        job.status = 'DONE'
+    job.save(update_fields=['status', 'run_at', 'last_error', 'updated_at'])
+    return job
+
+
+def run_pending(limit=10):
+    """
+    Claim and run up to ``limit`` due jobs. Returns how many were run.
+
+    Jobs are claimed with a conditional UPDATE, so several workers can poll
+    the same table without running a job twice. Jobs left RUNNING by a
+    crashed worker are put back in the queue after ``JOB_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('JOB_TIMEOUT', 600))
+    Job.objects.filter(status='RUNNING', updated_at__lt=stale).update(status='PENDING', updated_at=now)
+
+    due = list(
+        Job.objects.filter(status='PENDING', run_at__lte=now)
+        .order_by('run_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    ran = 0
+    for job_id in due:
+        claimed = Job.objects.filter(id=job_id, status='PENDING').update(
+            status='RUNNING', attempts=F('attempts') + 1, updated_at=timezone.now()
+        )
+        if not claimed:
+            # Another worker got there first
+            continue
+        run_job(Job.objects.get(id=job_id))
+        ran += 1
+    return ran
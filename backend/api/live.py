@@ -0,0 +1,281 @@
+"""
+Live availability for a hotel over server-sent events.
+
+``GET /api/hotels/<id>/availability/stream/`` keeps a response open and
+writes one ``availability`` event per reservation that is booked, changed
+or cancelled in that hotel. Event ids are change log ids (api/changes.py),
+so a reconnecting ``EventSource`` sends ``Last-Event-ID`` and first gets
+what it missed from the log.
+
+Events reach open streams through a broker chosen by ``LIVE_BROKER``:
+
+* ``InProcessBroker`` (default) fans committed changes out inside the
+  process that made them. Fine for a single server process.
+* ``ChangeLogBroker`` has one thread per process poll the change log, so
+  every process sees bookings made by any other.
+
+Either way an idle subscriber is one entry in a per-hotel set plus a queue.
+Under ASGI the stream is an async generator and holds no thread. Under WSGI
+each open stream would hold a worker thread for as long as the page is
+open, so WSGI servers answer ``204 No Content`` instead, which tells an
+``EventSource`` to stop for good, unless ``LIVE_WSGI_STREAMS`` is set (for
+a threaded server sized for it).
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .changes import changes_since
+from .models import Change, Hotel
+
+logger = logging.getLogger(__name__)
+
+# Per-subscriber backlog; a client this far behind is dropped and catches
+# up from the change log when it reconnects
+QUEUE_SIZE = 100
+REPLAY_LIMIT = 500
+
+
+def _event(change):
+    data = change['data'] or {}
+    return {
+        'id': change['id'],
+        'hotel': change['hotel_id'],
+        'action': change['action'],
+        'reservation': change['object_id'],
+        'room': data.get('room_id'),
+        'room_type': data.get('room_type'),
+        'check_in': data.get('check_in'),
+        'check_out': data.get('check_out'),
+    }
+
+
+class Subscription:
+    """Events for one open stream. ``deliver`` is called from any thread."""
+
+    def __init__(self, hotel_id):
+        self.hotel_id = hotel_id
+        self.overflowed = False
+        self._queue = queue.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """A subscription read from an event loop; delivery hops onto that loop."""
+
+    def __init__(self, hotel_id):
+        super().__init__(hotel_id)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is gone; the stream is being torn down
+            self.overflowed = True
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Fan events out to the subscribers of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.hotel_id].add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.hotel_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.hotel_id]
+
+    def subscriber_count(self, hotel_id):
+        with self._lock:
+            return len(self._subscribers.get(hotel_id, ()))
+
+    def fan_out(self, events):
+        for event in events:
+            with self._lock:
+                subscribers = list(self._subscribers.get(event['hotel'], ()))
+            for subscription in subscribers:
+                subscription.deliver(event)
+
+    def publish(self, events):
+        """Called after commit with the events of one transaction."""
+        self.fan_out(events)
+
+
+class ChangeLogBroker(InProcessBroker):
+    """
+    Fan out reservation changes read from the change log, so bookings made
+    by other processes reach this one's subscribers. The poller starts with
+    the first subscriber; ``LIVE_POLL_SECONDS`` sets how often it looks.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    def subscribe(self, subscription):
+        super().subscribe(subscription)
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='live-availability', daemon=True)
+                self._poller.start()
+
+    def publish(self, events):
+        # The poller picks these up from the log, like everyone else's
+        pass
+
+    def _poll(self):
+        interval = getattr(settings, 'LIVE_POLL_SECONDS', 1)
+        cursor = None
+        while True:
+            try:
+                if cursor is None:
+                    cursor = Change.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                rows, has_more = changes_since(cursor, REPLAY_LIMIT, model='reservation')
+                if rows:
+                    cursor = rows[-1]['id']
+                    self.fan_out([_event(row) for row in rows])
+            except Exception:
+                logger.exception('Polling the change log for live availability failed')
+                has_more = False
+            finally:
+                close_old_connections()
+            if not has_more:
+                time.sleep(interval)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'LIVE_BROKER', 'api.live.InProcessBroker'))()
+
+
+def publish_changes(changes):
+    """Push committed reservation ``Change`` rows to live subscribers."""
+    get_broker().publish([
+        _event({'id': c.id, 'hotel_id': c.hotel_id, 'action': c.action,
+                'object_id': c.object_id, 'data': c.data})
+        for c in changes
+    ])
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: availability\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _replay(hotel_id, last_event_id):
+    """Changes after ``last_event_id`` for a reconnecting client."""
+    if last_event_id is None:
+        return []
+    rows, _ = changes_since(last_event_id, REPLAY_LIMIT, hotel_id=hotel_id, model='reservation', settle_seconds=0)
+    return [_event(row) for row in rows]
+
+
+def _stream(broker, hotel_id, last_event_id, heartbeat):
+    subscription = Subscription(hotel_id)
+    # Subscribe before reading the log so nothing falls in between
+    broker.subscribe(subscription)
+    try:
+        yield f"retry: {getattr(settings, 'LIVE_RETRY_MS', 3000)}\n\n"
+        sent = set()
+        for event in _replay(hotel_id, last_event_id):
+            sent.add(event['id'])
+            yield _format(event)
+        while not subscription.overflowed:
+            event = subscription.get(heartbeat)
+            if event is None:
+                # Keeps proxies from timing out and notices gone clients
+                yield ': keepalive\n\n'
+            elif event['id'] not in sent:
+                yield _format(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def _astream(broker, hotel_id, last_event_id, heartbeat):
+    subscription = AsyncSubscription(hotel_id)
+    broker.subscribe(subscription)
+    try:
+        yield f"retry: {getattr(settings, 'LIVE_RETRY_MS', 3000)}\n\n"
+        sent = set()
+        for event in await sync_to_async(_replay)(hotel_id, last_event_id):
+            sent.add(event['id'])
+            yield _format(event)
+        while not subscription.overflowed:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield ': keepalive\n\n'
+            elif event['id'] not in sent:
+                yield _format(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def availability_stream(request, pk):
+    """Server-sent availability events for one hotel, see the module docstring."""
+    if not Hotel.objects.filter(pk=pk).exists():
+        raise Http404
+    try:
+        last_event_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_event_id = None
+
+    # Under ASGI an async generator holds no thread while the client idles
+    if isinstance(request, ASGIRequest):
+        stream = _astream
+    elif getattr(settings, 'LIVE_WSGI_STREAMS', False):
+        stream = _stream
+    else:
+        return HttpResponse(status=204)
+    heartbeat = getattr(settings, 'LIVE_HEARTBEAT_SECONDS', 15)
+    response = StreamingHttpResponse(
+        stream(get_broker(), pk, last_event_id, heartbeat), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
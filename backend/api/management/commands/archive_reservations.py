@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import archive_cutoff, archive_reservations
+
+
+class Command(BaseCommand):
+    help = 'Move reservations that checked out before the archive horizon to ArchivedReservation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive stays checked out before this date (YYYY-MM-DD). '
+                                             'Defaults to today minus RESERVATION_ARCHIVE_AFTER_DAYS.')
+        parser.add_argument('--batch', type=int, default=1000, help='Reservations moved per transaction.')
+        parser.add_argument('--force', action='store_true',
+                            help='Allow a --before date after the archive horizon (but not after today).')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+        if options['before']:
+            try:
+                cutoff = date.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError('--before must be a date in YYYY-MM-DD format.')
+        try:
+            archived = archive_reservations(cutoff, batch_size=options['batch'], force=options['force'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f'Archived {archived} reservation(s) checked out before {cutoff}.')
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.inventory import assign_rooms
+from api.models import Hotel
+
+
+class Command(BaseCommand):
+    help = 'Give rooms to room-type bookings arriving soon, in hotels that sell by room type.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotel', type=int, action='append', help='Only this hotel id (repeatable).')
+        parser.add_argument('--until', help='Assign stays checking in before this date (YYYY-MM-DD). '
+                                            'Defaults to the day after tomorrow.')
+
+    def handle(self, *args, **options):
+        until = timezone.localdate() + timedelta(days=2)
+        if options['until']:
+            try:
+                until = date.fromisoformat(options['until'])
+            except ValueError:
+                raise CommandError('--until must be a date in YYYY-MM-DD format.')
+        hotels = Hotel.objects.filter(inventory_by_type=True).order_by('id')
+        if options['hotel']:
+            hotels = hotels.filter(id__in=options['hotel'])
+        for hotel in hotels:
+            unassigned = assign_rooms(hotel, until)
+            for reservation in unassigned:
+                self.stderr.write(f'{hotel}: no free {reservation.room_type} room for reservation '
+                                  f'{reservation.id} ({reservation.check_in} to {reservation.check_out}).')
+        self.stdout.write(f'Assigned rooms for arrivals before {until}.')
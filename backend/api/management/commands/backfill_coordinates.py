@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from api.changes import record_changes
+from api.geo import CITY_TABLE, load_city_table, lookup_address
+from api.models import Change, Hotel
+
+
+@transaction.atomic
+def save(batch):
+    """Write a batch of coordinates like an edit: new ETags and a change log entry."""
+    ids = [hotel.id for hotel in batch]
+    updated = Hotel.objects.bulk_update(batch, ['latitude', 'longitude'])
+    Hotel.objects.filter(id__in=ids).update(version=F('version') + 1)
+    record_changes(Hotel.objects.filter(id__in=ids).order_by('id'), Change.UPDATE)
+    return updated
+
+
+class Command(BaseCommand):
+    help = 'Fill in hotel latitude/longitude from an offline city lookup table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', default=str(CITY_TABLE),
+                            help='CSV with city,region,latitude,longitude columns.')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Also update hotels that already have coordinates.')
+        parser.add_argument('--batch', type=int, default=500, help='Rows per bulk update.')
+
+    def handle(self, *args, **options):
+        table = load_city_table(options['table'])
+        hotels = Hotel.objects.only('id', 'address', 'latitude', 'longitude').order_by('id')
+        if not options['overwrite']:
+            hotels = hotels.filter(latitude__isnull=True)
+
+        updated, missing, batch = 0, [], []
+        for hotel in hotels.iterator(chunk_size=options['batch']):
+            match = lookup_address(hotel.address, table)
+            if match is None:
+                missing.append(hotel)
+                continue
+            hotel.latitude, hotel.longitude = match
+            batch.append(hotel)
+            if len(batch) >= options['batch']:
+                updated += save(batch)
+                batch = []
+        if batch:
+            updated += save(batch)
+
+        self.stdout.write(f'Updated {updated} hotel(s).')
+        for hotel in missing:
+            self.stdout.write(f'No match for hotel {hotel.id}: {hotel.address}')
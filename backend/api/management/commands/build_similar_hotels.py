@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.similarity import TOP, build
+
+
+class Command(BaseCommand):
+    help = 'Recompute hotel feature vectors and the similar hotels served on each hotel page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=TOP, help='Similar hotels kept per hotel.')
+        parser.add_argument('--batch', type=int, default=1000, help='Rows written per INSERT.')
+
+    def handle(self, *args, **options):
+        if options['top'] < 1:
+            raise CommandError('--top must be at least 1.')
+        hotels = build(top=options['top'], batch_size=options['batch'])
+        self.stdout.write(f"Found up to {options['top']} similar hotel(s) for each of {hotels} hotel(s).")
@@ -0,0 +1,52 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.assignment import apply_moves, optimize_rooms
+from api.models import Hotel, Room
+
+
+class Command(BaseCommand):
+    help = ('Reassign rooms within each hotel so free nights form long runs. '
+            'Prints the changes for every hotel first, then applies them all in one transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotel', type=int, action='append', help='Only this hotel id (repeatable).')
+        parser.add_argument('--from', dest='start', help='Move stays checking in on or after this date '
+                                                         '(YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without applying them.')
+
+    def handle(self, *args, **options):
+        start = timezone.localdate()
+        if options['start']:
+            try:
+                start = date.fromisoformat(options['start'])
+            except ValueError:
+                raise CommandError('--from must be a date in YYYY-MM-DD format.')
+        hotels = Hotel.objects.order_by('id')
+        if options['hotel']:
+            hotels = hotels.filter(id__in=options['hotel'])
+
+        # Plan every hotel with its stays locked, print all the plans, and
+        # only then apply them, so nothing is committed before it is shown
+        # and a failure leaves every hotel as it was
+        with transaction.atomic():
+            plans = []
+            for hotel in hotels:
+                moves, before, after = optimize_rooms(hotel, start, apply=False)
+                plans.append(moves)
+                numbers = dict(Room.objects.filter(hotel=hotel).values_list('id', 'room_number'))
+                self.stdout.write(f'{hotel} (id {hotel.id}): {len(moves)} move(s)')
+                for stay, room_id in moves:
+                    self.stdout.write(f"  reservation {stay['id']} {stay['check_in']}..{stay['check_out']} "
+                                      f"{stay['room_type']}: {numbers.get(stay['room_id'], '-')} -> {numbers[room_id]}")
+                self.stdout.write(f"  free runs {before['free_runs']} -> {after['free_runs']}, "
+                                  f"longest free run {before['longest_free_run']} -> {after['longest_free_run']} night(s)")
+            if options['dry_run']:
+                self.stdout.write('Dry run, nothing changed.')
+                return
+            for moves in plans:
+                apply_moves(moves)
+        self.stdout.write(f'Applied {sum(len(moves) for moves in plans)} move(s).')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key records.'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f'Deleted {deleted} expired key(s).')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (booking confirmations etc.).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now, then exit.')
+        parser.add_argument('--batch', type=int, default=10, help='Jobs to claim per poll.')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending(limit=options['batch'])
+            if ran:
+                self.stdout.write(f'Ran {ran} job(s).')
+            if options['once']:
+                if ran < options['batch']:
+                    return
+            elif not ran:
+                time.sleep(options['sleep'])
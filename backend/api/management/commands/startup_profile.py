@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so nothing is imported yet
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+phases = {"django.setup()": setup - start}
+if sys.argv[1]:
+    from django.test import Client
+    Client(SERVER_NAME="localhost").get(sys.argv[1])
+    phases["first request"] = time.perf_counter() - setup
+print(json.dumps({"phases": phases, "modules": len(sys.modules)}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report where worker start-up time goes: django.setup(), the first request and the slowest imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--request', default='/api/hotels/',
+                            help='Path to GET after setup, or "" to stop after django.setup().')
+        parser.add_argument('--limit', type=int, default=15, help='Packages and imports to list.')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, options['request']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'Probe failed.')
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        # "import time: self [us] | cumulative | imported package", nested by indent
+        by_package = defaultdict(int)
+        top_level = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            by_package[name.strip().split('.')[0]] += int(self_us)
+            if not name[1:].startswith(' '):
+                top_level.append((int(cumulative_us), name.strip()))
+
+        self.stdout.write(f'Settings: {settings.SETTINGS_MODULE}')
+        for phase, seconds in report['phases'].items():
+            self.stdout.write(f'{phase:<20} {seconds * 1000:8.1f} ms')
+        self.stdout.write(f"{'modules loaded':<20} {report['modules']:8d}")
+
+        self.stdout.write('\nImport time by top-level package:')
+        for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:options['limit']]:
+            self.stdout.write(f'  {us / 1000:8.1f} ms  {package}')
+
+        self.stdout.write('\nSlowest imports (including what they import):')
+        for us, name in sorted(top_level, reverse=True)[:options['limit']]:
+            self.stdout.write(f'  {us / 1000:8.1f} ms  {name}')
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 09:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', 'check_in'], name='api_res_user_checkin_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-19 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def check_existing_rows(apps, schema_editor):
+    # Name the rows the constraints below would reject, instead of failing
+    # halfway with a bare IntegrityError
+    db = schema_editor.connection.alias
+    Room = apps.get_model('api', 'Room')
+    Reservation = apps.get_model('api', 'Reservation')
+    duplicates = [
+        f"hotel {row['hotel_id']} room {row['room_number']}"
+        for row in Room.objects.using(db).values('hotel_id', 'room_number')
+        .annotate(rooms=Count('id')).filter(rooms__gt=1).order_by('hotel_id', 'room_number')[:20]
+    ]
+    if duplicates:
+        raise RuntimeError(
+            'Cannot make room numbers unique per hotel; these are used by more than one room: '
+            f"{', '.join(duplicates)}. Renumber or merge those rooms (e.g. in the admin), then run migrate again."
+        )
+    backwards = list(
+        Reservation.objects.using(db).filter(check_in__gte=F('check_out'))
+        .order_by('id').values_list('id', flat=True)[:20]
+    )
+    if backwards:
+        raise RuntimeError(
+            'Cannot require check-in before check-out; these reservations do not: '
+            f"{', '.join(map(str, backwards))}. Fix their dates, then run migrate again."
+        )
+
+
+def add_overlap_exclusion(apps, schema_editor):
+    # Only PostgreSQL has exclusion constraints over date ranges
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE api_reservation ADD CONSTRAINT api_res_no_overlap '
+        'EXCLUDE USING gist (room_id WITH =, daterange(check_in, check_out) WITH &&)'
+    )
+
+
+def remove_overlap_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE api_reservation DROP CONSTRAINT IF EXISTS api_res_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_itinerary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_existing_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.CheckConstraint(condition=models.Q(('check_in__lt', models.F('check_out'))), name='api_res_checkin_before_checkout'),
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('hotel', 'room_number'), name='api_room_unique_number'),
+        ),
+        migrations.RunPython(add_overlap_exclusion, remove_overlap_exclusion),
+    ]
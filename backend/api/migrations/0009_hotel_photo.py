@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 12:25
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_hotel_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=api.images.get_image_storage, upload_to='hotels/'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_archivedreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
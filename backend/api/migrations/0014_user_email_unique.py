@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 15:20
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def add_email_unique_index(apps, schema_editor):
+    # auth_user.email is not unique in Django, so registration enforces it
+    # with a partial index that leaves blank addresses alone. MySQL has no
+    # partial indexes and keeps relying on the serializer check.
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(schema_editor.connection.alias).exclude(email='')
+        .values('email').annotate(users=Count('id')).filter(users__gt=1)
+        .order_by('email').values_list('email', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot make user emails unique; these addresses belong to more than one user: '
+            f"{', '.join(duplicates)}. Merge those accounts or change their emails "
+            '(e.g. in the admin), then run migrate again.'
+        )
+    schema_editor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS api_user_email_uniq ON auth_user (email) WHERE email <> ''"
+    )
+
+
+def remove_email_unique_index(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS api_user_email_uniq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_change'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_unique_index, remove_email_unique_index),
+    ]
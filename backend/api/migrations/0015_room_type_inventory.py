@@ -0,0 +1,79 @@
+# Generated by Django 6.0 on 2026-10-19 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_room_details(apps, schema_editor):
+    Reservation = apps.get_model('api', 'Reservation')
+    Room = apps.get_model('api', 'Room')
+    room = Room.objects.filter(pk=OuterRef('room_id'))
+    Reservation.objects.filter(hotel__isnull=True).update(
+        hotel_id=Subquery(room.values('hotel_id')[:1]),
+        room_type=Subquery(room.values('room_type')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_user_email_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomTypeNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('SINGLE', 'Single'), ('DOUBLE', 'Double'), ('SUITE', 'Suite')], max_length=10)),
+                ('night', models.DateField()),
+                ('sold', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='inventory_by_type',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='overbooking_limit',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='hotel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='api.hotel'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='room_type',
+            field=models.CharField(blank=True, choices=[('SINGLE', 'Single'), ('DOUBLE', 'Double'), ('SUITE', 'Suite')], max_length=10),
+        ),
+        migrations.RunPython(copy_room_details, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reservation',
+            name='room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='api.room'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.CheckConstraint(condition=models.Q(('room__isnull', False), models.Q(('hotel__isnull', False), models.Q(('room_type', ''), _negated=True)), _connector='OR'), name='api_res_room_or_type'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['hotel', 'check_in'], name='api_res_hotel_checkin_idx'),
+        ),
+        migrations.AddField(
+            model_name='roomtypenight',
+            name='hotel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.hotel'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomtypenight',
+            constraint=models.UniqueConstraint(fields=('hotel', 'room_type', 'night'), name='api_roomtypenight_unique'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 10:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_review'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelFeatures',
+            fields=[
+                ('hotel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='api.hotel')),
+                ('vector', models.BinaryField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarHotel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_hotels', to='api.hotel')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.hotel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hotel', 'rank'), name='api_similarhotel_rank_unique')],
+            },
+        ),
+    ]
@@ -1,13 +1,40 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from .images import get_image_storage
 from django.contrib.auth.models import User
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils import timezone
 
 class Hotel(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     address = models.CharField(max_length=255)
     image = models.URLField(blank=True, null=True) 
+    # Uploaded photo; thumbnails maps width -> stored WebP file name
+    photo = models.ImageField(upload_to='hotels/', storage=get_image_storage, blank=True, null=True)
+    thumbnails = models.JSONField(default=dict, blank=True)
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    # Bumped on every edit; sent as the ETag, see api/concurrency.py
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Sell rooms by type from per-night counters and assign room numbers
+    # later, see api/inventory.py
+    inventory_by_type = models.BooleanField(default=False)
+    # Rooms per type and night that may be sold beyond the physical rooms
+    overbooking_limit = models.PositiveSmallIntegerField(default=0)
+    # Guest reviews, kept up to date one review at a time by api/reviews.py
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    review_total = models.PositiveIntegerField(default=0, editable=False)
+    review_average = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for ?near= searches, see api/geo.py
+            models.Index(fields=['latitude', 'longitude'], name='api_hotel_lat_lng_idx'),
+            # ?ordering=rating on the hotel list
+            models.Index(fields=['review_average', 'review_count'], name='api_hotel_review_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,16 +50,252 @@ class Room(models.Model):
     room_type = models.CharField(max_length=10, choices=ROOM_TYPES)
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
     capacity = models.IntegerField(validators=[MinValueValidator(1)])
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'room_number'], name='api_room_unique_number'),
+        ]
 
     def __str__(self):
         return f"{self.hotel.name} - {self.room_number}"
 
+class RoomTypeNight(models.Model):
+    """Rooms of one type sold in a hotel for one night, see api/inventory.py."""
+    hotel = models.ForeignKey(Hotel, related_name='+', on_delete=models.CASCADE)
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPES)
+    night = models.DateField()
+    sold = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'room_type', 'night'], name='api_roomtypenight_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} {self.room_type} {self.night}: {self.sold}"
+
+class HotelFeatures(models.Model):
+    """A hotel's feature vector as packed float32, see api/similarity.py."""
+    hotel = models.OneToOneField(Hotel, related_name='+', on_delete=models.CASCADE, primary_key=True)
+    vector = models.BinaryField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Features of {self.hotel_id}"
+
+class SimilarHotel(models.Model):
+    """One of a hotel's precomputed nearest neighbours, see api/similarity.py."""
+    hotel = models.ForeignKey(Hotel, related_name='similar_hotels', on_delete=models.CASCADE)
+    similar = models.ForeignKey(Hotel, related_name='+', on_delete=models.CASCADE)
+    # 1 for the most similar
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also serves the hotel's neighbours in rank order
+            models.UniqueConstraint(fields=['hotel', 'rank'], name='api_similarhotel_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} ~ {self.similar_id} ({self.score:.3f})"
+
+class Itinerary(models.Model):
+    """A group of reservations booked, and cancelled, together."""
+    user = models.ForeignKey(User, related_name='itineraries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Itinerary {self.id} - {self.user.username}"
+
 class Reservation(models.Model):
     user = models.ForeignKey(User, related_name='reservations', on_delete=models.CASCADE)
-    room = models.ForeignKey(Room, related_name='reservations', on_delete=models.CASCADE)
+    # Empty for a room-type booking until a room is assigned
+    room = models.ForeignKey(Room, related_name='reservations', on_delete=models.CASCADE, blank=True, null=True)
+    # Copied from the room when there is one
+    hotel = models.ForeignKey(Hotel, related_name='reservations', on_delete=models.CASCADE, blank=True, null=True)
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPES, blank=True)
+    itinerary = models.ForeignKey(Itinerary, related_name='reservations', on_delete=models.CASCADE, blank=True, null=True)
     check_in = models.DateField()
     check_out = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs per-user history lookups filtered and ordered by check-in
+            models.Index(fields=['user', 'check_in'], name='api_res_user_checkin_idx'),
+            # Admin changelist date filters
+            models.Index(fields=['check_in'], name='api_res_checkin_idx'),
+            models.Index(fields=['created_at'], name='api_res_created_at_idx'),
+            # Room-type bookings waiting for a room, see api/inventory.py
+            models.Index(fields=['hotel', 'check_in'], name='api_res_hotel_checkin_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(check_in__lt=models.F('check_out')),
+                name='api_res_checkin_before_checkout',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(room__isnull=False) | models.Q(hotel__isnull=False) & ~models.Q(room_type=''),
+                name='api_res_room_or_type',
+            ),
+            # On PostgreSQL, migration 0005 also adds an exclusion constraint
+            # (api_res_no_overlap) rejecting overlapping stays in one room.
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.room_id is not None:
+            self.hotel_id = self.room.hotel_id
+            self.room_type = self.room.room_type
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Reservation {self.id} - {self.user.username}"
+
+class ArchivedReservation(models.Model):
+    """
+    A finished stay moved out of ``Reservation`` by api/archive.py. Room and
+    hotel details are copied so the record outlives the room itself.
+    """
+    # Primary key the reservation had in the hot table
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, related_name='archived_reservations', on_delete=models.CASCADE)
+    room = models.ForeignKey(Room, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    hotel = models.ForeignKey(Hotel, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    itinerary = models.ForeignKey(Itinerary, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    room_number = models.CharField(max_length=10)
+    hotel_name = models.CharField(max_length=255)
+    check_in = models.DateField()
+    check_out = models.DateField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'check_in'], name='api_arch_user_checkin_idx'),
+            models.Index(fields=['hotel', 'check_in'], name='api_arch_hotel_checkin_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived reservation {self.original_id} - {self.user.username}"
+
+class Review(models.Model):
+    """A guest's rating of a hotel after a stay, one per reservation."""
+    user = models.ForeignKey(User, related_name='reviews', on_delete=models.CASCADE)
+    hotel = models.ForeignKey(Hotel, related_name='reviews', on_delete=models.CASCADE)
+    # Emptied when the stay is archived; the review stays
+    reservation = models.OneToOneField(Reservation, related_name='review', on_delete=models.SET_NULL, blank=True, null=True)
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first pages of one hotel's reviews
+            models.Index(fields=['hotel', 'created_at'], name='api_review_hotel_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(rating__gte=1, rating__lte=5), name='api_review_rating_range'),
+        ]
+
+    def __str__(self):
+        return f"Review {self.id} - {self.hotel_id}: {self.rating}"
+
+class WaitlistEntry(models.Model):
+    STATUSES = (
+        ('WAITING', 'Waiting'),
+        ('OFFERED', 'Offered'),
+    )
+    user = models.ForeignKey(User, related_name='waitlist_entries', on_delete=models.CASCADE)
+    hotel = models.ForeignKey(Hotel, related_name='waitlist_entries', on_delete=models.CASCADE)
+    # Empty room means any room in the hotel will do
+    room = models.ForeignKey(Room, related_name='waitlist_entries', on_delete=models.CASCADE, blank=True, null=True)
+    check_in = models.DateField()
+    check_out = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='WAITING')
+    offered_room = models.ForeignKey(Room, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    offered_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Stays have a bounded length, so "overlaps [a, b)" becomes a
+            # range scan on check_in within these indexes, see api/waitlist.py
+            models.Index(fields=['room', 'status', 'check_in'], name='api_wait_room_checkin_idx'),
+            models.Index(fields=['hotel', 'status', 'check_in'], name='api_wait_hotel_checkin_idx'),
+        ]
+
+    def __str__(self):
+        return f"Waitlist {self.id} - {self.user.username}"
+
+class Job(models.Model):
+    """A side effect queued for the background worker, see api/jobs.py."""
+    STATUSES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    )
+    # Dotted path of the function to call with ``payload`` as keyword arguments
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    key = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='api_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+class IdempotencyKey(models.Model):
+    """Stored response for a POST sent with an ``Idempotency-Key`` header."""
+    # sha256 of the user, path and client supplied key
+    key = models.CharField(max_length=64, unique=True)
+    request_hash = models.CharField(max_length=64)
+    # Empty while the first request is still being processed
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+    # When processing started; reset when a retry takes over a stale pending key
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+class Change(models.Model):
+    """One entry of the append-only change log, see api/changes.py."""
+    CREATE, UPDATE, DELETE = 'CREATE', 'UPDATE', 'DELETE'
+    ACTIONS = (
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    )
+    # The id doubles as the sync cursor, so it only ever grows
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    # Plain ids rather than foreign keys: entries outlive what they describe
+    hotel_id = models.BigIntegerField(blank=True, null=True)
+    # State after the change. Deletes keep the freed room and dates of a
+    # reservation and are empty otherwise.
+    data = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['hotel_id', 'id'], name='api_change_hotel_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model} {self.object_id}"
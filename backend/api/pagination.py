@@ -0,0 +1,38 @@
+from rest_framework.pagination import CursorPagination
+
+class ReservationHistoryPagination(CursorPagination):
+    """
+    Keyset pagination for a user's reservation history.
+
+    Each page is an index range scan on (user, check_in), so it costs the
+    same no matter how long the history is. Pagination is opt-in: it is only
+    applied when the client sends ``cursor`` or ``page_size``, so the plain
+    list response stays unchanged for existing callers.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-check_in', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # Follow the ordering chosen by the view for the requested status
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+class ReviewPagination(CursorPagination):
+    """
+    Newest-first pages of a hotel's reviews. Each page is a range scan on
+    the (hotel, created_at) index, so the 5000th page costs what the first
+    does; offsets would read and skip every review before it.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
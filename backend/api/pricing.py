@@ -0,0 +1,218 @@
+"""
+Occupancy-based nightly prices.
+
+A room's price for a night is its ``price_per_night`` times a multiplier
+read off ``PRICING_CURVES`` for the share of rooms of its type in the
+hotel already booked that night. Multipliers form a grid per hotel, room
+type and night that lives in the ``PRICING_CACHE`` cache, so serving a
+price is a cache read. The grid is filled lazily and, after every commit
+that books, moves or cancels a stay, recomputed for that stay's nights
+only; adding, removing or retyping a room starts a fresh grid for the type.
+
+Each process keeps its own grid unless ``PRICING_CACHE`` names a shared
+cache, in which case ``PRICING_CACHE_SECONDS`` bounds how stale another
+process's view can be.
+"""
+import hashlib
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .archive import is_archiving
+from .inventory import nights
+from .models import Reservation, Room
+
+DEFAULT_CURVE = ((0.5, '1.10'), (0.75, '1.25'), (0.9, '1.50'))
+CENT = Decimal('0.01')
+
+# Used when PRICING_CACHE names no configured cache
+_local_cache = LocMemCache('api-pricing', {})
+
+
+def get_pricing_cache():
+    alias = getattr(settings, 'PRICING_CACHE', 'default')
+    if alias in settings.CACHES:
+        return caches[alias]
+    return _local_cache
+
+
+def multiplier(room_type, occupancy):
+    """The multiplier of the highest curve step ``occupancy`` has reached."""
+    curves = getattr(settings, 'PRICING_CURVES', {})
+    curve = curves.get(room_type, curves.get('default', DEFAULT_CURVE))
+    factor = Decimal(1)
+    for threshold, step in sorted(curve):
+        if occupancy >= threshold:
+            factor = Decimal(step)
+    return factor
+
+
+def _generation_key(hotel_id, room_type):
+    return f'pricing:{hotel_id}:{room_type}'
+
+
+def _key(hotel_id, room_type, generation, night):
+    # Bumping the generation drops every cached night of the type at once
+    return f'pricing:{hotel_id}:{room_type}:{generation}:{night.isoformat()}'
+
+
+def _keys(hotel_id, room_type, stay, cache):
+    generation = cache.get(_generation_key(hotel_id, room_type), 0)
+    return {night: _key(hotel_id, room_type, generation, night) for night in stay}
+
+
+def _compute(hotel_id, room_type, stay):
+    """Multipliers for the nights in ``stay`` from the database."""
+    rooms = Room.objects.filter(hotel_id=hotel_id, room_type=room_type).count()
+    first, end = min(stay), max(stay) + timedelta(days=1)
+    sold = Counter()
+    for check_in, check_out in Reservation.objects.filter(
+        hotel_id=hotel_id, room_type=room_type, check_in__lt=end, check_out__gt=first,
+    ).values_list('check_in', 'check_out'):
+        sold.update(nights(max(check_in, first), min(check_out, end)))
+    return {night: multiplier(room_type, sold[night] / rooms if rooms else 0) for night in stay}
+
+
+def _compute_night(groups, night):
+    """Multipliers on ``night`` for ``(hotel_id, room_type)`` groups, in two queries."""
+    hotels = {hotel_id for hotel_id, _ in groups}
+    room_types = {room_type for _, room_type in groups}
+
+    def counts(queryset):
+        return Counter({
+            (row['hotel_id'], row['room_type']): row['count']
+            for row in queryset.filter(hotel_id__in=hotels, room_type__in=room_types)
+            .values('hotel_id', 'room_type').annotate(count=Count('id')).order_by()
+        })
+
+    rooms = counts(Room.objects.all())
+    sold = counts(Reservation.objects.filter(check_in__lte=night, check_out__gt=night))
+    return {
+        (hotel_id, room_type): multiplier(room_type, sold[hotel_id, room_type] / rooms[hotel_id, room_type]
+                                          if rooms[hotel_id, room_type] else 0)
+        for hotel_id, room_type in groups
+    }
+
+
+def multipliers(hotel_id, room_type, stay):
+    """``{night: multiplier}`` for the nights in ``stay``, from the grid where cached."""
+    cache = get_pricing_cache()
+    keys = _keys(hotel_id, room_type, stay, cache)
+    cached = cache.get_many(keys.values())
+    grid = {night: Decimal(cached[key]) for night, key in keys.items() if key in cached}
+    missing = [night for night in stay if night not in grid]
+    if missing:
+        computed = _compute(hotel_id, room_type, missing)
+        cache.set_many({keys[night]: str(factor) for night, factor in computed.items()}, _timeout())
+        grid.update(computed)
+    return grid
+
+
+def price(base, factor):
+    return (base * factor).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def nightly_prices(rooms, night):
+    """
+    Price on ``night`` for each of ``rooms``, given as ``(hotel_id,
+    room_type, price_per_night)``. The grid is read in one go, and hotels
+    and types missing from it are computed together.
+    """
+    groups = {(hotel_id, room_type) for hotel_id, room_type, _ in rooms}
+    cache = get_pricing_cache()
+    generations = cache.get_many([_generation_key(*group) for group in groups])
+    keys = {
+        group: _key(*group, generations.get(_generation_key(*group), 0), night)
+        for group in groups
+    }
+    cached = cache.get_many(keys.values())
+    factors = {group: Decimal(cached[key]) for group, key in keys.items() if key in cached}
+    missing = groups - factors.keys()
+    if missing:
+        computed = _compute_night(missing, night)
+        cache.set_many({keys[group]: str(factor) for group, factor in computed.items()}, _timeout())
+        factors.update(computed)
+    return [price(base, factors[hotel_id, room_type]) for hotel_id, room_type, base in rooms]
+
+
+def tonight_prices(rooms):
+    """``(room id, price tonight)`` for the ``rooms`` queryset."""
+    rows = list(rooms.values_list('id', 'hotel_id', 'room_type', 'price_per_night'))
+    return zip([row[0] for row in rows], nightly_prices([row[1:] for row in rows], timezone.localdate()))
+
+
+def price_digest(prices):
+    """Short digest of ``(room id, price)`` pairs, as prices or their API strings, for ETags."""
+    pairs = ','.join(f'{room_id}:{price}' for room_id, price in sorted(prices))
+    return hashlib.sha256(pairs.encode()).hexdigest()[:12]
+
+
+def reprice(hotel_id, room_type, check_in, check_out):
+    """Recompute the grid for the nights of one stay."""
+    stay = nights(check_in, check_out)
+    if not stay:
+        return
+    cache = get_pricing_cache()
+    keys = _keys(hotel_id, room_type, stay, cache)
+    cache.set_many({keys[night]: str(factor) for night, factor in _compute(hotel_id, room_type, stay).items()},
+                   _timeout())
+
+
+def touch(hotel_id, room_type, check_in, check_out):
+    """Reprice a stay's nights once the current transaction commits."""
+    if hotel_id is not None and room_type:
+        transaction.on_commit(partial(reprice, hotel_id, room_type, check_in, check_out))
+
+
+def _timeout():
+    return getattr(settings, 'PRICING_CACHE_SECONDS', 300)
+
+
+# Saves touching none of these leave occupancy alone, e.g. room assignment
+PRICED_FIELDS = {'hotel', 'room_type', 'check_in', 'check_out'}
+
+
+def _affects_occupancy(update_fields):
+    return update_fields is None or not PRICED_FIELDS.isdisjoint(update_fields)
+
+
+def _reservation_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The nights an edited stay gives up are repriced too
+    if not raw and instance.pk is not None and _affects_occupancy(update_fields):
+        old = Reservation.objects.filter(pk=instance.pk).values_list(
+            'hotel_id', 'room_type', 'check_in', 'check_out').first()
+        if old is not None and old != (instance.hotel_id, instance.room_type, instance.check_in, instance.check_out):
+            touch(*old)
+
+
+def _reservation_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _affects_occupancy(update_fields) and not is_archiving():
+        touch(instance.hotel_id, instance.room_type, instance.check_in, instance.check_out)
+
+
+def _room_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The room count behind every night of the type changed; the old type
+    # of a retyped room is left to expire
+    transaction.on_commit(partial(
+        get_pricing_cache().set, _generation_key(instance.hotel_id, instance.room_type), time.time_ns(), None,
+    ))
+
+
+def connect_signals():
+    pre_save.connect(_reservation_saving, sender=Reservation, dispatch_uid='pricing-reservation-pre-save')
+    post_save.connect(_reservation_changed, sender=Reservation, dispatch_uid='pricing-reservation-save')
+    post_delete.connect(_reservation_changed, sender=Reservation, dispatch_uid='pricing-reservation-delete')
+    post_save.connect(_room_changed, sender=Room, dispatch_uid='pricing-room-save')
+    post_delete.connect(_room_changed, sender=Room, dispatch_uid='pricing-room-delete')
@@ -0,0 +1,186 @@
+"""
+Structured request logs.
+
+``RequestLogMiddleware`` writes one JSON line per request to the
+``api.requests`` logger: the URL name as ``endpoint``, method, user id,
+status, latency and number of SQL queries. Only a share of requests is
+logged, set per URL name by ``REQUEST_LOG_SAMPLE_RATES`` (``'*'`` for the
+rest). Server errors and requests slower than ``REQUEST_LOG_SLOW_MS`` are
+always logged, at WARNING; slow ones come with their
+``REQUEST_LOG_TOP_SQL`` slowest statements (without parameters).
+
+Queries are counted with a database execute wrapper, so this works
+without ``DEBUG``; nothing is counted while the logger is off.
+
+``BackgroundHandler`` (see ``LOGGING`` in settings) only puts records on a
+queue; a thread formats and writes them, so a slow log destination never
+holds up a request. When the queue is full, records are dropped and
+counted in ``dropped``. ``dictConfig`` builds ``QueueHandler`` subclasses
+its own way, so settings create it through ``background_handler``.
+Unhandled view exceptions are logged with their traceback as ``exc``.
+"""
+import copy
+import heapq
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger('api.requests')
+
+SQL_MAX_LENGTH = 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the record's ``fields`` merged in."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """Write records to ``stream`` from a thread of their own."""
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Format on the writing thread; prepare() only merges the arguments
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # QueueHandler.prepare() formats with a default formatter and drops
+        # exc_info; only merge the arguments and render the traceback, now,
+        # while its frames are as they were
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip('\n')
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Called by logging.shutdown() at exit; writes out what is queued
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
+def background_handler(stream=None, maxsize=10000):
+    """``BackgroundHandler`` factory for ``LOGGING`` (``'()'``), see the module docstring."""
+    return BackgroundHandler(stream, maxsize)
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and keeping the slowest."""
+
+    def __init__(self, keep):
+        self.count = 0
+        self.keep = keep
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            entry = (time.perf_counter() - start, self.count, sql)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif self.keep:
+                heapq.heappushpop(self.slowest, entry)
+
+    def top(self):
+        return [
+            {'ms': round(seconds * 1000, 2), 'sql': sql[:SQL_MAX_LENGTH]}
+            for seconds, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+def sample_rate(endpoint):
+    rates = getattr(settings, 'REQUEST_LOG_SAMPLE_RATES', {})
+    return rates.get(endpoint, rates.get('*', 1.0))
+
+
+def _user_id(request):
+    user = getattr(request, 'user', None)
+    # Don't load a session user just to log it
+    if user is None or isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user.pk
+
+
+class RequestLogMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not logger.isEnabledFor(logging.WARNING):
+            return self.get_response(request)
+
+        request._log_exc_info = None
+        timer = QueryTimer(getattr(settings, 'REQUEST_LOG_TOP_SQL', 5))
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        endpoint = match.view_name if match else None
+        slow = latency_ms >= getattr(settings, 'REQUEST_LOG_SLOW_MS', 500)
+        if not (slow or response.status_code >= 500 or random.random() < sample_rate(endpoint)):
+            return response
+
+        fields = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'user_id': _user_id(request),
+            'status': response.status_code,
+            'latency_ms': round(latency_ms, 2),
+            'queries': timer.count,
+        }
+        if slow:
+            fields['slow_sql'] = timer.top()
+        level = logging.WARNING if slow or response.status_code >= 500 else logging.INFO
+        logger.log(level, '%s %s', request.method, endpoint,
+                   exc_info=request._log_exc_info, extra={'fields': fields})
+        return response
+
+    def process_exception(self, request, exception):
+        # Django turns the exception into a 500 response before __call__
+        # sees it; keep it for the log line
+        request._log_exc_info = (type(exception), exception, exception.__traceback__)
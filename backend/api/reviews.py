@@ -0,0 +1,51 @@
+"""
+Review statistics kept on ``Hotel``.
+
+``review_count``, ``review_total`` and ``review_average`` change by one
+review at a time: adding or removing a review is two single-row UPDATEs,
+whatever the number of reviews the hotel already has, so hotel lists can
+show and sort by the average without aggregating the reviews table. The
+average is recomputed from the stored count and total in a second
+statement rather than in the same one, because MySQL evaluates the
+assignments of one UPDATE left to right on the new values. The second
+statement also bumps the hotel's ``version`` so its ETag changes, and a
+``Change`` row is logged for sync clients, as a hotel edit would be.
+"""
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.signals import post_delete
+
+from .changes import record_changes
+from .models import Change, Hotel, Review
+
+
+def adjust(hotel_id, count, total):
+    """Add ``count`` reviews summing to ``total`` to a hotel (negative to remove)."""
+    hotel = Hotel.objects.filter(pk=hotel_id)
+    hotel.update(review_count=F('review_count') + count, review_total=F('review_total') + total)
+    hotel.update(review_average=Case(
+        When(review_count=0, then=Value(0.0)),
+        default=Round(Cast('review_total', FloatField()) / F('review_count'), 2),
+    ), version=F('version') + 1)
+    record_changes(hotel, Change.UPDATE)
+
+
+def recount(hotel):
+    """Recompute a hotel's statistics from its reviews, e.g. after a bulk import."""
+    stats = Review.objects.filter(hotel=hotel).aggregate(count=Count('id'), total=Sum('rating'))
+    count, total = stats['count'], stats['total'] or 0
+    hotels = Hotel.objects.filter(pk=hotel.pk)
+    hotels.update(
+        review_count=count, review_total=total, review_average=round(total / count, 2) if count else 0,
+        version=F('version') + 1,
+    )
+    record_changes(hotels, Change.UPDATE)
+
+
+def _deleted(sender, instance, **kwargs):
+    # Also covers reviews removed by deleting their user
+    adjust(instance.hotel_id, -1, -instance.rating)
+
+
+def connect_signals():
+    post_delete.connect(_deleted, sender=Review, dispatch_uid='reviews-delete')
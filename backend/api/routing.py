@@ -0,0 +1,75 @@
+"""
+URL patterns whose views are imported on their first request.
+
+``include('api.urls')`` would otherwise import every view module, and with
+them DRF, SimpleJWT and each view's helpers, before the first response.
+``viewset_urls`` builds the same list/detail routes and names as DRF's
+``DefaultRouter`` without importing the viewset; tests/test_routing.py
+checks the two stay in sync.
+"""
+from django.urls import re_path
+from django.utils.module_loading import import_string
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+class LazyView:
+    """A view callable that imports ``path`` the first time it is called."""
+
+    # Every lazily routed view is a DRF view (csrf exempt) or GET-only
+    csrf_exempt = True
+
+    def __init__(self, path, actions=None, **initkwargs):
+        self.path = path
+        self.actions = actions
+        self.initkwargs = initkwargs
+        self._view = None
+
+    @property
+    def view(self):
+        if self._view is None:
+            target = import_string(self.path)
+            if self.actions is not None:
+                # as_view keeps (and DRF later mutates) the mapping, so pass a copy
+                actions, initkwargs = dict(self.actions), self.initkwargs
+                extra = getattr(target, next(iter(actions.values())), None)
+                if hasattr(extra, 'mapping'):
+                    # An @action: take its methods and options from the decorator
+                    actions = dict(extra.mapping)
+                    initkwargs = {**extra.kwargs, **initkwargs}
+                self._view = target.as_view(actions, **initkwargs)
+            elif hasattr(target, 'as_view'):
+                self._view = target.as_view(**self.initkwargs)
+            else:
+                self._view = target
+        return self._view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __repr__(self):
+        return f'<LazyView {self.path}>'
+
+
+def viewset_urls(prefix, path, basename, list_actions=LIST_ACTIONS, detail_actions=DETAIL_ACTIONS, extra=()):
+    """
+    Routes for a viewset, as ``DefaultRouter.register(prefix, viewset, basename)``
+    would create them. ``extra`` lists ``(url_path, action, detail)`` for
+    ``@action`` methods; their HTTP methods are read from the decorator.
+    """
+    urls = []
+    for url_path, action, detail in extra:
+        if detail:
+            regex = rf'^{prefix}/(?P<pk>[^/.]+)/{url_path}/$'
+        else:
+            regex = rf'^{prefix}/{url_path}/$'
+        urls.append(re_path(regex, LazyView(path, {'get': action}, basename=basename, detail=detail),
+                            name=f'{basename}-{url_path}'))
+    if list_actions:
+        urls.append(re_path(rf'^{prefix}/$', LazyView(path, list_actions, basename=basename, detail=False, suffix='List'),
+                            name=f'{basename}-list'))
+    if detail_actions:
+        urls.append(re_path(rf'^{prefix}/(?P<pk>[^/.]+)/$', LazyView(path, detail_actions, basename=basename, detail=True, suffix='Instance'),
+                            name=f'{basename}-detail'))
+    return urls
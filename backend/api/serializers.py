@@ -1,8 +1,73 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Hotel, Room, Reservation
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db.models import Q
+from django.db.models.manager import BaseManager
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Hotel, Room, Itinerary, Reservation, ArchivedReservation, Review, SimilarHotel, WaitlistEntry
+from .booking import book_itinerary
+from .images import image_storage
+from .inventory import SoldOut, claim, release
+from .pricing import nightly_prices
+from .reviews import adjust
+from .waitlist import max_nights
 from datetime import date
 
+class StoredFileURLField(serializers.Field):
+    """
+    Read-only URL of a stored file. Accepts a ``FieldFile`` or the raw file
+    name returned by ``values()``, so it also works on the list fast path.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        name = getattr(value, 'name', value)
+        return image_storage.url(name) if name else None
+
+class SrcsetField(serializers.Field):
+    """Read-only ``srcset`` string built from a ``{width: file name}`` map."""
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return ', '.join(
+            f'{image_storage.url(name)} {width}w'
+            for width, name in sorted(value.items(), key=lambda item: int(item[0]))
+        )
+
+class NightlyPriceField(serializers.DecimalField):
+    """
+    Read-only price of a room tonight from the occupancy price grid, see
+    api/pricing.py. On the list fast path the row carries ``values_lookups``
+    and ``represent_values`` prices a whole page with one grid lookup per
+    hotel and room type.
+    """
+    values_lookups = ('hotel_id', 'room_type', 'price_per_night')
+
+    def __init__(self, **kwargs):
+        kwargs.update(read_only=True, source='*', max_digits=10, decimal_places=2)
+        super().__init__(**kwargs)
+
+    def to_representation(self, room):
+        # Set by RoomListSerializer for every room of a list
+        price = getattr(room, 'nightly_price', None)
+        if price is None:
+            [price] = nightly_prices([(room.hotel_id, room.room_type, room.price_per_night)], timezone.localdate())
+        return super().to_representation(price)
+
+    def represent_values(self, rows):
+        prices = nightly_prices(
+            [(row['hotel_id'], row['room_type'], row['price_per_night']) for row in rows], timezone.localdate()
+        )
+        represent = super().to_representation
+        return [represent(price) for price in prices]
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     date_of_birth = serializers.DateField(write_only=True)
@@ -11,18 +76,8 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'password', 'first_name', 'last_name', 'date_of_birth', 'is_staff')
         read_only_fields = ('is_staff',)
-    
-    def validate_email(self, value):
-        """Validate that email is unique"""
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-    
-    def validate_username(self, value):
-        """Validate that username is unique"""
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-        return value
+        # Uniqueness is checked once for both fields in validate()
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
     
     def validate_password(self, value):
         min_length = 8
@@ -40,51 +95,255 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("You must be at least 18 years old to register.")
         
         return value
+
+    def validate(self, data):
+        """Validate that username and email are unique, in one query"""
+        username = data.get('username')
+        # Compare with the address as create_user will store it
+        email = data['email'] = User.objects.normalize_email(data.get('email'))
+        taken = Q(username=username)
+        if email:
+            taken |= Q(email=email)
+        errors = {}
+        for existing_username, existing_email in User.objects.filter(taken).values_list('username', 'email')[:2]:
+            if existing_username == username:
+                errors['username'] = "A user with this username already exists."
+            if email and existing_email == email:
+                errors['email'] = "A user with this email already exists."
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
     
     def create(self, validated_data):
         # Remove date_of_birth from validated_data as it's not a User model field
         validated_data.pop('date_of_birth', None)
-        
-        user = User.objects.create_user(**validated_data)
-        # Ensure new users are NOT staff/admin by default
-        user.is_staff = False
-        user.is_superuser = False
-        user.save()
-        return user
+
+        # New users are never staff; create_user leaves is_staff and
+        # is_superuser False, so this is a single INSERT
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(**validated_data)
+        except IntegrityError as exc:
+            # Lost a race with a concurrent signup; the unique constraints decide
+            for field in ('username', 'email'):
+                if field in str(exc):
+                    raise serializers.ValidationError({field: f"A user with this {field} already exists."})
+            raise
+
+class RoomListSerializer(serializers.ListSerializer):
+    """Prices all the rooms with one ``nightly_prices`` call, e.g. a hotel's."""
+    def to_representation(self, data):
+        rooms = list(data.all() if isinstance(data, BaseManager) else data)
+        prices = nightly_prices([(room.hotel_id, room.room_type, room.price_per_night) for room in rooms],
+                                timezone.localdate())
+        for room, price in zip(rooms, prices):
+            room.nightly_price = price
+        return super().to_representation(rooms)
 
 class RoomSerializer(serializers.ModelSerializer):
+    # price_per_night adjusted for how full the hotel is tonight
+    current_price = NightlyPriceField()
+
     class Meta:
         model = Room
         fields = '__all__'
+        list_serializer_class = RoomListSerializer
 
 class HotelSerializer(serializers.ModelSerializer):
     rooms = RoomSerializer(many=True, read_only=True)
+    photo = serializers.ImageField(write_only=True, required=False, allow_null=True)
+    photo_url = StoredFileURLField(source='photo')
+    photo_srcset = SrcsetField(source='thumbnails')
+
     class Meta:
         model = Hotel
-        fields = '__all__'
+        exclude = ('thumbnails',)
+
+class SimilarHotelSerializer(serializers.ModelSerializer):
+    """A hotel card for the "similar hotels" strip, see api/similarity.py."""
+    id = serializers.IntegerField(source='similar_id', read_only=True)
+    name = serializers.CharField(source='similar.name', read_only=True)
+    address = serializers.CharField(source='similar.address', read_only=True)
+    image = serializers.URLField(source='similar.image', read_only=True)
+    photo_url = StoredFileURLField(source='similar.photo')
+    rating = serializers.DecimalField(source='similar.rating', max_digits=3, decimal_places=1, read_only=True)
+    review_average = serializers.FloatField(source='similar.review_average', read_only=True)
+
+    class Meta:
+        model = SimilarHotel
+        fields = ('id', 'name', 'address', 'image', 'photo_url', 'rating', 'review_average', 'score')
 
 class ReservationSerializer(serializers.ModelSerializer):
+    room_number = serializers.CharField(source='room.room_number', read_only=True, allow_null=True)
+    hotel_name = serializers.CharField(source='hotel.name', read_only=True)
+
     class Meta:
         model = Reservation
         fields = '__all__'
-        read_only_fields = ('user',)
+        read_only_fields = ('user', 'itinerary')
+        # Taken from the room when one is chosen
+        extra_kwargs = {'hotel': {'required': False}, 'room_type': {'required': False}}
 
     def validate(self, data):
-        check_in = data['check_in']
-        check_out = data['check_out']
-        room = data['room']
+        # Partial updates fall back to the stored values
+        check_in = data.get('check_in', getattr(self.instance, 'check_in', None))
+        check_out = data.get('check_out', getattr(self.instance, 'check_out', None))
+        room = data.get('room', getattr(self.instance, 'room', None))
 
         if check_in >= check_out:
             raise serializers.ValidationError("Check-in must be before check-out")
 
-        # Check for overlaps
+        if 'room' in data and room is None and getattr(self.instance, 'room_id', None) is not None:
+            # Rooms are handed out by the hotel (api/inventory.py, api/assignment.py)
+            raise serializers.ValidationError({'room': "A booked room can't be given back; choose another room or cancel."})
+
+        if room is None:
+            # A room-type booking; a room is assigned later, see api/inventory.py
+            hotel = data.get('hotel', getattr(self.instance, 'hotel', None))
+            room_type = data.get('room_type', getattr(self.instance, 'room_type', ''))
+            if hotel is None or not room_type:
+                raise serializers.ValidationError("Choose a room, or a hotel and a room type.")
+            if not hotel.inventory_by_type:
+                raise serializers.ValidationError("This hotel books specific rooms; choose a room.")
+            return data
+        if 'room' in data:
+            data['hotel'] = room.hotel
+            data['room_type'] = room.room_type
+
+        # Check for overlaps, ignoring the reservation being edited
         overlaps = Reservation.objects.filter(
             room=room,
             check_in__lt=check_out,
             check_out__gt=check_in
-        ).exists()
+        )
+        if self.instance is not None:
+            overlaps = overlaps.exclude(pk=self.instance.pk)
 
-        if overlaps:
+        if overlaps.exists():
             raise serializers.ValidationError("Room is already booked for these dates.")
         
         return data
+
+    def create(self, validated_data):
+        # A concurrent booking can slip in between validate() and the INSERT;
+        # the database constraints catch it.
+        try:
+            with transaction.atomic():
+                claim(validated_data['hotel'], validated_data['room_type'],
+                      validated_data['check_in'], validated_data['check_out'])
+                return super().create(validated_data)
+        except SoldOut as exc:
+            raise serializers.ValidationError(str(exc))
+        except IntegrityError as exc:
+            if 'api_res_' not in str(exc):
+                raise
+            raise serializers.ValidationError("Room is already booked for these dates.")
+
+    def update(self, instance, validated_data):
+        old_hotel, old_stay = instance.hotel, (instance.room_type, instance.check_in, instance.check_out)
+        try:
+            with transaction.atomic():
+                if old_hotel.inventory_by_type:
+                    release(old_hotel.pk, *old_stay)
+                reservation = super().update(instance, validated_data)
+                claim(reservation.hotel, reservation.room_type, reservation.check_in, reservation.check_out)
+                return reservation
+        except SoldOut as exc:
+            raise serializers.ValidationError(str(exc))
+
+class ArchivedReservationSerializer(serializers.ModelSerializer):
+    # Same shape as ReservationSerializer, keyed by the original reservation id
+    id = serializers.IntegerField(source='original_id', read_only=True)
+
+    class Meta:
+        model = ArchivedReservation
+        fields = ('id', 'user', 'room', 'room_number', 'hotel', 'hotel_name',
+                  'itinerary', 'check_in', 'check_out', 'created_at', 'archived_at')
+        read_only_fields = fields
+
+class ItinerarySegmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reservation
+        fields = ('id', 'room', 'check_in', 'check_out')
+        # Reservation.room is nullable for room-type bookings; segments are
+        # always booked by room, see api/booking.py
+        extra_kwargs = {'room': {'required': True, 'allow_null': False}}
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-in must be before check-out")
+        return data
+
+class ItinerarySerializer(serializers.ModelSerializer):
+    reservations = ItinerarySegmentSerializer(many=True)
+
+    class Meta:
+        model = Itinerary
+        fields = ('id', 'reservations', 'created_at')
+
+    def validate_reservations(self, value):
+        if not value:
+            raise serializers.ValidationError("An itinerary needs at least one reservation.")
+        return value
+
+    def create(self, validated_data):
+        return book_itinerary(validated_data['user'], validated_data['reservations'])
+
+class ReviewSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ('id', 'hotel', 'reservation', 'username', 'rating', 'comment', 'created_at')
+        read_only_fields = ('hotel',)
+        # Uniqueness is checked once, with a friendlier message, in validate_reservation()
+        extra_kwargs = {'reservation': {'required': True, 'allow_null': False, 'validators': []}}
+
+    def validate_reservation(self, reservation):
+        request = self.context['request']
+        if reservation.user_id != request.user.id:
+            raise serializers.ValidationError("You can only review your own stays.")
+        if reservation.check_out > date.today():
+            raise serializers.ValidationError("You can review a stay once it is over.")
+        if Review.objects.filter(reservation=reservation).exists():
+            raise serializers.ValidationError("This stay has already been reviewed.")
+        return reservation
+
+    def create(self, validated_data):
+        validated_data['hotel_id'] = validated_data['reservation'].hotel_id
+        try:
+            with transaction.atomic():
+                review = super().create(validated_data)
+                adjust(review.hotel_id, 1, review.rating)
+        except IntegrityError as exc:
+            if 'reservation' not in str(exc):
+                raise
+            raise serializers.ValidationError({'reservation': "This stay has already been reviewed."})
+        return review
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = ('id', 'hotel', 'room', 'check_in', 'check_out', 'status', 'offered_room', 'offered_at', 'created_at')
+        read_only_fields = ('status', 'offered_room', 'offered_at')
+        extra_kwargs = {'hotel': {'required': False}}
+
+    def validate(self, data):
+        room = data.get('room')
+        hotel = data.get('hotel')
+
+        if room is None and hotel is None:
+            raise serializers.ValidationError("Either a room or a hotel is required.")
+        if room is not None:
+            if hotel is not None and room.hotel_id != hotel.id:
+                raise serializers.ValidationError("Room does not belong to this hotel.")
+            data['hotel'] = room.hotel
+
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-in must be before check-out")
+
+        # Matching relies on this bound, see api/waitlist.py
+        if (data['check_out'] - data['check_in']).days > max_nights():
+            raise serializers.ValidationError(f"Waitlisted stays are limited to {max_nights()} nights.")
+
+        return data
@@ -0,0 +1,207 @@
+"""
+"Similar hotels", precomputed.
+
+``build`` turns every hotel into a feature vector: its price level, room
+type mix, room size and count, rating, and hashed words of its
+description. The vectors are stored as packed float32 in
+``HotelFeatures``, and each hotel's ``top`` nearest neighbours by cosine
+similarity go to ``SimilarHotel``. The API then serves a hotel's similar
+hotels with one lookup on the ``(hotel, rank)`` index.
+
+Numeric features are standardized over all hotels so that each one counts
+by how far a hotel is from the typical one, then each group is weighted by
+``WEIGHTS``. Similarities are computed as a blocked matrix product when
+numpy is installed, and with plain Python otherwise, which is quadratic in
+the number of hotels and only meant for small installations.
+
+The results are as fresh as the last run of the ``build_similar_hotels``
+command, e.g. nightly.
+"""
+import heapq
+import math
+import re
+import zlib
+from array import array
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+
+from .models import Hotel, HotelFeatures, Room, SimilarHotel
+
+TOP = 10
+TEXT_DIMENSIONS = 64
+# Relative weight of each group of features in the similarity
+WEIGHTS = {'price': 1.0, 'mix': 1.0, 'size': 0.5, 'rating': 0.5, 'text': 1.0}
+# Hotels compared per matrix product on the numpy path
+BLOCK = 256
+
+ROOM_TYPES = [room_type for room_type, _ in Room.ROOM_TYPES]
+WORD = re.compile(r'[a-z]{3,}')
+STOP_WORDS = frozenset(
+    'and are but for from has have its our the this that with you your all any can near more very'.split()
+)
+
+
+def words(text):
+    return [word for word in WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def _bucket(word):
+    # crc32 rather than hash(), which differs between processes
+    digest = zlib.crc32(word.encode())
+    return digest % TEXT_DIMENSIONS, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _text_features(descriptions):
+    """Hashed TF-IDF vectors of unit length, one per description."""
+    counts = []
+    document_frequency = Counter()
+    for description in descriptions:
+        buckets = Counter()
+        for word in words(description):
+            buckets[_bucket(word)] += 1
+        counts.append(buckets)
+        document_frequency.update({index for index, _ in buckets})
+    n = len(descriptions)
+    vectors = []
+    for buckets in counts:
+        vector = [0.0] * TEXT_DIMENSIONS
+        for (index, sign), count in buckets.items():
+            idf = math.log((1 + n) / (1 + document_frequency[index])) + 1
+            vector[index] += sign * (1 + math.log(count)) * idf
+        vectors.append(_unit(vector))
+    return vectors
+
+
+def _standardize(column):
+    mean = sum(column) / len(column)
+    deviation = math.sqrt(sum((value - mean) ** 2 for value in column) / len(column))
+    return [(value - mean) / deviation if deviation else 0.0 for value in column]
+
+
+def _unit(vector):
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+def feature_vectors(hotels, room_stats):
+    """
+    ``{hotel id: [float, ...]}`` for ``hotels``, dicts with ``id``,
+    ``description``, ``rating``, ``review_count`` and ``review_average``.
+    ``room_stats`` maps ``(hotel id, room type)`` to the type's room count,
+    average price and total capacity.
+    """
+    if not hotels:
+        return {}
+    price, rooms, guests, rating, mix = [], [], [], [], []
+    for hotel in hotels:
+        stats = [room_stats.get((hotel['id'], room_type), (0, 0, 0)) for room_type in ROOM_TYPES]
+        count = sum(n for n, _, _ in stats)
+        average = sum(n * float(mean or 0) for n, mean, _ in stats) / count if count else 0.0
+        price.append(math.log1p(average))
+        rooms.append(math.log1p(count))
+        guests.append(sum(capacity or 0 for _, _, capacity in stats) / count if count else 0.0)
+        # Guests' ratings once there are any, the listed rating until then
+        rating.append(hotel['review_average'] if hotel['review_count'] else float(hotel['rating']))
+        mix.append([n / count if count else 0.0 for n, _, _ in stats])
+    price, rooms, guests, rating = map(_standardize, (price, rooms, guests, rating))
+    text = _text_features([hotel['description'] for hotel in hotels])
+
+    vectors = {}
+    for i, hotel in enumerate(hotels):
+        vectors[hotel['id']] = (
+            [WEIGHTS['price'] * price[i]]
+            + [WEIGHTS['mix'] * share for share in mix[i]]
+            + [WEIGHTS['size'] * rooms[i], WEIGHTS['size'] * guests[i]]
+            + [WEIGHTS['rating'] * rating[i]]
+            + [WEIGHTS['text'] * value for value in text[i]]
+        )
+    return vectors
+
+
+def pack(vector):
+    return array('f', vector).tobytes()
+
+
+def unpack(data):
+    vector = array('f')
+    vector.frombytes(bytes(data))
+    return vector
+
+
+def _ranked(candidates, top):
+    # Best score first, lower hotel id on ties; unrelated hotels are left out
+    return [(hotel_id, -score) for score, hotel_id in heapq.nsmallest(
+        top, ((-score, hotel_id) for hotel_id, score in candidates if score > 0)
+    )]
+
+
+def _neighbours_python(ids, vectors, top):
+    units = [_unit(list(vectors[hotel_id])) for hotel_id in ids]
+    neighbours = {}
+    for i, hotel_id in enumerate(ids):
+        vector = units[i]
+        neighbours[hotel_id] = _ranked(
+            ((other, sum(a * b for a, b in zip(vector, units[j]))) for j, other in enumerate(ids) if j != i), top
+        )
+    return neighbours
+
+
+def _neighbours_numpy(np, ids, vectors, top):
+    matrix = np.array([vectors[hotel_id] for hotel_id in ids], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    keep = min(top, len(ids) - 1)
+    neighbours = {}
+    for start in range(0, len(ids), BLOCK):
+        scores = matrix[start:start + BLOCK] @ matrix.T
+        rows = np.arange(scores.shape[0])
+        scores[rows, rows + start] = -np.inf
+        # The best `keep` of each row, unordered; _ranked sorts them
+        best = np.argpartition(-scores, keep - 1, axis=1)[:, :keep] if keep else np.empty((len(rows), 0), int)
+        for row, columns in zip(rows, best):
+            neighbours[ids[start + row]] = _ranked(
+                ((ids[column], float(scores[row, column])) for column in columns), top
+            )
+    return neighbours
+
+
+def nearest(vectors, top=TOP):
+    """``{hotel id: [(similar hotel id, cosine similarity), ...]}``, most similar first."""
+    ids = sorted(vectors)
+    try:
+        import numpy as np
+    except ImportError:
+        return _neighbours_python(ids, vectors, top)
+    return _neighbours_numpy(np, ids, vectors, top)
+
+
+def build(top=TOP, batch_size=1000):
+    """Recompute every hotel's features and similar hotels; returns the number of hotels."""
+    hotels = list(Hotel.objects.values('id', 'description', 'rating', 'review_count', 'review_average'))
+    room_stats = {
+        (row['hotel_id'], row['room_type']): (row['rooms'], row['price'], row['guests'])
+        for row in Room.objects.values('hotel_id', 'room_type').annotate(
+            rooms=Count('id'), price=Avg('price_per_night'), guests=Sum('capacity'),
+        ).order_by()
+    }
+    # Round through float32 so the neighbours match the stored vectors
+    vectors = {hotel_id: unpack(pack(vector)) for hotel_id, vector in feature_vectors(hotels, room_stats).items()}
+    neighbours = nearest(vectors, top)
+    with transaction.atomic():
+        HotelFeatures.objects.all().delete()
+        HotelFeatures.objects.bulk_create(
+            [HotelFeatures(hotel_id=hotel_id, vector=pack(vector)) for hotel_id, vector in vectors.items()],
+            batch_size=batch_size,
+        )
+        SimilarHotel.objects.all().delete()
+        SimilarHotel.objects.bulk_create(
+            [
+                SimilarHotel(hotel_id=hotel_id, similar_id=similar_id, rank=rank, score=round(score, 4))
+                for hotel_id, similar in neighbours.items()
+                for rank, (similar_id, score) in enumerate(similar, 1)
+            ],
+            batch_size=batch_size,
+        )
+    return len(vectors)
@@ -0,0 +1,29 @@
+"""
+Side effects run by the background worker. Queue them with api.jobs.enqueue.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .models import Reservation
+
+
+def send_booking_confirmation(reservation_id):
+    reservation = Reservation.objects.select_related('user', 'room', 'hotel').filter(pk=reservation_id).first()
+    if reservation is None or not reservation.user.email:
+        # Cancelled before the worker got to it, or nowhere to send it
+        return
+    if reservation.room is not None:
+        room = f"room {reservation.room.room_number}"
+    else:
+        # Room-type booking; the room is assigned closer to arrival
+        room = f"a {reservation.get_room_type_display().lower()} room"
+    send_mail(
+        subject=f"Your booking at {reservation.hotel.name}",
+        message=(
+            f"Hi {reservation.user.first_name or reservation.user.username},\n\n"
+            f"Your reservation #{reservation.id} for {room} "
+            f"from {reservation.check_in} to {reservation.check_out} is confirmed."
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[reservation.user.email],
+    )
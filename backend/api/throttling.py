@@ -0,0 +1,97 @@
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# Used when THROTTLE_CACHE names no configured cache, or that cache is down
+_local_cache = LocMemCache('api-throttle', {})
+
+
+def get_throttle_cache():
+    alias = getattr(settings, 'THROTTLE_CACHE', 'default')
+    if alias in settings.CACHES:
+        return caches[alias]
+    return _local_cache
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle keyed by the view's ``throttle_scope``.
+
+    Rates come from ``DEFAULT_THROTTLE_RATES`` under ``<scope>_<kind>``
+    (e.g. ``register_ip``) using DRF's ``N/period`` format: the bucket holds
+    N tokens and refills N per period. A scope without a configured rate is
+    not throttled.
+
+    The bucket is stored as a single timestamp (GCRA, the "virtual
+    scheduling" form of a token bucket), so a request costs one cache read,
+    plus one write only when it is admitted. Concurrent requests may race
+    between the read and the write; that lets a burst overshoot by at most a
+    token or two, which is fine for abuse protection.
+    """
+    kind = None
+
+    def __init__(self):
+        # The scope is only known once we see the view, see allow_request()
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return True
+
+        self.scope = f'{scope}_{self.kind}'
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        num_requests, duration = self.parse_rate(rate)
+        if num_requests is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        interval = duration / num_requests
+        now = self.timer()
+        cache = get_throttle_cache()
+        try:
+            arrival = cache.get(self.key)
+        except Exception:
+            cache = _local_cache
+            arrival = cache.get(self.key)
+
+        # "Theoretical arrival time": when the bucket would be full again
+        arrival = max(arrival or now, now) + interval
+        allowed_at = arrival - duration
+        if now < allowed_at:
+            self.wait_seconds = allowed_at - now
+            return False
+
+        try:
+            cache.set(self.key, arrival, math.ceil(arrival - now))
+        except Exception:
+            _local_cache.set(self.key, arrival, math.ceil(arrival - now))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Limit requests per client IP address."""
+    kind = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Limit requests per authenticated user; anonymous requests are left to the IP throttle."""
+    kind = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
@@ -1,20 +1,31 @@
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
-from .views import RegisterView, HotelViewSet, RoomViewSet, ReservationViewSet, CurrentUserView
-
-router = DefaultRouter()
-router.register(r'hotels', HotelViewSet, basename='hotel')
-router.register(r'rooms', RoomViewSet, basename='room')
-router.register(r'reservations', ReservationViewSet, basename='reservation')
+from django.urls import path
+from .routing import LazyView, viewset_urls
 
+# Views are imported on their first request, see api/routing.py
 urlpatterns = [
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('register/', RegisterView.as_view(), name='auth_register'),
-    path('me/', CurrentUserView.as_view(), name='current_user'),
-    path('', include(router.urls)),
+    path('token/', LazyView('api.views.ThrottledTokenObtainPairView'), name='token_obtain_pair'),
+    path('token/refresh/', LazyView('rest_framework_simplejwt.views.TokenRefreshView'), name='token_refresh'),
+    path('register/', LazyView('api.views.RegisterView'), name='auth_register'),
+    path('me/', LazyView('api.views.CurrentUserView'), name='current_user'),
+    path('changes/', LazyView('api.views.ChangeFeedView'), name='change_feed'),
+    path('hotels/<int:pk>/availability/stream/', LazyView('api.live.availability_stream'), name='hotel_availability_stream'),
+    *viewset_urls('hotels', 'api.views.HotelViewSet', 'hotel',
+                  extra=[('availability', 'availability', True), ('similar', 'similar', True)]),
+    *viewset_urls('rooms', 'api.views.RoomViewSet', 'room'),
+    *viewset_urls('reservations', 'api.views.ReservationViewSet', 'reservation',
+                  extra=[('archived', 'archived', False)]),
+    *viewset_urls('itineraries', 'api.views.ItineraryViewSet', 'itinerary',
+                  detail_actions={'get': 'retrieve', 'delete': 'destroy'}),
+    *viewset_urls('waitlist', 'api.views.WaitlistViewSet', 'waitlist',
+                  detail_actions={'get': 'retrieve', 'delete': 'destroy'}),
+    *viewset_urls('reviews', 'api.views.ReviewViewSet', 'review',
+                  detail_actions={'get': 'retrieve', 'delete': 'destroy'}),
+    path('', LazyView('rest_framework.routers.APIRootView', api_root_dict={
+        'hotels': 'hotel-list',
+        'rooms': 'room-list',
+        'reservations': 'reservation-list',
+        'itineraries': 'itinerary-list',
+        'waitlist': 'waitlist-list',
+        'reviews': 'review-list',
+    }), name='api-root'),
 ]
@@ -1,15 +1,59 @@
-from rest_framework import viewsets, generics
+from rest_framework import viewsets, generics, mixins
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from .models import Hotel, Room, Reservation
-from .serializers import HotelSerializer, RoomSerializer, ReservationSerializer, UserSerializer
+from django.db import transaction
+from django.utils import timezone
+from datetime import date
+from .models import Hotel, Room, Itinerary, Reservation, ArchivedReservation, Review, SimilarHotel, WaitlistEntry
+from .serializers import (
+    HotelSerializer, RoomSerializer, ReservationSerializer, UserSerializer,
+    ItinerarySerializer, WaitlistEntrySerializer, ArchivedReservationSerializer, ReviewSerializer,
+    SimilarHotelSerializer,
+)
+from .fast_serializers import get_values_serializer
+from .pagination import ReservationHistoryPagination, ReviewPagination
+from .throttling import IPTokenBucketThrottle, UserTokenBucketThrottle
+from .waitlist import freed_ranges, offer_freed_nights
+from .jobs import enqueue
+from .idempotency import IdempotentCreateMixin
+from .geo import nearby
+from .images import queue_thumbnails
+from .concurrency import VersionedUpdateMixin
+from .changes import changes_since, compact
+from .inventory import availability, rebuild
+from .pricing import price_digest, tonight_prices
+from .tasks import send_booking_confirmation
 
-class RegisterView(generics.CreateAPIView):
+class ValuesListMixin:
+    """
+    Serve the ``list`` action from ``values()`` rows instead of model
+    instances, skipping per-field DRF machinery. Output is unchanged.
+    """
+    def list(self, request, *args, **kwargs):
+        fast = get_values_serializer(self.get_serializer_class())
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.represent(page))
+        return Response(fast.represent(queryset))
+
+class RegisterView(IdempotentCreateMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = UserSerializer
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'register'
+
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    # Every login attempt runs check_password, so cap attempts per IP
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'token'
 
 class CurrentUserView(APIView):
     permission_classes = [IsAuthenticated]
@@ -18,21 +62,135 @@ class CurrentUserView(APIView):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
-class HotelViewSet(viewsets.ModelViewSet):
+class ChangeFeedView(APIView):
+    """
+    Creates, updates and deletes of hotels, rooms and reservations after
+    ``?since=<cursor>`` (``0`` for everything). Only the latest change per
+    object in a page is returned. Pass the returned ``cursor`` back to get
+    the next batch; ``has_more`` says whether to ask again right away.
+    """
+    permission_classes = [AllowAny]
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 1000
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            cursor = int(params.get('since', 0))
+            limit = min(int(params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            hotel = int(params['hotel']) if 'hotel' in params else None
+        except ValueError:
+            raise ValidationError('since, limit and hotel must be integers.')
+        if cursor < 0 or limit < 1:
+            raise ValidationError('since must be >= 0 and limit >= 1.')
+
+        rows, has_more = changes_since(cursor, limit, hotel_id=hotel)
+        return Response({
+            'changes': compact(rows),
+            'cursor': str(rows[-1]['id'] if rows else cursor),
+            'has_more': has_more,
+        })
+
+class HotelViewSet(VersionedUpdateMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and self.request.query_params.get('ordering') == 'rating':
+            # Best reviewed first, from the stored averages (api/reviews.py)
+            queryset = queryset.order_by('-review_average', '-review_count', 'id')
+        return queryset
     
+    def live_etag(self, pk, data=None):
+        # Tonight's prices of the nested rooms
+        if data is not None:
+            return price_digest((room['id'], room['current_price']) for room in data['rooms'])
+        return price_digest(tonight_prices(Room.objects.filter(hotel_id=pk)))
+
     def get_permissions(self):
         # Allow anyone to read (list, retrieve), but only staff can create/update/delete
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'availability', 'similar']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
-class RoomViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_create(self, serializer):
+        hotel = serializer.save()
+        if hotel.photo:
+            queue_thumbnails(hotel)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_photo = serializer.instance.photo.name
+        was_by_type = serializer.instance.inventory_by_type
+        super().perform_update(serializer)
+        hotel = serializer.instance
+        if hotel.photo.name != old_photo:
+            queue_thumbnails(hotel)
+        if hotel.inventory_by_type and not was_by_type:
+            rebuild(hotel)
+
+    @action(detail=True)
+    def availability(self, request, pk=None):
+        """Rooms left per room type for ``?check_in=&check_out=``."""
+        hotel = self.get_object()
+        try:
+            check_in = date.fromisoformat(request.query_params['check_in'])
+            check_out = date.fromisoformat(request.query_params['check_out'])
+        except (KeyError, ValueError):
+            raise ValidationError('check_in and check_out must be dates in YYYY-MM-DD format.')
+        if check_in >= check_out:
+            raise ValidationError('Check-in must be before check-out')
+        left = availability(hotel, check_in, check_out)
+        return Response({room_type: left.get(room_type, 0) for room_type, _ in Room.ROOM_TYPES})
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Precomputed most similar hotels, best first, see api/similarity.py."""
+        # One indexed lookup; unknown hotels and ones not yet computed have none
+        if not pk.isdigit():
+            raise NotFound()
+        queryset = SimilarHotel.objects.filter(hotel_id=pk).select_related('similar').order_by('rank')
+        return Response(SimilarHotelSerializer(queryset, many=True).data)
+
+    def list(self, request, *args, **kwargs):
+        near = request.query_params.get('near')
+        if near is None:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            lat, lng = (float(part) for part in near.split(','))
+        except ValueError:
+            raise ValidationError({'near': 'Expected "lat,lng".'})
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValidationError({'near': 'Coordinates out of range.'})
+        try:
+            radius_km = float(request.query_params.get('radius_km', 10))
+        except ValueError:
+            raise ValidationError({'radius_km': 'Expected a number.'})
+        if not 0 < radius_km <= 1000:
+            raise ValidationError({'radius_km': 'Must be between 0 and 1000.'})
+
+        # Nearest first, with the distance added to each hotel
+        fast = get_values_serializer(self.get_serializer_class())
+        queryset = nearby(self.filter_queryset(self.get_queryset()), lat, lng, radius_km)
+        rows = list(queryset.values(*fast.lookups, 'distance_km'))
+        data = fast.represent(rows)
+        for row, item in zip(rows, data):
+            item['distance_km'] = round(row['distance_km'], 2)
+        return Response(data)
+
+class RoomViewSet(VersionedUpdateMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
+
+    def live_etag(self, pk, data=None):
+        if data is not None:
+            return price_digest([(data['id'], data['current_price'])])
+        return price_digest(tonight_prices(Room.objects.filter(pk=pk)))
     
     def get_permissions(self):
         # Allow anyone to read, but only staff can create/update/delete
@@ -42,12 +200,157 @@ class RoomViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(IdempotentCreateMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ReservationHistoryPagination
+    throttle_classes = [IPTokenBucketThrottle, UserTokenBucketThrottle]
+    throttle_scope = 'reservations'
+
+    # Upcoming and current stays read forwards in time, history backwards
+    STATUS_ORDERING = {
+        'upcoming': ('check_in', 'id'),
+        'current': ('check_in', 'id'),
+        'past': ('-check_in', '-id'),
+    }
+
+    def get_queryset(self):
+        queryset = Reservation.objects.filter(user=self.request.user).select_related('room', 'hotel')
+        if self.action != 'list':
+            return queryset
+
+        status = self.request.query_params.get('status')
+        if status is None:
+            return queryset.order_by('-check_in', '-id')
+        if status not in self.STATUS_ORDERING:
+            raise ValidationError({'status': 'Must be one of: upcoming, current, past.'})
+
+        today = timezone.localdate()
+        if status == 'upcoming':
+            queryset = queryset.filter(check_in__gt=today)
+        elif status == 'current':
+            queryset = queryset.filter(check_in__lte=today, check_out__gt=today)
+        else:
+            # check_in < today is implied by check_out <= today, but spelling
+            # it out lets the (user, check_in) index bound the scan.
+            queryset = queryset.filter(check_in__lt=today, check_out__lte=today)
+        return queryset.order_by(*self.STATUS_ORDERING[status])
+
+    @action(detail=False, serializer_class=ArchivedReservationSerializer)
+    def archived(self, request):
+        """Stays moved out of the live table by api/archive.py, newest first."""
+        fast = get_values_serializer(ArchivedReservationSerializer)
+        queryset = fast.values(
+            ArchivedReservation.objects.filter(user=request.user).order_by('-check_in', '-original_id')
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.represent(page))
+        return Response(fast.represent(queryset))
+
+    # One transaction, so the queued job exists only if the save committed
+    @transaction.atomic
+    def perform_create(self, serializer):
+        reservation = serializer.save(user=self.request.user)
+        enqueue(send_booking_confirmation, key=f'booking-confirmation:{reservation.id}', reservation_id=reservation.id)
+
+    def perform_update(self, serializer):
+        old = serializer.instance
+        old_room, old_check_in, old_check_out = old.room, old.check_in, old.check_out
+        reservation = serializer.save()
+        if old_room is None:
+            return
+        # Nights given up by a shortened or moved stay go to the waitlist
+        for check_in, check_out in freed_ranges(
+            old_room.id, old_check_in, old_check_out,
+            reservation.room_id, reservation.check_in, reservation.check_out,
+        ):
+            offer_freed_nights(old_room, check_in, check_out)
+
+    def perform_destroy(self, instance):
+        room, check_in, check_out = instance.room, instance.check_in, instance.check_out
+        instance.delete()
+        if room is not None:
+            offer_freed_nights(room, check_in, check_out)
+
+class ItineraryViewSet(IdempotentCreateMixin,
+                       ValuesListMixin,
+                       mixins.CreateModelMixin,
+                       mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.DestroyModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    Book several reservations at once; either every segment is booked or
+    none is. Deleting an itinerary cancels all of its reservations.
+    """
+    serializer_class = ItinerarySerializer
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [IPTokenBucketThrottle, UserTokenBucketThrottle]
+    throttle_scope = 'reservations'
+
+    def get_queryset(self):
+        return Itinerary.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        itinerary = serializer.save(user=self.request.user)
+        for reservation in itinerary.reservations.all():
+            enqueue(send_booking_confirmation, key=f'booking-confirmation:{reservation.id}', reservation_id=reservation.id)
+
+    def perform_destroy(self, instance):
+        freed = [(r.room, r.check_in, r.check_out) for r in instance.reservations.select_related('room')]
+        instance.delete()
+        for room, check_in, check_out in freed:
+            if room is not None:
+                offer_freed_nights(room, check_in, check_out)
+
+class ReviewViewSet(ValuesListMixin,
+                    mixins.CreateModelMixin,
+                    mixins.ListModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    Reviews of a finished stay. List one hotel's with ``?hotel=<id>``,
+    newest first and paginated by cursor. Guests can delete their own.
+    """
+    serializer_class = ReviewSerializer
+    pagination_class = ReviewPagination
+
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve']:
+            return [AllowAny()]
+        return [IsAuthenticated()]
+
+    def get_queryset(self):
+        queryset = Review.objects.select_related('user')
+        if self.action == 'destroy':
+            return queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            try:
+                return queryset.filter(hotel=int(self.request.query_params['hotel']))
+            except (KeyError, ValueError):
+                raise ValidationError({'hotel': 'Pass the id of the hotel whose reviews to list.'})
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class WaitlistViewSet(mixins.CreateModelMixin,
+                      mixins.ListModelMixin,
+                      mixins.RetrieveModelMixin,
+                      mixins.DestroyModelMixin,
+                      viewsets.GenericViewSet):
+    """
+    Join the waitlist for a fully booked room (or any room in a hotel).
+    Entries move to OFFERED when matching nights are freed.
+    """
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Reservation.objects.filter(user=self.request.user)
+        return WaitlistEntry.objects.filter(user=self.request.user).order_by('created_at', 'id')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
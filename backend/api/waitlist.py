@@ -0,0 +1,82 @@
+"""
+Waitlist matching for room nights freed by cancellations and shortened stays.
+
+Waitlisted stays are capped at ``WAITLIST_MAX_NIGHTS``, so every entry that
+overlaps a freed range ``[a, b)`` starts in ``(a - max_nights, b)``. That
+turns the interval lookup into a range scan on the ``(room|hotel, status,
+check_in)`` indexes instead of a scan over the whole waitlist.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reservation, WaitlistEntry
+
+
+def max_nights():
+    return getattr(settings, 'WAITLIST_MAX_NIGHTS', 30)
+
+
+def freed_ranges(old_room_id, old_check_in, old_check_out, new_room_id, new_check_in, new_check_out):
+    """Return the ``(check_in, check_out)`` ranges of the old stay no longer covered by the new one."""
+    if old_room_id != new_room_id:
+        return [(old_check_in, old_check_out)]
+
+    ranges = []
+    if old_check_in < new_check_in:
+        ranges.append((old_check_in, min(new_check_in, old_check_out)))
+    if new_check_out < old_check_out:
+        ranges.append((max(new_check_out, old_check_in), old_check_out))
+    return ranges
+
+
+def _overlaps(check_in, check_out, busy):
+    return any(start < check_out and end > check_in for start, end in busy)
+
+
+@transaction.atomic
+def offer_freed_nights(room, check_in, check_out):
+    """
+    Offer the nights ``[check_in, check_out)`` of ``room`` to waiting users.
+
+    Entries for the room itself and for "any room" in its hotel are offered
+    in FIFO order, as long as their whole stay is free and does not clash
+    with an earlier offer. Returns the entries that were offered.
+    """
+    earliest = check_in - timedelta(days=max_nights())
+    latest = check_out + timedelta(days=max_nights())
+    window = dict(
+        status='WAITING',
+        check_in__gt=earliest,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    )
+    room_entries = WaitlistEntry.objects.filter(room=room, **window).order_by('created_at', 'id')
+    hotel_entries = WaitlistEntry.objects.filter(
+        hotel_id=room.hotel_id, room__isnull=True, **window
+    ).order_by('created_at', 'id')
+    candidates = heapq.merge(room_entries, hotel_entries, key=lambda entry: (entry.created_at, entry.id))
+
+    # Everything that can block a candidate lies within [earliest, latest)
+    busy = list(Reservation.objects.filter(
+        room=room, check_in__lt=latest, check_out__gt=earliest
+    ).values_list('check_in', 'check_out'))
+    busy += WaitlistEntry.objects.filter(
+        status='OFFERED', offered_room=room, check_in__lt=latest, check_out__gt=earliest
+    ).values_list('check_in', 'check_out')
+
+    offered = []
+    now = timezone.now()
+    for entry in candidates:
+        if _overlaps(entry.check_in, entry.check_out, busy):
+            continue
+        entry.status = 'OFFERED'
+        entry.offered_room = room
+        entry.offered_at = now
+        entry.save(update_fields=['status', 'offered_room', 'offered_at'])
+        busy.append((entry.check_in, entry.check_out))
+        offered.append(entry)
+    return offered
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.request_log.RequestLogMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -102,6 +104,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profiles. The first hasher of the chosen profile hashes
+# new passwords; the rest stay listed so existing hashes still verify and
+# are upgraded on the user's next login.
+#   pbkdf2 - Django's default
+#   argon2 - a fraction of PBKDF2's CPU time per signup/login with Django's
+#            default parameters; needs `pip install argon2-cffi`
+# Fast (MD5) hashing for the test suite lives in core/settings_test.py only,
+# so no environment variable can select it in production.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': [
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+    'argon2': [
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -120,6 +147,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded hotel photos and thumbnails. File names are content-hashed
+# (api/images.py), so whatever serves MEDIA_URL -- a CDN or the web server --
+# can send "Cache-Control: public, max-age=31536000, immutable".
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Widths of the WebP thumbnails generated for each hotel photo
+HOTEL_THUMBNAIL_WIDTHS = (320, 640, 1024)
+HOTEL_THUMBNAIL_QUALITY = 80
+
 # Authentication backends
 AUTHENTICATION_BACKENDS = [
     'api.authentication.EmailOrUsernameBackend',  # Custom backend for email/username login
@@ -129,8 +166,103 @@ AUTHENTICATION_BACKENDS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # Token bucket rates per endpoint scope, see api/throttling.py.
+    # "N/period" means a burst of N requests, refilled at N per period.
+    'DEFAULT_THROTTLE_RATES': {
+        'register_ip': '10/hour',
+        'token_ip': '30/min',
+        'reservations_ip': '120/min',
+        'reservations_user': '60/min',
+    },
+}
+
+# Cache alias holding throttle buckets. Point it at a shared cache (e.g.
+# Redis) when running several workers; unknown aliases fall back to a
+# process-local memory cache.
+THROTTLE_CACHE = 'default'
+
+# Occupancy pricing (api/pricing.py): per room type (or 'default'), steps of
+# (share of the type's rooms booked that night, multiplier of price_per_night)
+PRICING_CURVES = {
+    'default': ((0.5, '1.10'), (0.75, '1.25'), (0.9, '1.50')),
 }
+# Cache alias holding the nightly price grid; share it between workers like
+# THROTTLE_CACHE. Entries not refreshed by a booking expire after this long.
+PRICING_CACHE = 'default'
+PRICING_CACHE_SECONDS = 300
+
+# Longest stay a user can waitlist for; bounds the waitlist match scan
+WAITLIST_MAX_NIGHTS = 30
+
+# Reservations that checked out more than this many days ago are moved to
+# ArchivedReservation by `python manage.py archive_reservations`
+RESERVATION_ARCHIVE_AFTER_DAYS = 365
+
+# Background jobs (api/jobs.py), run by `python manage.py run_jobs`
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 30  # seconds, doubled after every failed attempt
+JOB_TIMEOUT = 600  # seconds before a RUNNING job is assumed lost
+
+# How long a stored Idempotency-Key response can be replayed, in seconds.
+# Expired keys are removed by `python manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# A key still pending after this many seconds is assumed abandoned (e.g. a
+# killed worker) and a retry may run the request again
+IDEMPOTENCY_PENDING_TIMEOUT = 60
+
+# The change feed (/api/changes/) holds back entries this young so that
+# transactions still committing cannot slip in behind a client's cursor
+CHANGE_FEED_SETTLE_SECONDS = 1
+
+# Live availability streams (api/live.py). Use 'api.live.ChangeLogBroker'
+# when more than one server process is running.
+LIVE_BROKER = 'api.live.InProcessBroker'
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_POLL_SECONDS = 1
+# Under WSGI every open stream holds a worker thread, so WSGI servers
+# answer 204 and pages go without live updates; serve the app with an ASGI
+# server (see README) or set this for a threaded server sized for it.
+LIVE_WSGI_STREAMS = False
+
+# Structured request logs (api/request_log.py): the share of requests
+# logged per URL name, '*' for the rest. Server errors and requests slower
+# than REQUEST_LOG_SLOW_MS are always logged, slow ones with their
+# REQUEST_LOG_TOP_SQL slowest statements.
+REQUEST_LOG_SAMPLE_RATES = {
+    '*': 0.1,
+    'hotel-list': 0.01,
+    'room-list': 0.01,
+    'token_obtain_pair': 1.0,
+    'auth_register': 1.0,
+}
+REQUEST_LOG_SLOW_MS = 500
+REQUEST_LOG_TOP_SQL = 5
+
+# Request logs are written as JSON lines to stdout from a background thread
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'api.request_log.JsonFormatter'},
+    },
+    'handlers': {
+        'requests': {
+            # A factory: dictConfig special-cases QueueHandler classes
+            '()': 'api.request_log.background_handler',
+            'formatter': 'json',
+            'stream': 'ext://sys.stdout',
+        },
+    },
+    'loggers': {
+        # WARNING keeps only errors and slow requests
+        'api.requests': {'handlers': ['requests'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Print outgoing emails (booking confirmations) to the console in development
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'bookings@localhost'
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
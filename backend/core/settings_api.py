@@ -0,0 +1,52 @@
+"""
+API-only profile for short-lived API workers:
+DJANGO_SETTINGS_MODULE=core.settings_api gunicorn core.wsgi
+
+Same as core.settings without the admin and the session, messages and
+static files machinery it needs, and with the JSON renderer only, so
+django.setup() imports far less. Clients authenticate with JWTs, which
+need none of it. Run the admin from a process on core.settings.
+`python manage.py startup_profile --settings=core.settings_api` shows the
+difference.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS  # noqa: F405
+    if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE  # noqa: F405
+    if middleware not in (
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )
+]
+
+# Rebuilt rather than edited in place: TEMPLATES is the same list object as
+# core.settings', which a process may also have imported
+TEMPLATES = [
+    {
+        **TEMPLATES[0],  # noqa: F405
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],  # noqa: F405
+            'context_processors': ['django.template.context_processors.request'],
+        },
+    },
+    *TEMPLATES[1:],  # noqa: F405
+]
+
+ROOT_URLCONF = 'core.urls_api'
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    # No browsable API, so no templates or static files
+    'DEFAULT_RENDERER_CLASSES': ('rest_framework.renderers.JSONRenderer',),
+}
@@ -0,0 +1,36 @@
+"""
+Settings for the test suite (pytest.ini points here).
+
+Same as core.settings, minus the slow parts: an in-memory database built
+straight from the models instead of by running migrations, and MD5 password
+hashing so creating test users is instant.
+"""
+from .settings import *  # noqa: F401,F403
+
+
+class DisableMigrations:
+    """Build test tables from the current models; see tests/conftest.py for the raw-SQL bits."""
+
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return None
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+MIGRATION_MODULES = DisableMigrations()
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+]
+
+# Tests that check request logs capture them with assertLogs
+LOGGING['loggers']['api.requests']['level'] = 'CRITICAL'  # noqa: F405
@@ -0,0 +1,25 @@
+import importlib
+
+import pytest
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connections
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """
+    core.settings_test builds tables from the models without running
+    migrations, so apply the raw SQL ones migrations would have added.
+    """
+    email_index = importlib.import_module('api.migrations.0014_user_email_unique')
+    with django_db_blocker.unblock():
+        for connection in connections.all():
+            with connection.schema_editor() as schema_editor:
+                email_index.add_email_unique_index(apps, schema_editor)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with empty throttle buckets."""
+    cache.clear()
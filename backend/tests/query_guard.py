@@ -0,0 +1,61 @@
+"""
+Query-count and query-plan checks for the regression tests.
+
+``assertQueryCounts`` runs a request with its data grown to 1, 10 and 100
+rows and expects the same, exact number of queries at every size: a query
+per row shows up as a count that grows, and any new query as a changed
+constant. ``assertNoFullScans`` asks SQLite how it would run captured
+queries and fails on any table read from start to end instead of through
+an index.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SIZES = (1, 10, 100)
+
+# "SCAN api_reservation", but not "SCAN api_reservation USING INDEX ..."
+# (an index range or covering scan) or "SCAN CONSTANT ROW"
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(?!CONSTANT ROW)\S+(?: AS \S+)?$')
+
+
+def query_plan(sql):
+    """SQLite's ``EXPLAIN QUERY PLAN`` steps for ``sql``, as text."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql):
+    return [step for step in query_plan(sql) if FULL_SCAN.match(step)]
+
+
+class QueryGuardMixin:
+    """Assertions for ``TestCase`` subclasses."""
+
+    def assertQueryCounts(self, request, grow, expected, sizes=SIZES):
+        """
+        Call ``grow(n)`` to add ``n`` rows until there are each of ``sizes``,
+        then ``request()``, and expect ``expected`` queries every time.
+        """
+        counts, total = {}, 0
+        for size in sizes:
+            grow(size - total)
+            total = size
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            counts[size] = len(queries)
+        self.assertEqual(counts, dict.fromkeys(sizes, expected), 'queries by number of rows')
+        return queries
+
+    def assertNoFullScans(self, queries, table):
+        """Fail if a captured query reading ``table`` needs a full table scan."""
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith(('SELECT', 'UPDATE', 'DELETE')) and f'"{table}"' in sql:
+                checked += 1
+                self.assertEqual(full_scans(sql), [], sql)
+        self.assertTrue(checked, f'no query read {table}')
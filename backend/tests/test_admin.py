@@ -0,0 +1,69 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from datetime import date, timedelta
+from unittest import mock
+from api.admin import EstimatedCountPaginator
+from api.models import Hotel, Room, Reservation
+
+class AdminChangelistTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.client.force_login(self.admin)
+        self.hotel = Hotel.objects.create(name='Admin Hotel', description='Test', address='Test', rating=4.0)
+
+    def add_reservations(self, count):
+        for i in range(count):
+            user = User.objects.create_user(username=f'guest{Reservation.objects.count()}', password='x')
+            room = Room.objects.create(hotel=self.hotel, room_number=f'{Room.objects.count() + 1}',
+                                       room_type='SINGLE', price_per_night=80.00, capacity=1)
+            Reservation.objects.create(user=user, room=room, check_in=date.today() + timedelta(days=i),
+                                       check_out=date.today() + timedelta(days=i + 1))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_changelist_query_count_is_constant(self):
+        """Test changelists do not issue a query per row"""
+        for name in ('api_reservation_changelist', 'api_room_changelist', 'api_hotel_changelist'):
+            url = reverse(f'admin:{name}')
+            self.add_reservations(2)
+            few = self.changelist_queries(url)
+            self.add_reservations(5)
+            self.assertEqual(self.changelist_queries(url), few, name)
+
+    def test_estimated_count_for_unfiltered_list(self):
+        """Test large unfiltered lists use the row estimate instead of COUNT(*)"""
+        self.add_reservations(2)
+        with mock.patch('api.admin.estimate_row_count', return_value=5000000):
+            paginator = EstimatedCountPaginator(Reservation.objects.order_by('id'), 100)
+            self.assertEqual(paginator.count, 5000000)
+
+            filtered = EstimatedCountPaginator(Reservation.objects.filter(check_in__gte=date.today()).order_by('id'), 100)
+            self.assertEqual(filtered.count, 2)
+
+        with mock.patch('api.admin.estimate_row_count', return_value=10):
+            self.assertEqual(EstimatedCountPaginator(Reservation.objects.order_by('id'), 100).count, 2)
+
+    def test_estimate_unavailable_falls_back(self):
+        """Test the exact count is used when no estimate is available"""
+        self.add_reservations(3)
+        paginator = EstimatedCountPaginator(Reservation.objects.order_by('id'), 100)
+        self.assertEqual(paginator.count, Paginator(Reservation.objects.order_by('id'), 100).count)
+
+    def test_admin_edit_bumps_version(self):
+        """Test saving through the admin invalidates API ETags"""
+        url = reverse('admin:api_hotel_change', args=[self.hotel.id])
+        response = self.client.post(url, {
+            'name': 'Edited', 'description': 'Test', 'address': 'Test', 'rating': '4.0', 'overbooking_limit': '0',
+            'rooms-TOTAL_FORMS': '0', 'rooms-INITIAL_FORMS': '0',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.name, self.hotel.version), ('Edited', 2))
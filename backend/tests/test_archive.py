@@ -0,0 +1,112 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from io import StringIO
+from api.archive import archive_cutoff, archive_reservations, stay_history, HISTORY_FIELDS
+from api.models import Hotel, Room, Reservation, ArchivedReservation
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='guest', password='guestpass')
+        self.hotel = Hotel.objects.create(name='Old Hotel', description='Test', address='Test', rating=4.0)
+        self.room = Room.objects.create(hotel=self.hotel, room_number='101', room_type='SINGLE', price_per_night=80.00, capacity=1)
+        today = date.today()
+        self.old = [
+            Reservation.objects.create(user=self.user, room=self.room,
+                                       check_in=today - timedelta(days=800 + i * 3),
+                                       check_out=today - timedelta(days=798 + i * 3))
+            for i in range(5)
+        ]
+        self.recent = Reservation.objects.create(user=self.user, room=self.room,
+                                                 check_in=today - timedelta(days=10),
+                                                 check_out=today - timedelta(days=8))
+
+    def test_archive_moves_old_reservations_in_batches(self):
+        """Test only stays older than the horizon move, batch by batch"""
+        self.assertEqual(archive_reservations(archive_cutoff(), batch_size=2), 5)
+        self.assertEqual(list(Reservation.objects.values_list('id', flat=True)), [self.recent.id])
+
+        archived = ArchivedReservation.objects.get(original_id=self.old[0].id)
+        self.assertEqual(archived.user, self.user)
+        self.assertEqual(archived.hotel_name, 'Old Hotel')
+        self.assertEqual(archived.room_number, '101')
+        self.assertEqual(archived.check_in, self.old[0].check_in)
+        self.assertEqual(archived.created_at, self.old[0].created_at)
+
+        # Nothing left to do on a second run
+        self.assertEqual(archive_reservations(archive_cutoff()), 0)
+
+    def test_archived_survive_room_deletion(self):
+        """Test archived stays keep their details when the room is removed"""
+        archive_reservations(archive_cutoff())
+        self.room.delete()
+        archived = ArchivedReservation.objects.get(original_id=self.old[0].id)
+        self.assertIsNone(archived.room_id)
+        self.assertEqual(archived.hotel_name, 'Old Hotel')
+
+    def test_stay_history_spans_both_tables(self):
+        """Test stay_history returns live and archived stays together"""
+        archive_reservations(archive_cutoff())
+        rows = [dict(zip(HISTORY_FIELDS, row)) for row in stay_history(user=self.user)]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(sorted(row['id'] for row in rows), sorted([r.id for r in self.old] + [self.recent.id]))
+        self.assertEqual(sum(1 for row in rows if row['archived']), 5)
+        self.assertTrue(all(row['hotel_name'] == 'Old Hotel' for row in rows))
+
+    def test_archived_endpoint(self):
+        """Test users can list their archived stays, newest first"""
+        other = User.objects.create_user(username='other', password='otherpass')
+        Reservation.objects.create(user=other, room=self.room, check_in=date.today() - timedelta(days=900),
+                                   check_out=date.today() - timedelta(days=899))
+        archive_reservations(archive_cutoff())
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('reservation-archived'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [r.id for r in self.old])
+        self.assertEqual(response.data[0]['hotel_name'], 'Old Hotel')
+        self.assertEqual(response.data[0]['check_in'], self.old[0].check_in.isoformat())
+
+        response = client.get(reverse('reservation-archived'), {'page_size': 2})
+        self.assertEqual([item['id'] for item in response.data['results']], [r.id for r in self.old[:2]])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_command(self):
+        """Test the management command honours --before"""
+        out = StringIO()
+        call_command('archive_reservations', '--before', (date.today() - timedelta(days=805)).isoformat(), stdout=out)
+        self.assertIn('Archived 2 reservation(s)', out.getvalue())
+        self.assertEqual(Reservation.objects.count(), 4)
+
+    def test_cutoff_after_horizon_needs_force(self):
+        """Test recent stays are only archived on request, and upcoming ones never"""
+        upcoming = Reservation.objects.create(user=self.user, room=self.room, check_in=date.today() + timedelta(days=5),
+                                              check_out=date.today() + timedelta(days=7))
+        with self.assertRaises(ValueError):
+            archive_reservations(date.today() - timedelta(days=1))
+        with self.assertRaises(CommandError):
+            call_command('archive_reservations', '--before', (date.today() + timedelta(days=365)).isoformat(),
+                         '--force', stdout=StringIO())
+        self.assertTrue(Reservation.objects.filter(pk=upcoming.pk).exists())
+
+        self.assertEqual(archive_reservations(date.today(), force=True), 6)
+        self.assertEqual(list(Reservation.objects.values_list('id', flat=True)), [upcoming.id])
+
+    def test_archiving_is_not_cancelling(self):
+        """Test archived stays stay out of the change log and cost the same queries whatever their number"""
+        from api.models import Change
+        hotel = Hotel.objects.create(name='Typed Hotel', description='Test', address='Test', rating=4.0,
+                                     inventory_by_type=True)
+        Room.objects.create(hotel=hotel, room_number='1', room_type='DOUBLE', price_per_night=90.00, capacity=2)
+        for i in range(45):
+            Reservation.objects.create(user=self.user, hotel=hotel, room_type='DOUBLE',
+                                       check_in=date.today() - timedelta(days=900 + i * 2),
+                                       check_out=date.today() - timedelta(days=899 + i * 2))
+        logged = Change.objects.count()
+        with self.assertNumQueries(10):
+            self.assertEqual(archive_reservations(archive_cutoff()), 50)
+        self.assertEqual(Change.objects.count(), logged)
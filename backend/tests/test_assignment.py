@@ -0,0 +1,124 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from datetime import date, timedelta
+from api.assignment import optimize_rooms, plan_assignment
+from api.models import Change, Hotel, Room, Reservation
+
+class RoomAssignmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.hotel = Hotel.objects.create(name='Packed Hotel', description='Test', address='Test', rating=4.0)
+        cls.a, cls.b = [
+            Room.objects.create(hotel=cls.hotel, room_number=number, room_type='DOUBLE', price_per_night=120.00, capacity=2)
+            for number in ('A', 'B')
+        ]
+        cls.suite = Room.objects.create(hotel=cls.hotel, room_number='S', room_type='SUITE', price_per_night=300.00, capacity=4)
+        cls.day = date.today() + timedelta(days=5)
+
+    def stay(self, room, first, nights, **kwargs):
+        return Reservation.objects.create(user=self.user, room=room, check_in=self.day + timedelta(days=first),
+                                          check_out=self.day + timedelta(days=first + nights), **kwargs)
+
+    def test_back_to_back_stays_share_a_room(self):
+        """Test a stay moves next to the one before it, leaving a room free throughout"""
+        self.stay(self.a, 0, 2)
+        later = self.stay(self.b, 2, 2)
+        moves, before, after = plan_assignment(self.hotel, self.day)
+        self.assertEqual([(stay['id'], room_id) for stay, room_id in moves], [(later.id, self.a.id)])
+        # The suite is free throughout either way
+        self.assertEqual(before, {'free_runs': 3, 'longest_free_run': 4})
+        self.assertEqual(after, {'free_runs': 2, 'longest_free_run': 4})
+
+    def test_in_house_and_upgraded_stays_stay_put(self):
+        """Test guests already checked in and upgrades keep their rooms"""
+        in_house = self.stay(self.b, -1, 3)
+        upgraded = self.stay(self.suite, 0, 2, hotel=self.hotel, room_type='DOUBLE')
+        moves, _, _ = plan_assignment(self.hotel, self.day)
+        self.assertEqual(moves, [])
+        self.stay(self.a, 3, 1)
+        moves, _, _ = plan_assignment(self.hotel, self.day)
+        self.assertEqual([room_id for _, room_id in moves], [self.b.id])
+        self.assertNotIn(in_house.id, [stay['id'] for stay, _ in moves])
+        self.assertNotIn(upgraded.id, [stay['id'] for stay, _ in moves])
+
+    def test_waiting_room_type_bookings_get_rooms(self):
+        """Test room-type bookings without a room are placed too"""
+        self.stay(self.a, 0, 2)
+        waiting = self.stay(None, 2, 3, hotel=self.hotel, room_type='DOUBLE')
+        optimize_rooms(self.hotel, self.day)
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.room, self.a)
+
+    def test_overbooked_type_is_left_alone(self):
+        """Test a type sold beyond its rooms is not reshuffled"""
+        self.stay(self.a, 0, 2)
+        self.stay(self.b, 2, 2)
+        self.stay(None, 0, 1, hotel=self.hotel, room_type='DOUBLE')
+        self.stay(None, 0, 1, hotel=self.hotel, room_type='DOUBLE')
+        moves, _, _ = plan_assignment(self.hotel, self.day)
+        self.assertEqual(moves, [])
+
+    def test_apply_moves_in_one_go_and_logs_changes(self):
+        """Test applying moves the stays and records each move in the change log"""
+        first = self.stay(self.b, 0, 2)
+        second = self.stay(self.a, 2, 2)
+        third = self.stay(self.b, 4, 1)
+        before = Change.objects.count()
+        moves, _, _ = optimize_rooms(self.hotel, self.day)
+        rooms = dict(Reservation.objects.filter(id__in=[first.id, second.id, third.id]).values_list('id', 'room_id'))
+        self.assertEqual(set(rooms.values()), {self.b.id})
+        self.assertEqual(Change.objects.count(), before + len(moves))
+
+    def test_command_prints_diff_and_dry_run_changes_nothing(self):
+        """Test the command lists each move and --dry-run keeps the rooms"""
+        self.stay(self.a, 0, 2)
+        later = self.stay(self.b, 2, 2)
+        out = StringIO()
+        call_command('optimize_rooms', '--hotel', str(self.hotel.id), '--from', self.day.isoformat(), '--dry-run', stdout=out)
+        self.assertIn(f'reservation {later.id}', out.getvalue())
+        self.assertIn('B -> A', out.getvalue())
+        self.assertIn('Dry run', out.getvalue())
+        later.refresh_from_db()
+        self.assertEqual(later.room, self.b)
+
+        call_command('optimize_rooms', '--hotel', str(self.hotel.id), '--from', self.day.isoformat(), stdout=StringIO())
+        later.refresh_from_db()
+        self.assertEqual(later.room, self.a)
+
+    def test_command_shows_every_plan_before_applying_all_at_once(self):
+        """Test no hotel is changed until every plan is printed, and a failure changes none"""
+        self.stay(self.a, 0, 2)
+        later = self.stay(self.b, 2, 2)
+        other = Hotel.objects.create(name='Second Hotel', description='Test', address='Test', rating=4.0)
+        c, d = [Room.objects.create(hotel=other, room_number=number, room_type='DOUBLE', price_per_night=120.00,
+                                    capacity=2) for number in ('C', 'D')]
+        self.stay(c, 0, 2)
+        other_later = self.stay(d, 2, 2)
+
+        out = StringIO()
+        applied = []
+
+        def apply_moves(moves):
+            # Every plan is already printed when the first one is applied
+            self.assertIn(f'reservation {other_later.id}', out.getvalue())
+            applied.append(moves)
+            if len(applied) == 2:
+                raise RuntimeError('lost the database')
+            real_apply_moves(moves)
+
+        from api.management.commands import optimize_rooms as command
+        real_apply_moves = command.apply_moves
+        with mock.patch.object(command, 'apply_moves', apply_moves), self.assertRaises(RuntimeError):
+            call_command('optimize_rooms', '--from', self.day.isoformat(), stdout=out)
+        later.refresh_from_db()
+        self.assertEqual(later.room, self.b)
+
+        call_command('optimize_rooms', '--from', self.day.isoformat(), stdout=out)
+        self.assertIn('Applied 2 move(s).', out.getvalue())
+        later.refresh_from_db()
+        other_later.refresh_from_db()
+        self.assertEqual((later.room, other_later.room), (self.a, c))
@@ -0,0 +1,85 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from api.models import Hotel, Room, Reservation, Change
+from api.booking import book_itinerary
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('change_feed')
+        self.user = User.objects.create_user(username='guest', password='guestpass')
+        self.hotel = Hotel.objects.create(name='Feed Hotel', description='Test', address='Test', rating=4.0)
+        self.room = Room.objects.create(hotel=self.hotel, room_number='101', room_type='SINGLE', price_per_night=80.00, capacity=1)
+
+    def feed(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_creates_updates_and_deletes_are_logged(self):
+        """Test model writes show up after the cursor"""
+        data = self.feed()
+        self.assertEqual([(c['model'], c['action']) for c in data['changes']],
+                         [('hotel', 'CREATE'), ('room', 'CREATE')])
+        self.assertEqual(data['changes'][1]['data']['room_number'], '101')
+        self.assertEqual(data['changes'][1]['hotel_id'], self.hotel.id)
+
+        cursor = data['cursor']
+        self.room.capacity = 2
+        self.room.save()
+        Reservation.objects.create(user=self.user, room=self.room, check_in=date.today() + timedelta(days=1),
+                                   check_out=date.today() + timedelta(days=3))
+        self.hotel.delete()
+
+        data = self.feed(since=cursor)
+        # Earlier changes to an object are superseded by its delete; the
+        # reservation cascades from both the hotel and the room
+        self.assertEqual([(c['model'], c['action']) for c in data['changes']],
+                         [('room', 'DELETE'), ('reservation', 'DELETE'), ('hotel', 'DELETE')])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.feed(since=data['cursor'])['changes'], [])
+
+    def test_reservations_expose_availability_only(self):
+        """Test reservation entries carry room and dates but not the guest"""
+        Reservation.objects.create(user=self.user, room=self.room, check_in=date.today() + timedelta(days=1),
+                                   check_out=date.today() + timedelta(days=3))
+        change = self.feed()['changes'][-1]
+        self.assertEqual(set(change['data']), {'id', 'room_id', 'hotel_id', 'room_type', 'check_in', 'check_out'})
+
+    def test_bulk_created_reservations_are_logged(self):
+        """Test itinerary bookings, which skip signals, are logged too"""
+        before = Change.objects.count()
+        book_itinerary(self.user, [
+            {'room': self.room, 'check_in': date.today() + timedelta(days=1), 'check_out': date.today() + timedelta(days=2)},
+            {'room': self.room, 'check_in': date.today() + timedelta(days=4), 'check_out': date.today() + timedelta(days=5)},
+        ])
+        self.assertEqual(Change.objects.filter(model='reservation', action='CREATE').count(), 2)
+        self.assertEqual(Change.objects.count(), before + 2)
+
+    def test_paging_and_hotel_filter(self):
+        """Test limit pages through the log and hotel narrows it"""
+        other = Hotel.objects.create(name='Other', description='Test', address='Test', rating=3.0)
+        data = self.feed(limit=2)
+        self.assertTrue(data['has_more'])
+        data = self.feed(since=data['cursor'], limit=2)
+        self.assertEqual([c['object_id'] for c in data['changes']], [other.id])
+        self.assertFalse(data['has_more'])
+
+        data = self.feed(hotel=other.id)
+        self.assertEqual([c['object_id'] for c in data['changes']], [other.id])
+
+    def test_invalid_params(self):
+        """Test malformed cursors are rejected"""
+        self.assertEqual(self.client.get(self.url, {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_recent_changes_are_held_back(self):
+        """Test entries younger than the settle window are not served yet"""
+        data = self.feed()
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(data['cursor'], '0')
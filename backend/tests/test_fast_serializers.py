@@ -0,0 +1,96 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from api.models import Hotel, Room, Reservation
+from api.serializers import HotelSerializer, RoomSerializer, ReservationSerializer
+from api.fast_serializers import get_values_serializer
+
+class ValuesSerializerParityTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='paritydude',
+            password='paritypass',
+            email='parity@example.com'
+        )
+        self.hotel = Hotel.objects.create(
+            name='Parity Hotel',
+            description='Rooms and reservations',
+            address='1 Parity Road',
+            image='https://example.com/parity.jpg',
+            rating=4.3
+        )
+        # Hotel without image or rooms
+        self.empty_hotel = Hotel.objects.create(
+            name='Empty Hotel',
+            description='No rooms here',
+            address='2 Parity Road'
+        )
+        self.room1 = Room.objects.create(
+            hotel=self.hotel,
+            room_number='101',
+            room_type='SINGLE',
+            price_per_night=99.5,
+            capacity=1
+        )
+        self.room2 = Room.objects.create(
+            hotel=self.hotel,
+            room_number='102',
+            room_type='SUITE',
+            price_per_night=310,
+            capacity=4
+        )
+        Reservation.objects.create(
+            user=self.user,
+            room=self.room1,
+            check_in=date.today() + timedelta(days=1),
+            check_out=date.today() + timedelta(days=3)
+        )
+        Reservation.objects.create(
+            user=self.user,
+            room=self.room2,
+            check_in=date.today() + timedelta(days=5),
+            check_out=date.today() + timedelta(days=6)
+        )
+
+    def assertParity(self, serializer_class, queryset):
+        expected = serializer_class(queryset, many=True).data
+        fast = get_values_serializer(serializer_class)
+        actual = fast.represent(fast.values(queryset))
+        self.assertEqual(actual, expected)
+        # Field order must match too, so rendered JSON is byte-identical
+        for fast_item, item in zip(actual, expected):
+            self.assertEqual(list(fast_item), list(item))
+
+    def test_room_parity(self):
+        """Test fast room rows match RoomSerializer output"""
+        self.assertParity(RoomSerializer, Room.objects.order_by('pk'))
+
+    def test_hotel_parity_with_nested_rooms(self):
+        """Test fast hotel rows match HotelSerializer output, including nested rooms"""
+        self.assertParity(HotelSerializer, Hotel.objects.order_by('pk'))
+
+    def test_reservation_parity(self):
+        """Test fast reservation rows match ReservationSerializer output"""
+        self.assertParity(ReservationSerializer, Reservation.objects.order_by('pk'))
+
+    def test_empty_queryset(self):
+        """Test fast path on an empty queryset"""
+        self.assertParity(HotelSerializer, Hotel.objects.none())
+
+    def test_list_endpoints_match_serializers(self):
+        """Test list endpoints return the same data as the regular serializers"""
+        client = APIClient()
+        response = client.get(reverse('hotel-list'))
+        self.assertEqual(response.json(), HotelSerializer(Hotel.objects.all(), many=True).data)
+
+        response = client.get(reverse('room-list'))
+        self.assertEqual(response.json(), RoomSerializer(Room.objects.all(), many=True).data)
+
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('reservation-list'))
+        self.assertEqual(
+            response.json(),
+            ReservationSerializer(Reservation.objects.filter(user=self.user).order_by('-check_in', '-id'), many=True).data
+        )
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from io import StringIO
+from api.models import Change, Hotel
+from api.geo import haversine_km
+
+class HotelGeoSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # Manhattan, Brooklyn, Philadelphia and a hotel without coordinates
+        self.midtown = Hotel.objects.create(
+            name='Midtown', description='Test', address='1 Main St, New York, NY',
+            latitude=40.7549, longitude=-73.9840
+        )
+        self.brooklyn = Hotel.objects.create(
+            name='Brooklyn', description='Test', address='2 Main St, Brooklyn, NY',
+            latitude=40.6782, longitude=-73.9442
+        )
+        self.philly = Hotel.objects.create(
+            name='Philly', description='Test', address='3 Main St, Philadelphia, PA',
+            latitude=39.9526, longitude=-75.1652
+        )
+        self.unknown = Hotel.objects.create(
+            name='Nowhere', description='Test', address='Somewhere'
+        )
+
+    def test_near_filters_and_sorts_by_distance(self):
+        """Test hotels within the radius come back nearest first"""
+        response = self.client.get(reverse('hotel-list'), {'near': '40.6892,-74.0445', 'radius_km': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([h['name'] for h in response.data], ['Brooklyn', 'Midtown'])
+
+        expected = haversine_km(40.6892, -74.0445, 40.6782, -73.9442)
+        self.assertAlmostEqual(response.data[0]['distance_km'], expected, places=1)
+
+    def test_larger_radius(self):
+        """Test a wider radius reaches the next city"""
+        response = self.client.get(reverse('hotel-list'), {'near': '40.6892,-74.0445', 'radius_km': 200})
+        self.assertEqual([h['name'] for h in response.data], ['Brooklyn', 'Midtown', 'Philly'])
+
+    def test_invalid_near(self):
+        """Test malformed coordinates are rejected"""
+        response = self.client.get(reverse('hotel-list'), {'near': 'north'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('hotel-list'), {'near': '95,10'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_plain_list_unchanged(self):
+        """Test hotels are still listed without a near filter"""
+        response = self.client.get(reverse('hotel-list'))
+        self.assertEqual(len(response.data), 4)
+        self.assertNotIn('distance_km', response.data[0])
+
+    def test_backfill_coordinates(self):
+        """Test the backfill command geocodes addresses from the offline table"""
+        Hotel.objects.update(latitude=None, longitude=None)
+        out = StringIO()
+        call_command('backfill_coordinates', stdout=out)
+
+        self.midtown.refresh_from_db()
+        self.philly.refresh_from_db()
+        self.unknown.refresh_from_db()
+        self.assertAlmostEqual(self.midtown.latitude, 40.7128)
+        self.assertAlmostEqual(self.philly.longitude, -75.1652)
+        self.assertIsNone(self.unknown.latitude)
+        self.assertIn('No match for hotel', out.getvalue())
+
+    def test_backfill_bumps_versions_and_logs_changes(self):
+        """Test backfilled hotels get new ETags and appear in the change feed"""
+        Hotel.objects.update(latitude=None, longitude=None)
+        version = Hotel.objects.get(pk=self.midtown.pk).version
+        call_command('backfill_coordinates', '--batch', '1', stdout=StringIO())
+
+        self.assertEqual(Hotel.objects.get(pk=self.midtown.pk).version, version + 1)
+        self.assertEqual(Hotel.objects.get(pk=self.unknown.pk).version, version)
+        change = Change.objects.filter(model='hotel', object_id=self.midtown.pk).latest('id')
+        self.assertEqual(change.action, Change.UPDATE)
+        self.assertAlmostEqual(change.data['latitude'], 40.7128)
+        self.assertFalse(Change.objects.filter(model='hotel', object_id=self.unknown.pk, action=Change.UPDATE).exists())
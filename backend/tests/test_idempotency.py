@@ -0,0 +1,140 @@
+import hashlib
+import json
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+from datetime import date, timedelta
+from io import StringIO
+from api.models import Hotel, Room, Reservation, IdempotencyKey
+
+class IdempotencyKeyTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='retrier',
+            password='retrypass',
+            email='retrier@example.com'
+        )
+        self.hotel = Hotel.objects.create(
+            name='Retry Hotel',
+            description='Flaky networks welcome',
+            address='Test Address',
+            rating=4.0
+        )
+        self.room = Room.objects.create(
+            hotel=self.hotel,
+            room_number='801',
+            room_type='DOUBLE',
+            price_per_night=130.00,
+            capacity=2
+        )
+        self.reservation_data = {
+            'room': self.room.id,
+            'check_in': (date.today() + timedelta(days=3)).isoformat(),
+            'check_out': (date.today() + timedelta(days=5)).isoformat()
+        }
+
+    def test_reservation_retry_replays_response(self):
+        """Test retrying a reservation POST returns the first response without booking twice"""
+        self.client.force_authenticate(user=self.user)
+        first = self.client.post(reverse('reservation-list'), self.reservation_data,
+                                 format='json', HTTP_IDEMPOTENCY_KEY='abc-123')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        retry = self.client.post(reverse('reservation-list'), self.reservation_data,
+                                 format='json', HTTP_IDEMPOTENCY_KEY='abc-123')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_key_reused_with_different_body(self):
+        """Test reusing a key for another request is rejected"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('reservation-list'), self.reservation_data,
+                         format='json', HTTP_IDEMPOTENCY_KEY='abc-123')
+        other = dict(self.reservation_data, check_out=(date.today() + timedelta(days=6)).isoformat())
+        response = self.client.post(reverse('reservation-list'), other,
+                                    format='json', HTTP_IDEMPOTENCY_KEY='abc-123')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_failed_request_is_not_stored(self):
+        """Test a rejected request can be retried with the same key"""
+        self.client.force_authenticate(user=self.user)
+        bad = dict(self.reservation_data, check_out=self.reservation_data['check_in'])
+        response = self.client.post(reverse('reservation-list'), bad,
+                                    format='json', HTTP_IDEMPOTENCY_KEY='abc-123')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_registration_retry(self):
+        """Test retrying registration replays the created user"""
+        data = {
+            'username': 'flaky',
+            'email': 'flaky@example.com',
+            'password': 'securepass123',
+            'first_name': 'Flaky',
+            'last_name': 'Network',
+            'date_of_birth': '1990-01-01'
+        }
+        first = self.client.post(reverse('auth_register'), data, format='json', HTTP_IDEMPOTENCY_KEY='signup-1')
+        retry = self.client.post(reverse('auth_register'), data, format='json', HTTP_IDEMPOTENCY_KEY='signup-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json()['id'], first.json()['id'])
+        self.assertEqual(User.objects.filter(username='flaky').count(), 1)
+        # The stored body digest is keyed, so the password can't be guessed from it
+        body = json.dumps(data, sort_keys=True).encode()
+        self.assertNotEqual(IdempotencyKey.objects.get().request_hash, hashlib.sha256(body).hexdigest())
+        with self.settings(SECRET_KEY='another-secret-key-' * 3):
+            other = self.client.post(reverse('auth_register'), data, format='json', HTTP_IDEMPOTENCY_KEY='signup-1')
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_keys_are_scoped_per_user(self):
+        """Test two users can use the same key independently"""
+        other = User.objects.create_user(username='other', password='otherpass', email='other@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('reservation-list'), self.reservation_data,
+                         format='json', HTTP_IDEMPOTENCY_KEY='same')
+        self.client.force_authenticate(user=other)
+        response = self.client.post(reverse('reservation-list'), self.reservation_data,
+                                    format='json', HTTP_IDEMPOTENCY_KEY='same')
+        # Not a replay: the room is really booked already
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stale_pending_key_is_taken_over(self):
+        """Test a retry runs again once the first attempt has been pending too long"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('reservation-list'), self.reservation_data,
+                         format='json', HTTP_IDEMPOTENCY_KEY='lost')
+        # As if the first request's worker died before booking anything
+        Reservation.objects.all().delete()
+        IdempotencyKey.objects.update(status_code=None, response=None)
+
+        response = self.client.post(reverse('reservation-list'), self.reservation_data,
+                                    format='json', HTTP_IDEMPOTENCY_KEY='lost')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.post(reverse('reservation-list'), self.reservation_data,
+                                    format='json', HTTP_IDEMPOTENCY_KEY='lost')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.count(), 1)
+        record = IdempotencyKey.objects.get()
+        self.assertEqual(record.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(record.created_at, timezone.now() - timedelta(minutes=1))
+
+    def test_purge_expired_keys(self):
+        """Test expired keys are purged and no longer replayed"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('reservation-list'), self.reservation_data,
+                         format='json', HTTP_IDEMPOTENCY_KEY='old')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework.test import APIClient
+from io import BytesIO
+from PIL import Image
+from api.models import Hotel, Job
+from api.jobs import run_pending
+
+def make_png(width=1200, height=800, color='navy'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('lobby.png', buffer.getvalue(), content_type='image/png')
+
+class HotelImagePipelineTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root, HOTEL_THUMBNAIL_WIDTHS=(320, 640, 1024))
+        self.override.enable()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='imageadmin',
+            password='adminpass',
+            email='imageadmin@example.com',
+            is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_hotel(self, photo):
+        return self.client.post(reverse('hotel-list'), {
+            'name': 'Photo Hotel',
+            'description': 'Has a photo',
+            'address': 'Test Address',
+            'rating': 4.0,
+            'photo': photo
+        }, format='multipart')
+
+    def test_upload_queues_thumbnails(self):
+        """Test uploading a photo stores it under a hashed name and queues thumbnails"""
+        response = self.create_hotel(make_png())
+        self.assertEqual(response.status_code, 201)
+        self.assertRegex(response.data['photo_url'], r'/media/hotels/lobby\.[0-9a-f]{12}\.png$')
+        self.assertIsNone(response.data['photo_srcset'])
+        self.assertNotIn('photo', response.data)
+        self.assertTrue(Job.objects.filter(name='api.images.generate_thumbnails').exists())
+
+    def test_thumbnails_and_srcset(self):
+        """Test the background step renders WebP widths exposed as srcset"""
+        hotel_id = self.create_hotel(make_png()).data['id']
+        run_pending()
+
+        hotel = Hotel.objects.get(pk=hotel_id)
+        self.assertEqual(sorted(hotel.thumbnails, key=int), ['320', '640', '1024'])
+        for width, name in hotel.thumbnails.items():
+            self.assertTrue(name.endswith('.webp'))
+            with hotel.photo.storage.open(name) as f:
+                self.assertEqual(Image.open(f).width, int(width))
+
+        data = self.client.get(reverse('hotel-detail', args=[hotel_id])).data
+        self.assertIn('320w', data['photo_srcset'])
+        self.assertIn('1024w', data['photo_srcset'])
+        # List fast path exposes the same fields
+        listed = self.client.get(reverse('hotel-list')).data[0]
+        self.assertEqual(listed['photo_srcset'], data['photo_srcset'])
+        self.assertEqual(listed['photo_url'], data['photo_url'])
+
+    def test_small_photo_is_not_upscaled(self):
+        """Test widths above the original are skipped"""
+        hotel_id = self.create_hotel(make_png(width=500, height=300)).data['id']
+        run_pending()
+        self.assertEqual(sorted(Hotel.objects.get(pk=hotel_id).thumbnails, key=int), ['320', '500'])
+
+    def test_identical_uploads_share_storage(self):
+        """Test the same bytes map to the same content-hashed file"""
+        first = self.create_hotel(make_png(color='teal')).data['photo_url']
+        second = self.create_hotel(make_png(color='teal')).data['photo_url']
+        third = self.create_hotel(make_png(color='olive')).data['photo_url']
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
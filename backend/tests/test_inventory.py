@@ -0,0 +1,214 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from datetime import date, timedelta
+from unittest import mock
+from api import booking
+from api.inventory import assign_rooms, rebuild
+from api.models import Hotel, Itinerary, Room, Reservation, RoomTypeNight
+from api.tasks import send_booking_confirmation
+
+class RoomTypeInventoryTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.hotel = Hotel.objects.create(name='Typed Hotel', description='Test', address='Test', rating=4.0,
+                                         inventory_by_type=True, overbooking_limit=1)
+        cls.rooms = [
+            Room.objects.create(hotel=cls.hotel, room_number=str(100 + n), room_type='DOUBLE',
+                                price_per_night=120.00, capacity=2)
+            for n in range(2)
+        ]
+        cls.day = date.today() + timedelta(days=10)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, **data):
+        data.setdefault('check_in', self.day.isoformat())
+        data.setdefault('check_out', (self.day + timedelta(days=2)).isoformat())
+        return self.client.post(reverse('reservation-list'), data, format='json')
+
+    def sold(self):
+        return dict(RoomTypeNight.objects.filter(hotel=self.hotel, room_type='DOUBLE').values_list('night', 'sold'))
+
+    def test_book_room_type_without_room(self):
+        """Test a room-type booking takes a night from each counter and has no room yet"""
+        response = self.book(hotel=self.hotel.id, room_type='DOUBLE')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['room'])
+        self.assertIsNone(response.data['room_number'])
+        self.assertEqual(response.data['hotel_name'], 'Typed Hotel')
+        self.assertEqual(self.sold(), {self.day: 1, self.day + timedelta(days=1): 1})
+
+    def test_sold_out_after_overbooking_limit(self):
+        """Test two rooms plus an overbooking allowance of one sell three times"""
+        for _ in range(3):
+            self.assertEqual(self.book(hotel=self.hotel.id, room_type='DOUBLE').status_code, status.HTTP_201_CREATED)
+        response = self.book(hotel=self.hotel.id, room_type='DOUBLE',
+                             check_out=(self.day + timedelta(days=1)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 3)
+        # A stay reaching past the full nights is refused without taking any
+        response = self.book(hotel=self.hotel.id, room_type='DOUBLE',
+                             check_out=(self.day + timedelta(days=3)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.sold().get(self.day + timedelta(days=2), 0), 0)
+
+    def test_confirmation_without_room(self):
+        """Test the booking email names the room type until a room is assigned"""
+        reservation_id = self.book(hotel=self.hotel.id, room_type='DOUBLE').data['id']
+        send_booking_confirmation(reservation_id)
+        self.assertIn('Typed Hotel', mail.outbox[0].subject)
+        self.assertIn('for a double room', mail.outbox[0].body)
+
+    def test_booked_room_cannot_be_unassigned(self):
+        """Test a guest can't drop the room of a booking, itinerary segments included"""
+        itinerary = self.client.post(reverse('itinerary-list'), {'reservations': [{
+            'room': self.rooms[0].id, 'check_in': self.day.isoformat(),
+            'check_out': (self.day + timedelta(days=2)).isoformat(),
+        }]}, format='json').data
+        url = reverse('reservation-detail', args=[itinerary['reservations'][0]['id']])
+        response = self.client.patch(url, {'room': None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('room', response.data)
+
+    def test_cancel_itinerary_with_unassigned_segment(self):
+        """Test cancelling an itinerary skips the waitlist for stays without a room"""
+        itinerary = Itinerary.objects.create(user=self.user)
+        Reservation.objects.create(user=self.user, hotel=self.hotel, room_type='DOUBLE', itinerary=itinerary,
+                                   check_in=self.day, check_out=self.day + timedelta(days=1))
+        response = self.client.delete(reverse('itinerary-detail', args=[itinerary.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Reservation.objects.filter(itinerary=itinerary).exists())
+
+    def test_specific_room_counts_too(self):
+        """Test booking a given room in a typed hotel also takes from its type"""
+        response = self.book(room=self.rooms[0].id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['room_type'], 'DOUBLE')
+        self.assertEqual(response.data['hotel'], self.hotel.id)
+        self.assertEqual(self.sold()[self.day], 1)
+
+    def test_room_type_booking_needs_typed_hotel(self):
+        """Test hotels selling specific rooms reject room-type bookings"""
+        other = Hotel.objects.create(name='Rooms Hotel', description='Test', address='Test', rating=3.0)
+        Room.objects.create(hotel=other, room_number='1', room_type='DOUBLE', price_per_night=90.00, capacity=2)
+        self.assertEqual(self.book(hotel=other.id, room_type='DOUBLE').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.book(hotel=self.hotel.id).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_and_move_update_counters(self):
+        """Test moving a stay shifts its nights and cancelling gives them back"""
+        reservation_id = self.book(hotel=self.hotel.id, room_type='DOUBLE').data['id']
+        url = reverse('reservation-detail', args=[reservation_id])
+        response = self.client.patch(url, {'check_in': (self.day + timedelta(days=1)).isoformat(),
+                                           'check_out': (self.day + timedelta(days=3)).isoformat()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.sold(), {self.day: 0, self.day + timedelta(days=1): 1, self.day + timedelta(days=2): 1})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(set(self.sold().values()), {0})
+
+    def test_admin_claims_and_releases(self):
+        """Test reservations added, moved and deleted in the admin keep the counters right"""
+        admin_user = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        self.client.force_login(admin_user)
+
+        def post(url, **data):
+            data = {'user': self.user.id, 'hotel': self.hotel.id, 'room_type': 'DOUBLE', 'room': '', 'itinerary': '',
+                    'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=1)).isoformat(), **data}
+            return self.client.post(url, data)
+
+        add_url = reverse('admin:api_reservation_add')
+        for _ in range(3):
+            self.assertEqual(post(add_url).status_code, 302)
+        self.assertEqual(self.sold(), {self.day: 3})
+        # The fourth would oversell: the form says so and nothing is saved
+        response = post(add_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'No double room left for these dates.')
+        self.assertEqual(Reservation.objects.count(), 3)
+
+        reservation = Reservation.objects.first()
+        change_url = reverse('admin:api_reservation_change', args=[reservation.id])
+        self.assertEqual(post(change_url, check_in=(self.day + timedelta(days=1)).isoformat(),
+                              check_out=(self.day + timedelta(days=2)).isoformat()).status_code, 302)
+        self.assertEqual(self.sold(), {self.day: 2, self.day + timedelta(days=1): 1})
+        delete_url = reverse('admin:api_reservation_delete', args=[reservation.id])
+        self.assertEqual(self.client.post(delete_url, {'post': 'yes'}).status_code, 302)
+        self.assertEqual(self.sold(), {self.day: 2, self.day + timedelta(days=1): 0})
+
+    def test_room_decides_hotel_and_type(self):
+        """Test moving a reservation to another room takes that room's hotel and type"""
+        reservation = Reservation.objects.create(user=self.user, room=self.rooms[0], check_in=self.day,
+                                                 check_out=self.day + timedelta(days=1))
+        other = Hotel.objects.create(name='Other Hotel', description='Test', address='Test', rating=3.0)
+        suite = Room.objects.create(hotel=other, room_number='9', room_type='SUITE', price_per_night=300.00, capacity=4)
+        reservation.room = suite
+        reservation.save()
+        reservation.refresh_from_db()
+        self.assertEqual((reservation.hotel_id, reservation.room_type), (other.id, 'SUITE'))
+
+    def test_itinerary_claims_in_sorted_order(self):
+        """Test itinerary segments take their counters in one global order"""
+        other = Hotel.objects.create(name='First Hotel', description='Test', address='Test', rating=3.0,
+                                     inventory_by_type=True)
+        single = Room.objects.create(hotel=other, room_number='1', room_type='SINGLE', price_per_night=80.00, capacity=1)
+        later, earlier = self.day + timedelta(days=3), self.day
+        segments = [
+            {'room': self.rooms[0], 'check_in': later, 'check_out': later + timedelta(days=1)},
+            {'room': self.rooms[1], 'check_in': earlier, 'check_out': earlier + timedelta(days=1)},
+            {'room': single, 'check_in': later, 'check_out': later + timedelta(days=1)},
+        ]
+        with mock.patch.object(booking, 'claim', wraps=booking.claim) as claim:
+            booking.book_itinerary(self.user, segments)
+        order = [(call.args[0].id, call.args[1], call.args[2]) for call in claim.call_args_list]
+        self.assertEqual(order, sorted(order))
+
+    def test_availability_endpoint(self):
+        """Test availability reads the counters in typed hotels"""
+        self.book(hotel=self.hotel.id, room_type='DOUBLE')
+        url = reverse('hotel-availability', args=[self.hotel.id])
+        response = self.client.get(url, {'check_in': self.day.isoformat(),
+                                         'check_out': (self.day + timedelta(days=5)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'SINGLE': 0, 'DOUBLE': 2, 'SUITE': 0})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_availability_of_room_hotel(self):
+        """Test hotels selling rooms count the rooms free for the whole stay"""
+        self.hotel.inventory_by_type = False
+        self.hotel.save()
+        Reservation.objects.create(user=self.user, room=self.rooms[0], check_in=self.day + timedelta(days=1),
+                                   check_out=self.day + timedelta(days=2))
+        response = self.client.get(reverse('hotel-availability', args=[self.hotel.id]), {
+            'check_in': self.day.isoformat(), 'check_out': (self.day + timedelta(days=3)).isoformat(),
+        })
+        self.assertEqual(response.data['DOUBLE'], 1)
+
+    def test_assign_rooms(self):
+        """Test arrivals get free rooms of their type and overbooked stays are reported"""
+        Reservation.objects.create(user=self.user, room=self.rooms[0], check_in=self.day, check_out=self.day + timedelta(days=1))
+        pending = [
+            Reservation.objects.create(user=self.user, hotel=self.hotel, room_type='DOUBLE',
+                                       check_in=self.day, check_out=self.day + timedelta(days=2))
+            for _ in range(2)
+        ]
+        unassigned = assign_rooms(self.hotel, self.day + timedelta(days=1))
+        self.assertEqual(unassigned, [pending[1]])
+        pending[0].refresh_from_db()
+        self.assertEqual(pending[0].room, self.rooms[1])
+
+    def test_rebuild_counts_existing_reservations(self):
+        """Test switching a hotel to room types counts the stays it already has"""
+        hotel = Hotel.objects.create(name='Switching', description='Test', address='Test', rating=3.0)
+        room = Room.objects.create(hotel=hotel, room_number='1', room_type='SUITE', price_per_night=300.00, capacity=4)
+        Reservation.objects.create(user=self.user, room=room, check_in=self.day, check_out=self.day + timedelta(days=2))
+        hotel.inventory_by_type = True
+        hotel.save()
+        rebuild(hotel)
+        self.assertEqual(
+            sorted(RoomTypeNight.objects.filter(hotel=hotel).values_list('room_type', 'night', 'sold')),
+            [('SUITE', self.day, 1), ('SUITE', self.day + timedelta(days=1), 1)],
+        )
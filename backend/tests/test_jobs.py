@@ -0,0 +1,117 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+from api.models import Hotel, Room, Job, Reservation
+from api.jobs import enqueue, run_pending
+
+calls = []
+
+def record(value):
+    calls.append(value)
+
+def explode():
+    raise RuntimeError('boom')
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Test a queued job runs once and is marked done"""
+        job = enqueue(record, value=42)
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(job.name, f'{record.__module__}.record')
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [42])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(job.attempts, 1)
+
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [42])
+
+    def test_idempotency_key(self):
+        """Test jobs with the same key are only queued once"""
+        first = enqueue(record, key='only-once', value=1)
+        second = enqueue(record, key='only-once', value=2)
+        self.assertEqual(first.pk, second.pk)
+        run_pending()
+        self.assertEqual(calls, [1])
+
+    def test_delayed_job_waits(self):
+        """Test jobs are not run before their run_at"""
+        enqueue(record, delay=60, value=1)
+        self.assertEqual(run_pending(), 0)
+
+    def test_failed_job_is_retried_then_failed(self):
+        """Test failures back off and give up after max attempts"""
+        job = enqueue(explode)
+        Job.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_running_job_is_requeued(self):
+        """Test jobs left running by a dead worker are picked up again"""
+        job = enqueue(record, value=7)
+        Job.objects.filter(pk=job.pk).update(status='RUNNING')
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [7])
+
+    def test_booking_queues_confirmation(self):
+        """Test creating a reservation queues a confirmation sent by the worker"""
+        user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        hotel = Hotel.objects.create(name='Job Hotel', description='Test', address='Test', rating=4.0)
+        room = Room.objects.create(hotel=hotel, room_number='701', room_type='SINGLE', price_per_night=80.00, capacity=1)
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(reverse('reservation-list'), {
+            'room': room.id,
+            'check_in': (date.today() + timedelta(days=3)).isoformat(),
+            'check_out': (date.today() + timedelta(days=5)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Nothing is sent on the request path
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Job.objects.filter(key=f"booking-confirmation:{response.data['id']}").exists())
+
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertIn('Ran 1 job(s).', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Job Hotel', mail.outbox[0].subject)
+
+    def test_booking_is_rolled_back_when_queueing_fails(self):
+        """Test a booking is only kept together with its confirmation job"""
+        user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        hotel = Hotel.objects.create(name='Job Hotel', description='Test', address='Test', rating=4.0)
+        room = Room.objects.create(hotel=hotel, room_number='701', room_type='SINGLE', price_per_night=80.00, capacity=1)
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with mock.patch('api.views.enqueue', side_effect=RuntimeError('queue down')), self.assertRaises(RuntimeError):
+            client.post(reverse('reservation-list'), {
+                'room': room.id,
+                'check_in': (date.today() + timedelta(days=3)).isoformat(),
+                'check_out': (date.today() + timedelta(days=5)).isoformat()
+            }, format='json')
+        self.assertFalse(Reservation.objects.exists())
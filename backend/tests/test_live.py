@@ -0,0 +1,112 @@
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from datetime import date, timedelta
+import json
+from api.live import InProcessBroker, Subscription, get_broker
+from api.models import Hotel, Room, Reservation
+
+def parse(chunk):
+    chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+    fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if not line.startswith(':'))
+    return int(fields['id']), json.loads(fields['data'])
+
+class BrokerTest(TransactionTestCase):
+    def test_fan_out_by_hotel(self):
+        """Test events only reach subscribers of the event's hotel"""
+        broker = InProcessBroker()
+        first, second, other = Subscription(1), Subscription(1), Subscription(2)
+        for subscription in (first, second, other):
+            broker.subscribe(subscription)
+        broker.publish([{'id': 5, 'hotel': 1}])
+        self.assertEqual(first.get(0), {'id': 5, 'hotel': 1})
+        self.assertEqual(second.get(0), {'id': 5, 'hotel': 1})
+        self.assertIsNone(other.get(0))
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        self.assertEqual(broker.subscriber_count(1), 0)
+        self.assertEqual(broker.subscriber_count(2), 1)
+
+    def test_slow_subscriber_overflows(self):
+        """Test a full queue marks the subscriber for disconnection"""
+        broker = InProcessBroker()
+        subscription = Subscription(1)
+        broker.subscribe(subscription)
+        broker.publish([{'id': i, 'hotel': 1} for i in range(101)])
+        self.assertTrue(subscription.overflowed)
+
+@override_settings(LIVE_HEARTBEAT_SECONDS=0.01, LIVE_WSGI_STREAMS=True)
+class AvailabilityStreamTest(TransactionTestCase):
+    def setUp(self):
+        # A fresh broker per test, with no subscribers left over
+        get_broker.cache_clear()
+        self.user = User.objects.create_user(username='guest', password='guestpass')
+        self.hotel = Hotel.objects.create(name='Live Hotel', description='Test', address='Test', rating=4.0)
+        self.room = Room.objects.create(hotel=self.hotel, room_number='101', room_type='SINGLE', price_per_night=80.00, capacity=1)
+        self.url = reverse('hotel_availability_stream', args=[self.hotel.id])
+
+    def book(self, days):
+        return Reservation.objects.create(user=self.user, room=self.room, check_in=date.today() + timedelta(days=days),
+                                          check_out=date.today() + timedelta(days=days + 2))
+
+    def test_pushes_bookings_and_cancellations(self):
+        """Test open streams receive committed reservation changes"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry:'))
+        self.assertEqual(get_broker().subscriber_count(self.hotel.id), 1)
+
+        reservation = self.book(3)
+        _, event = parse(next(stream))
+        self.assertEqual((event['action'], event['room'], event['reservation']), ('CREATE', self.room.id, reservation.id))
+        self.assertEqual(event['check_in'], reservation.check_in.isoformat())
+        self.assertNotIn('user', event)
+
+        reservation.delete()
+        _, event = parse(next(stream))
+        self.assertEqual((event['action'], event['check_in']), ('DELETE', reservation.check_in.isoformat()))
+
+        # Idle streams send keepalive comments
+        self.assertTrue(next(stream).startswith(b':'))
+        response.close()
+        self.assertEqual(get_broker().subscriber_count(self.hotel.id), 0)
+
+    def test_last_event_id_replays_missed_changes(self):
+        """Test a reconnecting client first gets what it missed"""
+        response = self.client.get(self.url)
+        stream = iter(response.streaming_content)
+        next(stream)
+        self.book(3)
+        last_id, _ = parse(next(stream))
+        response.close()
+
+        second = self.book(10)
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID=str(last_id))
+        stream = iter(response.streaming_content)
+        next(stream)
+        _, event = parse(next(stream))
+        self.assertEqual(event['reservation'], second.id)
+        response.close()
+
+    async def test_async_stream(self):
+        """Test ASGI requests are served from an async generator"""
+        response = await self.async_client.get(self.url)
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        reservation = await sync_to_async(self.book)(3)
+        _, event = parse(await anext(stream))
+        self.assertEqual(event['reservation'], reservation.id)
+
+    @override_settings(LIVE_WSGI_STREAMS=False)
+    def test_no_wsgi_streams_by_default(self):
+        """Test WSGI servers turn streams away with a 204 rather than hold a thread"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(get_broker().subscriber_count(self.hotel.id), 0)
+
+    def test_unknown_hotel(self):
+        """Test streams for missing hotels are 404"""
+        self.assertEqual(self.client.get(reverse('hotel_availability_stream', args=[999])).status_code, 404)
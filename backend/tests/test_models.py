@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.contrib.auth.models import User
 from datetime import date, timedelta
 from api.models import Hotel, Room, Reservation
@@ -31,8 +32,9 @@ class HotelModelTest(TestCase):
         self.assertEqual(hotel.rating, 3.0)
 
 class RoomModelTest(TestCase):
-    def setUp(self):
-        self.hotel = Hotel.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = Hotel.objects.create(
             name="Test Hotel",
             description="Test",
             address="Test Address",
@@ -81,27 +83,28 @@ class RoomModelTest(TestCase):
             room.full_clean()  # This will trigger validators
 
 class ReservationModelTest(TestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username="testuser",
             password="testpass123",
             email="test@example.com"
         )
-        self.hotel = Hotel.objects.create(
+        cls.hotel = Hotel.objects.create(
             name="Reservation Hotel",
             description="Test",
             address="Test",
             rating=4.0
         )
-        self.room = Room.objects.create(
-            hotel=self.hotel,
+        cls.room = Room.objects.create(
+            hotel=cls.hotel,
             room_number="201",
             room_type="SUITE",
             price_per_night=250.00,
             capacity=3
         )
-        self.tomorrow = date.today() + timedelta(days=1)
-        self.next_week = date.today() + timedelta(days=7)
+        cls.tomorrow = date.today() + timedelta(days=1)
+        cls.next_week = date.today() + timedelta(days=7)
 
     def test_create_reservation(self):
         """Test reservation creation"""
@@ -134,4 +137,45 @@ class ReservationModelTest(TestCase):
             reservation.full_clean()
         except ValidationError as e:
             # If you want to prevent past dates, this will raise error
-            self.assertIn('check_in', e.message_dict)
\ No newline at end of file
+            self.assertIn('check_in', e.message_dict)
+
+class IntegrityConstraintTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="constrained",
+            password="testpass123",
+            email="constrained@example.com"
+        )
+        cls.hotel = Hotel.objects.create(
+            name="Constraint Hotel",
+            description="Test",
+            address="Test",
+            rating=4.0
+        )
+        cls.room = Room.objects.create(
+            hotel=cls.hotel,
+            room_number="301",
+            room_type="SINGLE",
+            price_per_night=90.00,
+            capacity=1
+        )
+
+    def test_room_number_unique_per_hotel(self):
+        """Test the database rejects a duplicate room number in one hotel"""
+        other_hotel = Hotel.objects.create(name="Other", description="Test", address="Test", rating=3.0)
+        Room.objects.create(hotel=other_hotel, room_number="301", room_type="SINGLE", price_per_night=90.00, capacity=1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Room.objects.create(hotel=self.hotel, room_number="301", room_type="DOUBLE", price_per_night=120.00, capacity=2)
+
+    def test_check_in_before_check_out(self):
+        """Test the database rejects reservations that end before they start"""
+        day = date.today() + timedelta(days=3)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.create(user=self.user, room=self.room, check_in=day, check_out=day)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.bulk_create([
+                Reservation(user=self.user, room=self.room, check_in=day, check_out=day - timedelta(days=1))
+            ])
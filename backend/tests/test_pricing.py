@@ -0,0 +1,87 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from api.models import Hotel, Room, Reservation
+from api.pricing import multiplier, multipliers
+
+CURVES = {'default': ((0.5, '1.10'), (0.75, '1.25')), 'SUITE': ((0.5, '2.00'),)}
+
+@override_settings(PRICING_CURVES=CURVES)
+class DynamicPricingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.hotel = Hotel.objects.create(name='Priced Hotel', description='Test', address='Test', rating=4.0)
+        cls.rooms = [
+            Room.objects.create(hotel=cls.hotel, room_number=str(100 + n), room_type='DOUBLE',
+                                price_per_night=100.00, capacity=2)
+            for n in range(4)
+        ]
+        cls.today = date.today()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def book(self, room, nights=1, first=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(user=self.user, room=room, check_in=self.today + timedelta(days=first),
+                                              check_out=self.today + timedelta(days=first + nights))
+
+    def current_price(self, room):
+        return self.client.get(reverse('room-detail', args=[room.id])).data['current_price']
+
+    def test_curve_steps(self):
+        """Test the highest step reached applies, per room type"""
+        self.assertEqual(multiplier('DOUBLE', 0.2), Decimal(1))
+        self.assertEqual(multiplier('DOUBLE', 0.5), Decimal('1.10'))
+        self.assertEqual(multiplier('DOUBLE', 1.2), Decimal('1.25'))
+        self.assertEqual(multiplier('SUITE', 0.6), Decimal('2.00'))
+
+    def test_price_follows_occupancy(self):
+        """Test booking half the doubles tonight raises their price"""
+        self.assertEqual(self.current_price(self.rooms[3]), '100.00')
+        self.book(self.rooms[0])
+        self.book(self.rooms[1])
+        self.assertEqual(self.current_price(self.rooms[3]), '110.00')
+        response = self.client.get(reverse('room-list'))
+        self.assertEqual({room['current_price'] for room in response.data}, {'110.00'})
+
+    def test_cancellation_reprices_its_nights(self):
+        """Test cancelling gives back the lower price"""
+        self.book(self.rooms[0])
+        reservation = self.book(self.rooms[1])
+        self.assertEqual(self.current_price(self.rooms[3]), '110.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.delete()
+        self.assertEqual(self.current_price(self.rooms[3]), '100.00')
+
+    def test_moved_stay_reprices_old_and_new_nights(self):
+        """Test an edited stay reprices the nights it left as well"""
+        self.book(self.rooms[0], first=1)
+        moved = self.book(self.rooms[1], first=1)
+        night = self.today + timedelta(days=1)
+        self.assertEqual(multipliers(self.hotel.id, 'DOUBLE', [night])[night], Decimal('1.10'))
+        moved.check_in, moved.check_out = self.today + timedelta(days=2), self.today + timedelta(days=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(multipliers(self.hotel.id, 'DOUBLE', [night])[night], Decimal(1))
+
+    def test_grid_is_cached(self):
+        """Test listing rooms reads prices from the grid, not the database"""
+        self.client.get(reverse('room-list'))
+        # The rooms themselves, nothing for their prices
+        with self.assertNumQueries(1):
+            self.client.get(reverse('room-list'))
+
+    def test_new_room_starts_a_fresh_grid(self):
+        """Test adding a room lowers occupancy for every cached night"""
+        self.book(self.rooms[0])
+        self.book(self.rooms[1])
+        self.assertEqual(self.current_price(self.rooms[3]), '110.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            Room.objects.create(hotel=self.hotel, room_number='200', room_type='DOUBLE', price_per_night=100.00, capacity=2)
+        self.assertEqual(self.current_price(self.rooms[3]), '100.00')
@@ -0,0 +1,312 @@
+from itertools import count
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from datetime import date, timedelta
+from api import urls
+from api.models import (
+    ArchivedReservation, Hotel, Itinerary, Reservation, Review, Room, SimilarHotel, WaitlistEntry,
+)
+from query_guard import QueryGuardMixin
+
+# Routes of api/urls.py counted below
+COUNTED = {
+    'token_obtain_pair', 'token_refresh', 'auth_register', 'current_user', 'change_feed', 'api-root',
+    'hotel-list', 'hotel-detail', 'hotel-availability', 'hotel-similar', 'room-list', 'room-detail',
+    'reservation-list', 'reservation-detail', 'reservation-archived', 'itinerary-list', 'itinerary-detail',
+    'waitlist-list', 'waitlist-detail', 'review-list', 'review-detail',
+}
+# Streams until the client disconnects; tests/test_live.py covers its queries
+UNCOUNTED = {'hotel_availability_stream'}
+
+# Count room prices as if the occupancy grid (api/pricing.py) were cold
+NO_PRICING_CACHE = {
+    'CACHES': {**settings.CACHES, 'pricing': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'PRICING_CACHE': 'pricing',
+}
+
+@override_settings(**NO_PRICING_CACHE)
+class EndpointQueryCountTest(QueryGuardMixin, TestCase):
+    """Exact queries per endpoint of api/urls.py with 1, 10 and 100 rows behind it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.hotel = Hotel.objects.create(name='Counted Hotel', description='Test', address='Test', rating=4.0)
+        cls.room = Room.objects.create(hotel=cls.hotel, room_number='1', room_type='DOUBLE', price_per_night=100, capacity=2)
+        cls.today = date.today()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.numbers = count(100)
+        self.nights = count(1)
+
+    def assertEndpoint(self, name, grow, expected, args=(), query=''):
+        self.assertIn(name, COUNTED)
+        url = reverse(name, args=args) + query
+        return self.assertQueryCounts(lambda: self.client.get(url), grow, expected)
+
+    def hotels(self, n):
+        for _ in range(n):
+            hotel = Hotel.objects.create(name='Hotel', description='Test', address='Test', rating=3.0)
+            Room.objects.create(hotel=hotel, room_number='1', room_type='SINGLE', price_per_night=50, capacity=1)
+            Room.objects.create(hotel=hotel, room_number='2', room_type='SUITE', price_per_night=200, capacity=4)
+
+    def rooms(self, n):
+        Room.objects.bulk_create([
+            Room(hotel=self.hotel, room_number=str(next(self.numbers)), room_type='DOUBLE', price_per_night=100, capacity=2)
+            for _ in range(n)
+        ])
+
+    def stays(self, n, user=None, room=None, past=False):
+        """``n`` one-night stays in a row, in the past or from tomorrow on."""
+        reservations = []
+        for _ in range(n):
+            offset = next(self.nights)
+            check_in = self.today + timedelta(days=-offset - 1 if past else offset)
+            reservations.append(Reservation.objects.create(
+                user=user or self.guest, room=room or self.room, check_in=check_in, check_out=check_in + timedelta(days=1),
+            ))
+        return reservations
+
+    def test_every_endpoint_is_counted(self):
+        """Test a route added to api/urls.py needs counts here too"""
+        names = {pattern.name for pattern in urls.urlpatterns if isinstance(pattern, URLPattern)}
+        self.assertEqual(names - UNCOUNTED, COUNTED)
+
+    def test_hotels(self):
+        self.assertEndpoint('hotel-list', self.hotels, 4)
+        self.assertEndpoint('hotel-detail', self.rooms, 4, args=[self.hotel.id])
+        self.assertEndpoint('hotel-availability', self.rooms, 2, args=[self.hotel.id],
+                            query=f'?check_in={self.today}&check_out={self.today + timedelta(days=3)}')
+
+    def test_similar_hotels(self):
+        def similar(n):
+            start = SimilarHotel.objects.filter(hotel=self.hotel).count()
+            self.hotels(n)
+            others = Hotel.objects.exclude(pk=self.hotel.pk).order_by('-id')[:n]
+            SimilarHotel.objects.bulk_create([
+                SimilarHotel(hotel=self.hotel, similar=other, rank=start + rank, score=0.5)
+                for rank, other in enumerate(others, 1)
+            ])
+        self.assertEndpoint('hotel-similar', similar, 1, args=[self.hotel.id])
+
+    def test_rooms(self):
+        self.assertEndpoint('room-list', self.rooms, 3)
+        self.assertEndpoint('room-detail', self.stays, 3, args=[self.room.id])
+
+    def test_reservations(self):
+        self.assertEndpoint('reservation-list', self.stays, 1)
+        self.assertEndpoint('reservation-list', self.stays, 1, query='?status=upcoming&page_size=100')
+        [reservation] = self.stays(1)
+        self.assertEndpoint('reservation-detail', self.stays, 1, args=[reservation.id])
+
+    def test_archived_reservations(self):
+        def archive(n):
+            ArchivedReservation.objects.bulk_create([
+                ArchivedReservation(original_id=next(self.numbers), user=self.guest, room=self.room, hotel=self.hotel,
+                                    room_number='1', hotel_name='Counted Hotel', check_in=self.today - timedelta(days=9),
+                                    check_out=self.today - timedelta(days=8), created_at=timezone.now())
+                for _ in range(n)
+            ])
+        self.assertEndpoint('reservation-archived', archive, 1)
+
+    def test_itineraries(self):
+        def itineraries(n):
+            for _ in range(n):
+                itinerary = Itinerary.objects.create(user=self.guest)
+                for reservation in self.stays(2):
+                    reservation.itinerary = itinerary
+                    reservation.save(update_fields=['itinerary'])
+        self.assertEndpoint('itinerary-list', itineraries, 2)
+        itinerary = Itinerary.objects.filter(user=self.guest).first()
+        self.assertEndpoint('itinerary-detail', itineraries, 2, args=[itinerary.id])
+
+    def test_waitlist(self):
+        def entries(n):
+            for _ in range(n):
+                check_in = self.today + timedelta(days=next(self.nights))
+                WaitlistEntry.objects.create(user=self.guest, hotel=self.hotel, room=self.room,
+                                             check_in=check_in, check_out=check_in + timedelta(days=1))
+        self.assertEndpoint('waitlist-list', entries, 1)
+        entry = WaitlistEntry.objects.filter(user=self.guest).first()
+        self.assertEndpoint('waitlist-detail', entries, 1, args=[entry.id])
+
+    def test_reviews(self):
+        def reviews(n):
+            for _ in range(n):
+                user = User.objects.create_user(username=f'reviewer{next(self.numbers)}', password='x')
+                [stay] = self.stays(1, user=user, past=True)
+                Review.objects.create(user=user, hotel=self.hotel, reservation=stay, rating=4)
+        self.assertEndpoint('review-list', reviews, 1, query=f'?hotel={self.hotel.id}')
+        review = Review.objects.first()
+        self.assertEndpoint('review-detail', reviews, 1, args=[review.id])
+
+    def test_booking(self):
+        """Test booking checks the room, its overlaps and the inventory in a fixed number of queries"""
+        def book():
+            check_in = self.today + timedelta(days=next(self.nights))
+            return self.client.post(reverse('reservation-list'), {
+                'room': self.room.id, 'check_in': check_in, 'check_out': check_in + timedelta(days=1),
+            }, format='json')
+        # Two of them are the savepoint around saving and queueing the confirmation
+        self.assertQueryCounts(book, self.stays, 15)
+
+    def test_change_feed(self):
+        self.assertEndpoint('change_feed', self.hotels, 1, query='?since=0')
+
+    def test_accounts(self):
+        users = lambda n: User.objects.bulk_create([  # noqa: E731
+            User(username=f'user{next(self.numbers)}', email=f'user{next(self.numbers)}@example.com') for _ in range(n)
+        ])
+        self.assertEndpoint('current_user', users, 0)
+        self.client.force_authenticate(None)
+        self.assertEndpoint('api-root', users, 0)
+
+        def register():
+            number = next(self.numbers)
+            return self.client.post(reverse('auth_register'), {
+                'username': f'new{number}', 'email': f'new{number}@example.com', 'password': 'newpass123',
+                'date_of_birth': '1990-01-01',
+            }, format='json')
+        self.assertQueryCounts(register, users, 4)
+
+        login = lambda: self.client.post(reverse('token_obtain_pair'), {  # noqa: E731
+            'username': 'guest', 'password': 'guestpass',
+        }, format='json')
+        self.assertQueryCounts(login, users, 1)
+
+        refresh = login().data['refresh']
+        self.assertQueryCounts(lambda: self.client.post(reverse('token_refresh'), {'refresh': refresh}, format='json'),
+                               users, 1)
+
+
+@override_settings(**NO_PRICING_CACHE)
+class AdminQueryCountTest(QueryGuardMixin, TestCase):
+    """Exact queries per admin changelist with 1, 10 and 100 rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
+        cls.hotel = Hotel.objects.create(name='Admin Hotel', description='Test', address='Test', rating=4.0)
+        cls.room = Room.objects.create(hotel=cls.hotel, room_number='1', room_type='DOUBLE', price_per_night=100, capacity=2)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.nights = count(1)
+
+    def stays(self, n):
+        for _ in range(n):
+            check_in = date.today() + timedelta(days=next(self.nights))
+            user = User.objects.create_user(username=f'guest{check_in}', password='x')
+            reservation = Reservation.objects.create(user=user, room=self.room, check_in=check_in,
+                                                     check_out=check_in + timedelta(days=1))
+            WaitlistEntry.objects.create(user=user, hotel=self.hotel, room=self.room, check_in=check_in,
+                                         check_out=check_in + timedelta(days=1))
+            Review.objects.create(user=user, hotel=self.hotel, reservation=reservation, rating=5)
+            ArchivedReservation.objects.create(original_id=-reservation.id, user=user, room=self.room, hotel=self.hotel,
+                                               room_number='1', hotel_name='Admin Hotel', check_in=check_in,
+                                               check_out=check_in + timedelta(days=1), created_at=timezone.now())
+            Room.objects.create(hotel=Hotel.objects.create(name='Other', description='Test', address='Test'),
+                                room_number='1', room_type='SUITE', price_per_night=300, capacity=4)
+
+    def assertChangelist(self, name, expected):
+        url = reverse(f'admin:{name}')
+        self.assertQueryCounts(lambda: self.client.get(url), self.stays, expected)
+
+    def test_hotel_changelist(self):
+        self.assertChangelist('api_hotel_changelist', 6)
+
+    def test_room_changelist(self):
+        self.assertChangelist('api_room_changelist', 5)
+
+    def test_reservation_changelist(self):
+        self.assertChangelist('api_reservation_changelist', 5)
+
+    def test_archived_reservation_changelist(self):
+        self.assertChangelist('api_archivedreservation_changelist', 5)
+
+    def test_review_changelist(self):
+        self.assertChangelist('api_review_changelist', 6)
+
+    def test_waitlist_changelist(self):
+        self.assertChangelist('api_waitlistentry_changelist', 5)
+
+class QueryPlanTest(QueryGuardMixin, TestCase):
+    """Overlap and history lookups on reservations must go through an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.other = User.objects.create_user(username='other', password='otherpass', email='other@example.com')
+        cls.hotel = Hotel.objects.create(name='Planned Hotel', description='Test', address='Test', rating=4.0)
+        cls.typed = Hotel.objects.create(name='Typed Hotel', description='Test', address='Test', rating=4.0,
+                                         inventory_by_type=True)
+        cls.rooms = [
+            Room.objects.create(hotel=hotel, room_number=str(n), room_type='DOUBLE', price_per_night=100, capacity=2)
+            for hotel in (cls.hotel, cls.typed) for n in range(3)
+        ]
+        today = date.today()
+        for n in range(-20, 20):
+            for user, room in ((cls.guest, cls.rooms[0]), (cls.other, cls.rooms[1])):
+                Reservation.objects.create(user=user, room=room, check_in=today + timedelta(days=2 * n),
+                                           check_out=today + timedelta(days=2 * n + 1))
+        cls.free = today + timedelta(days=101)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, response.data)
+        return queries
+
+    def test_booking_overlap(self):
+        queries = self.queries('post', reverse('reservation-list'), {
+            'room': self.rooms[0].id, 'check_in': self.free, 'check_out': self.free + timedelta(days=2),
+        })
+        self.assertNoFullScans(queries, 'api_reservation')
+
+    def test_itinerary_overlap(self):
+        queries = self.queries('post', reverse('itinerary-list'), {'reservations': [
+            {'room': self.rooms[0].id, 'check_in': self.free, 'check_out': self.free + timedelta(days=1)},
+            {'room': self.rooms[2].id, 'check_in': self.free + timedelta(days=1), 'check_out': self.free + timedelta(days=2)},
+        ]})
+        self.assertNoFullScans(queries, 'api_reservation')
+
+    def test_room_type_booking(self):
+        queries = self.queries('post', reverse('reservation-list'), {
+            'hotel': self.typed.id, 'room_type': 'DOUBLE', 'check_in': self.free, 'check_out': self.free + timedelta(days=2),
+        })
+        self.assertNoFullScans(queries, 'api_roomtypenight')
+
+    def test_availability(self):
+        queries = self.queries('get', reverse('hotel-availability', args=[self.hotel.id])
+                               + f'?check_in={self.free}&check_out={self.free + timedelta(days=2)}')
+        self.assertNoFullScans(queries, 'api_reservation')
+
+    def test_history(self):
+        url = reverse('reservation-list')
+        for query in ('', '?status=upcoming', '?status=current', '?status=past', '?status=past&page_size=5'):
+            with self.subTest(query):
+                self.assertNoFullScans(self.queries('get', url + query), 'api_reservation')
+
+    def test_archived_history(self):
+        ArchivedReservation.objects.create(original_id=0, user=self.guest, room_number='1', hotel_name='Gone',
+                                           check_in=date(2020, 1, 1), check_out=date(2020, 1, 2), created_at=timezone.now())
+        self.assertNoFullScans(self.queries('get', reverse('reservation-archived')), 'api_archivedreservation')
+
+    def test_full_scans_are_caught(self):
+        """Test the check itself fails on an unindexed filter"""
+        with CaptureQueriesContext(connection) as queries:
+            list(Reservation.objects.filter(check_out__gt=self.free))
+        with self.assertRaises(AssertionError):
+            self.assertNoFullScans(queries, 'api_reservation')
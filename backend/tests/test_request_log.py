@@ -0,0 +1,114 @@
+import io
+import json
+import logging
+import logging.config
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.models import Hotel
+from api.request_log import BackgroundHandler, JsonFormatter
+
+@override_settings(REQUEST_LOG_SAMPLE_RATES={'*': 1.0, 'room-list': 0.0}, REQUEST_LOG_SLOW_MS=10_000)
+class RequestLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        Hotel.objects.create(name='Logged Hotel', description='Test', address='Test', rating=4.0)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def logged(self, url):
+        with self.assertLogs('api.requests', level='INFO') as logs:
+            self.client.get(url)
+        return logs.records
+
+    def test_request_fields(self):
+        """Test a sampled request is logged with its endpoint, user, status, latency and queries"""
+        self.client.force_authenticate(self.user)
+        [record] = self.logged(reverse('hotel-list'))
+        fields = record.fields
+        self.assertEqual(record.levelno, logging.INFO)
+        self.assertEqual((fields['endpoint'], fields['method'], fields['status']), ('hotel-list', 'GET', 200))
+        self.assertEqual(fields['user_id'], self.user.id)
+        self.assertEqual(fields['queries'], 2)
+        self.assertGreater(fields['latency_ms'], 0)
+        self.assertNotIn('slow_sql', fields)
+
+    def test_sampled_out(self):
+        """Test an endpoint sampled at 0 is not logged"""
+        with self.assertNoLogs('api.requests', level='INFO'):
+            self.client.get(reverse('room-list'))
+
+    @override_settings(REQUEST_LOG_SLOW_MS=0, REQUEST_LOG_TOP_SQL=1, REQUEST_LOG_SAMPLE_RATES={'*': 0.0})
+    def test_slow_request_has_top_sql(self):
+        """Test slow requests are logged whatever the sampling, with their slowest statement"""
+        [record] = self.logged(reverse('hotel-list'))
+        self.assertEqual(record.levelno, logging.WARNING)
+        self.assertIsNone(record.fields['user_id'])
+        [statement] = record.fields['slow_sql']
+        self.assertTrue(statement['sql'].startswith('SELECT'))
+        self.assertGreaterEqual(statement['ms'], 0)
+
+    def test_json_lines_from_background_thread(self):
+        """Test the handler writes formatted records from its own thread"""
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger('tests.request_log')
+        logger.addHandler(handler)
+        try:
+            logger.warning('GET %s', 'hotel-list', extra={'fields': {'status': 200}})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry['message'], entry['level'], entry['status']), ('GET hotel-list', 'WARNING', 200))
+
+    def test_full_queue_drops(self):
+        """Test records are dropped rather than waited on when the queue is full"""
+        handler = BackgroundHandler(io.StringIO(), maxsize=1)
+        handler.listener.stop()
+        try:
+            for _ in range(3):
+                handler.handle(logging.makeLogRecord({'msg': 'request'}))
+            self.assertEqual(handler.dropped, 2)
+        finally:
+            handler.listener = None
+            handler.close()
+
+    def test_exception_traceback_is_kept(self):
+        """Test a record logged with exc_info is written with its traceback"""
+        stream = io.StringIO()
+        handler = BackgroundHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger('tests.request_log')
+        logger.addHandler(handler)
+        try:
+            try:
+                raise ValueError('broken view')
+            except ValueError:
+                logger.error('GET %s', 'hotel-list', exc_info=True, extra={'fields': {'status': 500}})
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry['message'], 'GET hotel-list')
+        self.assertIn('ValueError: broken view', entry['exc'])
+
+    def test_logging_settings_configure(self):
+        """Test dictConfig accepts the LOGGING setting and builds a background handler"""
+        logger = logging.getLogger('api.requests')
+        saved = logger.handlers[:], logger.level, logger.propagate
+        try:
+            logging.config.dictConfig(settings.LOGGING)
+            [handler] = logger.handlers
+            self.assertIsInstance(handler, BackgroundHandler)
+            self.assertIsInstance(handler.target.formatter, JsonFormatter)
+        finally:
+            for handler in logger.handlers:
+                if handler not in saved[0]:
+                    handler.close()
+            logger.handlers[:], logger.level, logger.propagate = saved
@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from datetime import date, timedelta
+from api.models import Change, Hotel, Room, Reservation, Review
+from api.reviews import recount
+
+class ReviewTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', password='guestpass', email='guest@example.com')
+        cls.other = User.objects.create_user(username='other', password='otherpass', email='other@example.com')
+        cls.hotel = Hotel.objects.create(name='Reviewed Hotel', description='Test', address='Test', rating=4.0)
+        cls.room = Room.objects.create(hotel=cls.hotel, room_number='101', room_type='DOUBLE', price_per_night=120.00, capacity=2)
+        cls.past = [
+            Reservation.objects.create(user=cls.guest, room=cls.room, check_in=date.today() - timedelta(days=10 + 3 * n),
+                                       check_out=date.today() - timedelta(days=8 + 3 * n))
+            for n in range(3)
+        ]
+        cls.upcoming = Reservation.objects.create(user=cls.guest, room=cls.room, check_in=date.today() + timedelta(days=3),
+                                                  check_out=date.today() + timedelta(days=5))
+
+    def review(self, reservation, rating, user=None):
+        self.client.force_authenticate(user=user or self.guest)
+        return self.client.post(reverse('review-list'), {'reservation': reservation.id, 'rating': rating}, format='json')
+
+    def test_reviews_update_hotel_average(self):
+        """Test each review moves the stored count and average"""
+        self.assertEqual(self.review(self.past[0], 5).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.review(self.past[1], 4).status_code, status.HTTP_201_CREATED)
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.review_count, self.hotel.review_total, self.hotel.review_average), (2, 9, 4.5))
+
+    def test_adding_a_review_does_not_aggregate(self):
+        """Test the hotel update is constant work: two single-row UPDATEs and its change log"""
+        self.review(self.past[0], 5)
+        self.client.force_authenticate(user=self.guest)
+        # Reservation, duplicate check, savepoint, INSERT, 2 UPDATEs, hotel and Change for the log, release
+        with self.assertNumQueries(9):
+            self.client.post(reverse('review-list'), {'reservation': self.past[1].id, 'rating': 3}, format='json')
+
+    def test_reviews_change_hotel_version(self):
+        """Test adding and removing reviews bumps the hotel's version and logs the change"""
+        version = Hotel.objects.get(pk=self.hotel.pk).version
+        review_id = self.review(self.past[0], 5).data['id']
+        self.assertEqual(self.client.delete(reverse('review-detail', args=[review_id])).status_code, status.HTTP_204_NO_CONTENT)
+        recount(self.hotel)
+        self.assertEqual(Hotel.objects.get(pk=self.hotel.pk).version, version + 3)
+        logged = Change.objects.filter(model='hotel', object_id=self.hotel.pk, action=Change.UPDATE)
+        self.assertEqual([change.data['version'] for change in logged.order_by('id')], [version + 1, version + 2, version + 3])
+
+    def test_only_finished_own_stays_once(self):
+        """Test upcoming, someone else's and already reviewed stays are refused"""
+        self.assertEqual(self.review(self.upcoming, 5).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.review(self.past[0], 5, user=self.other).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.review(self.past[0], 6).status_code, status.HTTP_400_BAD_REQUEST)
+        self.review(self.past[0], 5)
+        self.assertEqual(self.review(self.past[0], 4).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_delete_and_cascade_subtract(self):
+        """Test deleting a review, or its author, takes it out of the average"""
+        review_id = self.review(self.past[0], 5).data['id']
+        self.review(self.past[1], 1)
+        self.assertEqual(self.client.delete(reverse('review-detail', args=[review_id])).status_code, status.HTTP_204_NO_CONTENT)
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.review_count, self.hotel.review_average), (1, 1.0))
+        self.guest.delete()
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.review_count, self.hotel.review_total, self.hotel.review_average), (0, 0, 0))
+
+    def test_list_is_paginated_newest_first(self):
+        """Test a hotel's reviews come in cursor pages, newest first"""
+        for reservation, rating in zip(self.past, (3, 4, 5)):
+            self.review(reservation, rating)
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('review-list'), {'hotel': self.hotel.id, 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([review['rating'] for review in response.data['results']], [5, 4])
+        self.assertEqual(response.data['results'][0]['username'], 'guest')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([review['rating'] for review in response.data['results']], [3])
+        self.assertEqual(self.client.get(reverse('review-list')).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_hotels_sorted_by_rating(self):
+        """Test ?ordering=rating lists the best reviewed hotels first"""
+        other = Hotel.objects.create(name='Unreviewed', description='Test', address='Test', rating=5.0)
+        self.review(self.past[0], 4)
+        response = self.client.get(reverse('hotel-list'), {'ordering': 'rating'})
+        self.assertEqual([hotel['id'] for hotel in response.data], [self.hotel.id, other.id])
+        self.assertEqual(response.data[0]['review_average'], 4.0)
+
+    def test_recount(self):
+        """Test recount rebuilds the statistics from the reviews"""
+        Review.objects.create(user=self.guest, hotel=self.hotel, reservation=self.past[0], rating=2)
+        Review.objects.create(user=self.guest, hotel=self.hotel, reservation=self.past[1], rating=3)
+        recount(self.hotel)
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.review_count, self.hotel.review_total, self.hotel.review_average), (2, 5, 2.5))
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+from django.urls import URLPattern
+from rest_framework.routers import DefaultRouter
+from api import urls
+from api.routing import LazyView
+from api.views import HotelViewSet, RoomViewSet, ReservationViewSet, ItineraryViewSet, WaitlistViewSet, ReviewViewSet
+
+def describe(patterns):
+    routes = {}
+    for pattern in patterns:
+        if not isinstance(pattern, URLPattern) or pattern.name is None or 'format' in str(pattern.pattern):
+            continue
+        view = pattern.callback.view if isinstance(pattern.callback, LazyView) else pattern.callback
+        # DRF adds 'head' to a view's actions once it has served a GET
+        actions = {method: action for method, action in getattr(view, 'actions', {}).items() if method != 'head'}
+        routes[pattern.name] = (str(pattern.pattern), actions, getattr(view, 'initkwargs', None))
+    return routes
+
+class LazyRoutingTest(SimpleTestCase):
+    def test_matches_default_router(self):
+        """Test the lazy routes are the ones DefaultRouter builds from the viewsets"""
+        router = DefaultRouter()
+        router.register(r'hotels', HotelViewSet, basename='hotel')
+        router.register(r'rooms', RoomViewSet, basename='room')
+        router.register(r'reservations', ReservationViewSet, basename='reservation')
+        router.register(r'itineraries', ItineraryViewSet, basename='itinerary')
+        router.register(r'waitlist', WaitlistViewSet, basename='waitlist')
+        router.register(r'reviews', ReviewViewSet, basename='review')
+
+        expected = describe(router.urls)
+        actual = describe(urls.urlpatterns)
+        for name, route in expected.items():
+            if name == 'api-root':
+                self.assertEqual(actual[name][0], route[0])
+                continue
+            self.assertEqual(actual.get(name), route, name)
+
+    def test_views_are_imported_on_first_call(self):
+        """Test LazyView defers the import until the view is needed"""
+        view = LazyView('api.views.CurrentUserView')
+        self.assertIsNone(view._view)
+        self.assertTrue(view.csrf_exempt)
+        self.assertEqual(view.view.view_class.__name__, 'CurrentUserView')
@@ -6,9 +6,10 @@ from api.models import Hotel, Room, Reservation
 from api.serializers import UserSerializer, HotelSerializer, RoomSerializer, ReservationSerializer
 
 class UserSerializerTest(TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         # Create an existing user for uniqueness tests
-        self.existing_user = User.objects.create_user(
+        cls.existing_user = User.objects.create_user(
             username='existinguser',
             email='existing@example.com',
             password='existingpass123'
@@ -223,16 +224,17 @@ class HotelSerializerTest(TestCase):
         self.assertEqual(data['rooms'][1]['room_number'], '102')
 
 class RoomSerializerTest(TestCase):
-    def setUp(self):
-        self.hotel = Hotel.objects.create(
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = Hotel.objects.create(
             name='Test Hotel',
             description='Test',
             address='Test Address',
             rating=4.0
         )
         
-        self.room_data = {
-            'hotel': self.hotel.id,
+        cls.room_data = {
+            'hotel': cls.hotel.id,
             'room_number': '201',
             'room_type': 'DOUBLE',
             'price_per_night': '120.00',
@@ -282,22 +284,23 @@ class RoomSerializerTest(TestCase):
             self.assertIn('price_per_night', serializer.errors)
 
 class ReservationSerializerTest(APITestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             password='testpass',
             email='test@example.com'
         )
         
-        self.hotel = Hotel.objects.create(
+        cls.hotel = Hotel.objects.create(
             name='Reservation Hotel',
             description='Test',
             address='Test',
             rating=4.0
         )
         
-        self.room = Room.objects.create(
-            hotel=self.hotel,
+        cls.room = Room.objects.create(
+            hotel=cls.hotel,
             room_number='301',
             room_type='SUITE',
             price_per_night=200.00,
@@ -305,15 +308,15 @@ class ReservationSerializerTest(APITestCase):
         )
         
         # Create an existing reservation
-        self.existing_reservation = Reservation.objects.create(
-            user=self.user,
-            room=self.room,
+        cls.existing_reservation = Reservation.objects.create(
+            user=cls.user,
+            room=cls.room,
             check_in=date.today() + timedelta(days=1),
             check_out=date.today() + timedelta(days=3)
         )
         
-        self.tomorrow = date.today() + timedelta(days=1)
-        self.next_week = date.today() + timedelta(days=7)
+        cls.tomorrow = date.today() + timedelta(days=1)
+        cls.next_week = date.today() + timedelta(days=7)
 
     def test_reservation_serializer_valid(self):
         """Test reservation serializer with valid data"""
@@ -0,0 +1,80 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from api.models import Hotel, HotelFeatures, Room, SimilarHotel
+from api.similarity import TEXT_DIMENSIONS, build, nearest, unpack
+
+class SimilarHotelsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def hotel(name, description, rating, rooms):
+            hotel = Hotel.objects.create(name=name, description=description, address='Test', rating=rating)
+            for n, (room_type, price, capacity) in enumerate(rooms):
+                Room.objects.create(hotel=hotel, room_number=str(100 + n), room_type=room_type,
+                                    price_per_night=price, capacity=capacity)
+            return hotel
+
+        suites = [('SUITE', 450, 4), ('SUITE', 500, 4), ('DOUBLE', 300, 2)]
+        singles = [('SINGLE', 40, 1), ('SINGLE', 45, 1), ('DOUBLE', 60, 2)]
+        cls.resort = hotel('Azure Resort', 'Beachfront luxury resort with spa, infinity pool and ocean views.', 4.8, suites)
+        cls.palace = hotel('Coral Palace', 'Luxury beachfront suites, private spa and ocean view terraces.', 4.6, suites)
+        cls.hostel = hotel('City Hostel', 'Budget rooms next to the train station, shared kitchen.', 3.5, singles)
+        cls.inn = hotel('Station Inn', 'Cheap budget rooms by the central train station.', 3.7, singles)
+        cls.empty = Hotel.objects.create(name='Not Open Yet', description='', address='Test', rating=0)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def similar(self, hotel):
+        return [row['id'] for row in self.client.get(reverse('hotel-similar', args=[hotel.id])).data]
+
+    def test_alike_hotels_rank_first(self):
+        """Test each hotel's closest match is the one with the same rooms, prices and description"""
+        build()
+        self.assertEqual(self.similar(self.resort)[0], self.palace.id)
+        self.assertEqual(self.similar(self.inn)[0], self.hostel.id)
+        self.assertNotIn(self.resort.id, self.similar(self.resort))
+        scores = list(SimilarHotel.objects.filter(hotel=self.resort).order_by('rank').values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_vectors_are_packed_float32(self):
+        """Test the stored vector is 4 bytes per feature"""
+        build()
+        stored = HotelFeatures.objects.get(hotel=self.resort).vector
+        self.assertEqual(len(stored), 4 * (TEXT_DIMENSIONS + 7))
+        self.assertEqual(len(unpack(stored)), TEXT_DIMENSIONS + 7)
+
+    def test_top_limits_and_rebuild_replaces(self):
+        """Test at most ``top`` neighbours are kept and a rebuild starts over"""
+        build(top=3)
+        build(top=1)
+        self.assertEqual(SimilarHotel.objects.filter(hotel=self.resort).count(), 1)
+        self.assertFalse(SimilarHotel.objects.filter(rank__gt=1).exists())
+
+    def test_endpoint_is_one_query(self):
+        """Test the similar hotels come from a single lookup, hotel details included"""
+        build()
+        url = reverse('hotel-similar', args=[self.resort.id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'Coral Palace')
+        self.assertEqual(response.data[0]['rating'], '4.6')
+        self.assertEqual(self.client.get(reverse('hotel-similar', args=[self.empty.id])).data, [])
+
+    def test_nearest_cosine(self):
+        """Test neighbours are ordered by cosine similarity and orthogonal ones are left out"""
+        vectors = {1: [1.0, 0.0], 2: [2.0, 0.1], 3: [0.0, 1.0], 4: [1.0, 1.0]}
+        result = nearest(vectors, top=2)
+        self.assertEqual([hotel_id for hotel_id, _ in result[1]], [2, 4])
+        self.assertAlmostEqual(result[1][1][1], 0.5 ** 0.5, places=5)
+        self.assertEqual([hotel_id for hotel_id, _ in result[3]], [4, 2])
+
+    def test_command(self):
+        """Test the command reports how many hotels it covered"""
+        out = StringIO()
+        call_command('build_similar_hotels', '--top', '2', stdout=out)
+        self.assertIn('each of 5 hotel(s)', out.getvalue())
+        self.assertEqual(SimilarHotel.objects.filter(hotel=self.resort).count(), 2)
@@ -1,9 +1,16 @@
-from django.test import TestCase
+import importlib
+from unittest import mock
+from django.apps import apps
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.cache.backends.locmem import LocMemCache
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from datetime import date, timedelta
+from api import throttling
 from api.models import Hotel, Room, Reservation
 
 class AuthAPITest(APITestCase):
@@ -122,24 +129,90 @@ class AuthAPITest(APITestCase):
         self.assertEqual(response.data['username'], 'currentuser')
         self.assertEqual(response.data['first_name'], 'Current')
 
+    def test_registration_queries(self):
+        """Test registration checks uniqueness once and inserts the user once"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.register_url, self.valid_user_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user_queries = [q['sql'] for q in ctx.captured_queries if '"auth_user"' in q['sql']]
+        self.assertEqual(len(user_queries), 2)
+        self.assertTrue(user_queries[0].startswith('SELECT'))
+        self.assertTrue(user_queries[1].startswith('INSERT'))
+        self.assertFalse(response.data['is_staff'])
+
+    def test_registration_duplicate_username_and_email(self):
+        """Test both conflicts are reported from the single lookup"""
+        User.objects.create_user(username='newuser', email='other@example.com', password='testpass')
+        User.objects.create_user(username='other', email='newuser@example.com', password='testpass')
+        response = self.client.post(self.register_url, self.valid_user_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already exists', str(response.data['username'][0]))
+        self.assertIn('already exists', str(response.data['email'][0]))
+
+    def test_email_unique_in_database(self):
+        """Test the database rejects duplicate emails that bypass the serializer"""
+        User.objects.create_user(username='first', email='dup@example.com', password='testpass')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='second', email='dup@example.com', password='testpass')
+        # Blank addresses are not unique
+        User.objects.create_user(username='blank1', password='testpass')
+        User.objects.create_user(username='blank2', password='testpass')
+
     def test_get_current_user_unauthenticated(self):
         """Test accessing current user endpoint without token"""
         response = self.client.get(self.me_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+class EmailIndexMigrationTest(TransactionTestCase):
+    # The SQLite schema editor can't run inside the transaction TestCase wraps tests in
+
+    def test_migration_names_duplicate_emails(self):
+        """Test the email index migration explains which addresses need cleaning up first"""
+        email_index = importlib.import_module('api.migrations.0014_user_email_unique')
+        with connection.schema_editor() as schema_editor:
+            email_index.remove_email_unique_index(apps, schema_editor)
+        try:
+            User.objects.create_user(username='first', email='dup@example.com', password='testpass')
+            User.objects.create_user(username='second', email='dup@example.com', password='testpass')
+            with self.assertRaisesMessage(RuntimeError, 'dup@example.com'), connection.schema_editor() as schema_editor:
+                email_index.add_email_unique_index(apps, schema_editor)
+        finally:
+            User.objects.filter(username='second').delete()
+            with connection.schema_editor() as schema_editor:
+                email_index.add_email_unique_index(apps, schema_editor)
+
+class RoomNumberConstraintMigrationTest(TransactionTestCase):
+    def test_migration_names_duplicate_room_numbers(self):
+        """Test the integrity migration names rooms sharing a number before adding its constraint"""
+        integrity = importlib.import_module('api.migrations.0005_integrity_constraints')
+        unique = next(constraint for constraint in Room._meta.constraints if constraint.name == 'api_room_unique_number')
+        hotel = Hotel.objects.create(name='Twin Hotel', description='Test', address='Test', rating=3.0)
+        # SQLite drops a constraint by rebuilding the table from the model's constraints
+        with mock.patch.object(Room._meta, 'constraints', []), connection.schema_editor() as schema_editor:
+            schema_editor.remove_constraint(Room, unique)
+        try:
+            for _ in range(2):
+                Room.objects.create(hotel=hotel, room_number='101', room_type='SINGLE', price_per_night=80.00, capacity=1)
+            with self.assertRaisesMessage(RuntimeError, f'hotel {hotel.id} room 101'), connection.schema_editor() as schema_editor:
+                integrity.check_existing_rows(apps, schema_editor)
+        finally:
+            Room.objects.filter(pk=Room.objects.filter(hotel=hotel).latest('id').pk).delete()
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_constraint(Room, unique)
+
 class HotelAPITest(APITestCase):
-    def setUp(self):
-        self.client = APIClient()
-        self.hotel_list_url = reverse('hotel-list')
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel_list_url = reverse('hotel-list')
         
         # Create test data
-        self.hotel1 = Hotel.objects.create(
+        cls.hotel1 = Hotel.objects.create(
             name="Hotel Alpha",
             description="First test hotel",
             address="Address 1",
             rating=4.2
         )
-        self.hotel2 = Hotel.objects.create(
+        cls.hotel2 = Hotel.objects.create(
             name="Hotel Beta",
             description="Second test hotel",
             address="Address 2",
@@ -147,7 +220,7 @@ class HotelAPITest(APITestCase):
         )
         
         # Create admin user
-        self.admin_user = User.objects.create_user(
+        cls.admin_user = User.objects.create_user(
             username='admin',
             password='adminpass',
             email='admin@example.com',
@@ -155,13 +228,16 @@ class HotelAPITest(APITestCase):
         )
         
         # Create regular user
-        self.regular_user = User.objects.create_user(
+        cls.regular_user = User.objects.create_user(
             username='regular',
             password='regularpass',
             email='regular@example.com',
             is_staff=False
         )
 
+    def setUp(self):
+        self.client = APIClient()
+
     def test_get_hotels_list_unauthenticated(self):
         """Test anyone can view hotel list"""
         response = self.client.get(self.hotel_list_url)
@@ -260,30 +336,29 @@ class HotelAPITest(APITestCase):
         self.assertEqual(self.hotel1.name, 'Updated Hotel Alpha')
 
 class ReservationAPITest(APITestCase):
-    def setUp(self):
-        self.client = APIClient()
-        
+    @classmethod
+    def setUpTestData(cls):
         # Create users
-        self.user1 = User.objects.create_user(
+        cls.user1 = User.objects.create_user(
             username='user1',
             password='pass1',
             email='user1@example.com'
         )
-        self.user2 = User.objects.create_user(
+        cls.user2 = User.objects.create_user(
             username='user2',
             password='pass2',
             email='user2@example.com'
         )
         
         # Create hotel and room
-        self.hotel = Hotel.objects.create(
+        cls.hotel = Hotel.objects.create(
             name='Reservation Hotel',
             description='For reservation tests',
             address='Test Address',
             rating=4.0
         )
-        self.room = Room.objects.create(
-            hotel=self.hotel,
+        cls.room = Room.objects.create(
+            hotel=cls.hotel,
             room_number='301',
             room_type='DOUBLE',
             price_per_night=120.00,
@@ -291,23 +366,26 @@ class ReservationAPITest(APITestCase):
         )
         
         # Create reservations
-        self.tomorrow = date.today() + timedelta(days=1)
-        self.next_week = date.today() + timedelta(days=7)
-        
-        self.reservation1 = Reservation.objects.create(
-            user=self.user1,
-            room=self.room,
-            check_in=self.tomorrow,
-            check_out=self.tomorrow + timedelta(days=2)
+        cls.tomorrow = date.today() + timedelta(days=1)
+        cls.next_week = date.today() + timedelta(days=7)
+        
+        cls.reservation1 = Reservation.objects.create(
+            user=cls.user1,
+            room=cls.room,
+            check_in=cls.tomorrow,
+            check_out=cls.tomorrow + timedelta(days=2)
         )
         
-        self.reservation2 = Reservation.objects.create(
-            user=self.user2,
-            room=self.room,
-            check_in=self.next_week,
-            check_out=self.next_week + timedelta(days=3)
+        cls.reservation2 = Reservation.objects.create(
+            user=cls.user2,
+            room=cls.room,
+            check_in=cls.next_week,
+            check_out=cls.next_week + timedelta(days=3)
         )
 
+    def setUp(self):
+        self.client = APIClient()
+
     def test_create_reservation_authenticated(self):
         """Test authenticated user can create reservation"""
         # Login as user1
@@ -411,4 +489,327 @@ class ReservationAPITest(APITestCase):
         
         response = self.client.post(reverse('reservation-list'), past_data, format='json')
         # This might be valid or invalid based on your business rules
-        self.assertIn(response.status_code, [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
\ No newline at end of file
+        self.assertIn(response.status_code, [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
+class ReservationHistoryAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='traveler',
+            password='travelpass',
+            email='traveler@example.com'
+        )
+        cls.hotel = Hotel.objects.create(
+            name='History Hotel',
+            description='For history tests',
+            address='Test Address',
+            rating=4.0
+        )
+        cls.room = Room.objects.create(
+            hotel=cls.hotel,
+            room_number='404',
+            room_type='SINGLE',
+            price_per_night=90.00,
+            capacity=1
+        )
+        today = date.today()
+        cls.past = Reservation.objects.create(
+            user=cls.user, room=cls.room,
+            check_in=today - timedelta(days=10), check_out=today - timedelta(days=8)
+        )
+        cls.older_past = Reservation.objects.create(
+            user=cls.user, room=cls.room,
+            check_in=today - timedelta(days=30), check_out=today - timedelta(days=28)
+        )
+        cls.current = Reservation.objects.create(
+            user=cls.user, room=cls.room,
+            check_in=today - timedelta(days=1), check_out=today + timedelta(days=1)
+        )
+        cls.upcoming = Reservation.objects.create(
+            user=cls.user, room=cls.room,
+            check_in=today + timedelta(days=5), check_out=today + timedelta(days=7)
+        )
+        cls.url = reverse('reservation-list')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_status_filters(self):
+        """Test upcoming/current/past filters and their ordering"""
+        response = self.client.get(self.url, {'status': 'upcoming'})
+        self.assertEqual([r['id'] for r in response.data], [self.upcoming.id])
+
+        response = self.client.get(self.url, {'status': 'current'})
+        self.assertEqual([r['id'] for r in response.data], [self.current.id])
+
+        response = self.client.get(self.url, {'status': 'past'})
+        self.assertEqual([r['id'] for r in response.data], [self.past.id, self.older_past.id])
+
+    def test_invalid_status(self):
+        """Test unknown status is rejected"""
+        response = self.client.get(self.url, {'status': 'someday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data)
+
+    def test_default_list_is_ordered_and_unpaginated(self):
+        """Test plain list returns every reservation, newest check-in first"""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [r['id'] for r in response.data],
+            [self.upcoming.id, self.current.id, self.past.id, self.older_past.id]
+        )
+
+    def test_includes_room_and_hotel_names(self):
+        """Test reservations carry room number and hotel name"""
+        response = self.client.get(self.url, {'status': 'upcoming'})
+        reservation = response.data[0]
+        self.assertEqual(reservation['room_number'], '404')
+        self.assertEqual(reservation['hotel'], self.hotel.id)
+        self.assertEqual(reservation['hotel_name'], 'History Hotel')
+
+    def test_cursor_pagination(self):
+        """Test page_size switches to cursor pagination and pages chain"""
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['id'] for r in response.data['results']], [self.older_past.id])
+        self.assertIsNone(response.data['next'])
+
+class ThrottleAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='throttled',
+            password='throttlepass',
+            email='throttled@example.com'
+        )
+        cls.other_user = User.objects.create_user(
+            username='unthrottled',
+            password='throttlepass',
+            email='unthrottled@example.com'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_throttled_per_ip(self):
+        """Test token endpoint rejects attempts once the IP bucket is empty"""
+        rates = {'token_ip': '3/min'}
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            for _ in range(3):
+                response = self.client.post(reverse('token_obtain_pair'), {
+                    'username': 'throttled',
+                    'password': 'wrongpass'
+                }, format='json')
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+            response = self.client.post(reverse('token_obtain_pair'), {
+                'username': 'throttled',
+                'password': 'throttlepass'
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn('Retry-After', response)
+
+    def test_reservations_throttled_per_user(self):
+        """Test each user gets their own reservation bucket"""
+        rates = {'reservations_user': '2/min'}
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}):
+            self.client.force_authenticate(user=self.user)
+            for _ in range(2):
+                self.assertEqual(self.client.get(reverse('reservation-list')).status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                self.client.get(reverse('reservation-list')).status_code,
+                status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+            self.client.force_authenticate(user=self.other_user)
+            self.assertEqual(self.client.get(reverse('reservation-list')).status_code, status.HTTP_200_OK)
+
+    def test_unconfigured_scope_is_not_throttled(self):
+        """Test endpoints without a configured rate are never throttled"""
+        self.client.force_authenticate(user=self.user)
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {}}):
+            for _ in range(5):
+                response = self.client.get(reverse('reservation-list'))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_write_failure_falls_back(self):
+        """Test a throttle cache that fails on writes doesn't fail the request"""
+        class ReadOnlyCache(LocMemCache):
+            def set(self, *args, **kwargs):
+                raise ConnectionError('cache is down')
+
+        self.addCleanup(throttling._local_cache.clear)
+        rates = {'reservations_user': '2/min'}
+        self.client.force_authenticate(user=self.user)
+        with self.settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': rates}), \
+                mock.patch('api.throttling.get_throttle_cache', return_value=ReadOnlyCache('read-only', {})):
+            self.assertEqual(self.client.get(reverse('reservation-list')).status_code, status.HTTP_200_OK)
+        self.assertTrue(throttling._local_cache.get(f'throttle_reservations_user_{self.user.pk}'))
+
+class ItineraryAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='family',
+            password='familypass',
+            email='family@example.com'
+        )
+        cls.hotel = Hotel.objects.create(
+            name='Family Hotel',
+            description='Adjoining rooms',
+            address='Test Address',
+            rating=4.0
+        )
+        cls.room1 = Room.objects.create(
+            hotel=cls.hotel, room_number='601', room_type='DOUBLE',
+            price_per_night=150.00, capacity=2
+        )
+        cls.room2 = Room.objects.create(
+            hotel=cls.hotel, room_number='602', room_type='DOUBLE',
+            price_per_night=150.00, capacity=2
+        )
+        cls.day = date.today() + timedelta(days=20)
+        cls.url = reverse('itinerary-list')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def segment(self, room, start, nights):
+        return {
+            'room': room.id,
+            'check_in': (self.day + timedelta(days=start)).isoformat(),
+            'check_out': (self.day + timedelta(days=start + nights)).isoformat(),
+        }
+
+    def test_book_itinerary(self):
+        """Test all segments of an itinerary are booked together"""
+        data = {'reservations': [self.segment(self.room1, 0, 3), self.segment(self.room2, 3, 3)]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['reservations']), 2)
+        self.assertEqual(Reservation.objects.filter(itinerary_id=response.data['id'], user=self.user).count(), 2)
+
+    def test_itinerary_is_all_or_nothing(self):
+        """Test one unavailable segment books nothing"""
+        Reservation.objects.create(
+            user=self.user, room=self.room2,
+            check_in=self.day + timedelta(days=4), check_out=self.day + timedelta(days=5)
+        )
+        data = {'reservations': [self.segment(self.room1, 0, 3), self.segment(self.room2, 3, 3)]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Segment 2', str(response.data))
+        self.assertFalse(Reservation.objects.filter(room=self.room1).exists())
+
+    def test_itinerary_segments_must_not_overlap(self):
+        """Test segments cannot double book the same room"""
+        data = {'reservations': [self.segment(self.room1, 0, 3), self.segment(self.room1, 2, 2)]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_segments_need_a_room(self):
+        """Test a segment without a room is rejected, not a server error"""
+        missing = self.segment(self.room1, 0, 3)
+        del missing['room']
+        for segment in (missing, {**missing, 'room': None}):
+            response = self.client.post(self.url, {'reservations': [segment]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('room', response.data['reservations'][0])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_cancel_itinerary(self):
+        """Test deleting an itinerary cancels all its reservations"""
+        data = {'reservations': [self.segment(self.room1, 0, 3), self.segment(self.room2, 0, 3)]}
+        itinerary_id = self.client.post(self.url, data, format='json').data['id']
+
+        response = self.client.get(self.url)
+        self.assertEqual([i['id'] for i in response.data], [itinerary_id])
+
+        response = self.client.delete(reverse('itinerary-detail', args=[itinerary_id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Reservation.objects.exists())
+
+class OptimisticConcurrencyAPITest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(username='admin', password='adminpass', is_staff=True)
+        cls.hotel = Hotel.objects.create(name='Versioned Hotel', description='Test', address='Test', rating=4.0)
+        cls.room = Room.objects.create(hotel=cls.hotel, room_number='101', room_type='SINGLE', price_per_night=80.00, capacity=1)
+        cls.url = reverse('hotel-detail', args=[cls.hotel.id])
+        cls.data = {'name': 'Renamed', 'description': 'Test', 'address': 'Test', 'rating': 4.0}
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin_user)
+
+    def tag(self):
+        """The current ETag and the version it carries"""
+        response = self.client.get(self.url)
+        return response['ETag'], response.data['version']
+
+    def test_detail_sends_etag(self):
+        """Test detail responses carry the version, and a digest of tonight's prices, as ETag"""
+        self.hotel.refresh_from_db()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['version'], self.hotel.version)
+        self.assertRegex(response['ETag'], rf'^"{self.hotel.version}-[0-9a-f]{{12}}"$')
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching If-None-Match skips the body"""
+        tag, _ = self.tag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], tag)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"7-0"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_nested_changes_invalidate_etag(self):
+        """Test adding a room, or a booking that moves tonight's price, changes the ETag"""
+        guest = User.objects.create_user(username='guest', password='guestpass')
+        tags = [self.tag()[0]]
+        Room.objects.create(hotel=self.hotel, room_number='102', room_type='SINGLE', price_per_night=90.00, capacity=1)
+        tags.append(self.tag()[0])
+        with self.settings(PRICING_CURVES={'default': ((0.5, '2.00'),)}), \
+                self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(user=guest, room=self.room, check_in=date.today(),
+                                       check_out=date.today() + timedelta(days=1))
+        with self.settings(PRICING_CURVES={'default': ((0.5, '2.00'),)}):
+            tags.append(self.tag()[0])
+        self.assertEqual(len(set(tags)), 3, tags)
+        for tag in tags[:-1]:
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=tag).status_code, status.HTTP_200_OK)
+
+    def test_update_with_current_version(self):
+        """Test an update with the current ETag succeeds and bumps the version"""
+        tag, version = self.tag()
+        response = self.client.put(self.url, self.data, HTTP_IF_MATCH=tag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith(f'"{version + 1}-'))
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.name, self.hotel.version), ('Renamed', version + 1))
+
+    def test_stale_update_is_rejected(self):
+        """Test an update based on an old version gets 412 and changes nothing"""
+        tag, version = self.tag()
+        self.client.put(self.url, self.data, HTTP_IF_MATCH=tag)
+        response = self.client.put(self.url, dict(self.data, name='Stale'), HTTP_IF_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.hotel.refresh_from_db()
+        self.assertEqual((self.hotel.name, self.hotel.version), ('Renamed', version + 1))
+
+    def test_update_without_if_match(self):
+        """Test plain updates still work and bump the version"""
+        response = self.client.patch(reverse('room-detail', args=[self.room.id]), {'capacity': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+
+    def test_version_is_read_only(self):
+        """Test clients cannot set the version themselves"""
+        tag, version = self.tag()
+        response = self.client.put(self.url, dict(self.data, version=99), HTTP_IF_MATCH=tag)
+        self.assertEqual(response.data['version'], version + 1)
@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+from datetime import date, timedelta
+from api.models import Hotel, Room, Reservation, WaitlistEntry
+from api.waitlist import freed_ranges, offer_freed_nights
+
+class WaitlistTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.booker = User.objects.create_user(
+            username='booker',
+            password='bookerpass',
+            email='booker@example.com'
+        )
+        self.first = User.objects.create_user(
+            username='first',
+            password='firstpass',
+            email='first@example.com'
+        )
+        self.second = User.objects.create_user(
+            username='second',
+            password='secondpass',
+            email='second@example.com'
+        )
+        self.hotel = Hotel.objects.create(
+            name='Busy Hotel',
+            description='Always full',
+            address='Test Address',
+            rating=4.0
+        )
+        self.room = Room.objects.create(
+            hotel=self.hotel,
+            room_number='501',
+            room_type='DOUBLE',
+            price_per_night=150.00,
+            capacity=2
+        )
+        self.day = date.today() + timedelta(days=10)
+        self.reservation = Reservation.objects.create(
+            user=self.booker,
+            room=self.room,
+            check_in=self.day,
+            check_out=self.day + timedelta(days=4)
+        )
+
+    def join(self, user, **data):
+        self.client.force_authenticate(user=user)
+        data.setdefault('check_in', self.day.isoformat())
+        data.setdefault('check_out', (self.day + timedelta(days=2)).isoformat())
+        return self.client.post(reverse('waitlist-list'), data, format='json')
+
+    def test_join_waitlist_for_room(self):
+        """Test joining the waitlist for a booked room fills in the hotel"""
+        response = self.join(self.first, room=self.room.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['hotel'], self.hotel.id)
+        self.assertEqual(response.data['status'], 'WAITING')
+
+    def test_join_waitlist_requires_room_or_hotel(self):
+        """Test waitlist entry without room or hotel is rejected"""
+        response = self.join(self.first)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_join_waitlist_stay_too_long(self):
+        """Test waitlisted stays are capped"""
+        response = self.join(
+            self.first, hotel=self.hotel.id,
+            check_out=(self.day + timedelta(days=60)).isoformat()
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancellation_offers_in_fifo_order(self):
+        """Test cancelling offers the nights to the earliest matching entry"""
+        self.join(self.first, room=self.room.id)
+        self.join(self.second, hotel=self.hotel.id)
+
+        self.client.force_authenticate(user=self.booker)
+        response = self.client.delete(reverse('reservation-detail', args=[self.reservation.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        first_entry = WaitlistEntry.objects.get(user=self.first)
+        second_entry = WaitlistEntry.objects.get(user=self.second)
+        self.assertEqual(first_entry.status, 'OFFERED')
+        self.assertEqual(first_entry.offered_room, self.room)
+        # Same nights, so the later entry keeps waiting
+        self.assertEqual(second_entry.status, 'WAITING')
+
+    def test_shortened_stay_offers_freed_nights(self):
+        """Test shortening a reservation only offers the nights given up"""
+        self.join(
+            self.first, room=self.room.id,
+            check_in=(self.day + timedelta(days=3)).isoformat(),
+            check_out=(self.day + timedelta(days=4)).isoformat()
+        )
+        self.join(self.second, room=self.room.id)
+
+        self.client.force_authenticate(user=self.booker)
+        response = self.client.patch(
+            reverse('reservation-detail', args=[self.reservation.id]),
+            {'check_out': (self.day + timedelta(days=3)).isoformat()},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(WaitlistEntry.objects.get(user=self.first).status, 'OFFERED')
+        self.assertEqual(WaitlistEntry.objects.get(user=self.second).status, 'WAITING')
+
+    def test_entry_still_blocked_is_skipped(self):
+        """Test entries whose stay is still partly booked are not offered"""
+        Reservation.objects.create(
+            user=self.booker,
+            room=self.room,
+            check_in=self.day + timedelta(days=4),
+            check_out=self.day + timedelta(days=6)
+        )
+        entry = WaitlistEntry.objects.create(
+            user=self.first, hotel=self.hotel, room=self.room,
+            check_in=self.day + timedelta(days=2), check_out=self.day + timedelta(days=5)
+        )
+        self.reservation.delete()
+        self.assertEqual(offer_freed_nights(self.room, self.day, self.day + timedelta(days=4)), [])
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'WAITING')
+
+    def test_freed_ranges(self):
+        """Test freed ranges for moved, shortened and extended stays"""
+        d = self.day
+        self.assertEqual(freed_ranges(1, d, d + timedelta(days=4), 2, d, d + timedelta(days=4)),
+                         [(d, d + timedelta(days=4))])
+        self.assertEqual(freed_ranges(1, d, d + timedelta(days=4), 1, d + timedelta(days=1), d + timedelta(days=3)),
+                         [(d, d + timedelta(days=1)), (d + timedelta(days=3), d + timedelta(days=4))])
+        self.assertEqual(freed_ranges(1, d, d + timedelta(days=4), 1, d, d + timedelta(days=6)), [])
@@ -60,7 +60,7 @@ export default function AdminDashboard() {
         e.preventDefault();
         try {
             if (editingHotel) {
-                await updateHotel(editingHotel.id, hotelForm);
+                await updateHotel(editingHotel.id, hotelForm, editingHotel.version);
             } else {
                 await createHotel(hotelForm);
             }
@@ -69,6 +69,11 @@ export default function AdminDashboard() {
             setEditingHotel(null);
             loadHotels();
         } catch (err) {
+            if (err.response?.status === 412) {
+                alert(err.response.data.detail);
+                loadHotels();
+                return;
+            }
             alert('Error: ' + (err.response?.data?.detail || 'Operation failed. Make sure you have admin permissions.'));
         }
     };
@@ -100,7 +105,7 @@ export default function AdminDashboard() {
         e.preventDefault();
         try {
             if (editingRoom) {
-                await updateRoom(editingRoom.id, roomForm);
+                await updateRoom(editingRoom.id, roomForm, editingRoom.version);
             } else {
                 await createRoom(roomForm);
             }
@@ -109,6 +114,11 @@ export default function AdminDashboard() {
             setEditingRoom(null);
             loadHotels();
         } catch (err) {
+            if (err.response?.status === 412) {
+                alert(err.response.data.detail);
+                loadHotels();
+                return;
+            }
             alert('Error: ' + (err.response?.data?.detail || 'Operation failed. Make sure you have admin permissions.'));
         }
     };
@@ -1,12 +1,13 @@
 import React, { useEffect, useState, useContext } from 'react';
-import { useParams, useNavigate } from 'react-router-dom';
-import { getHotel, createReservation } from '../services/api';
+import { Link, useParams, useNavigate } from 'react-router-dom';
+import { getHotel, getSimilarHotels, createReservation, availabilityStreamUrl, mediaUrl } from '../services/api';
 import { AuthContext } from '../context/AuthContext';
 
 export default function HotelDetail() {
     const { id } = useParams();
     const [hotel, setHotel] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [similar, setSimilar] = useState([]);
     const { user } = useContext(AuthContext);
     const navigate = useNavigate();
 
@@ -16,11 +17,36 @@ export default function HotelDetail() {
         check_out: ''
     });
 
+    // Bookings made by others while this page is open, keyed by reservation id
+    const [liveBookings, setLiveBookings] = useState({});
+
     useEffect(() => {
         getHotel(id).then(res => {
             setHotel(res.data);
             setLoading(false);
         });
+        // Precomputed on the server; the page works without them
+        getSimilarHotels(id).then(res => setSimilar(res.data)).catch(() => setSimilar([]));
+    }, [id]);
+
+    // Only ASGI servers keep the stream open; WSGI ones answer 204 and
+    // EventSource then stops without reconnecting
+    useEffect(() => {
+        if (typeof EventSource === 'undefined') return undefined;
+        const source = new EventSource(availabilityStreamUrl(id));
+        source.addEventListener('availability', (e) => {
+            const change = JSON.parse(e.data);
+            setLiveBookings(prev => {
+                const next = { ...prev };
+                if (change.action === 'DELETE') {
+                    delete next[change.reservation];
+                } else {
+                    next[change.reservation] = change;
+                }
+                return next;
+            });
+        });
+        return () => source.close();
     }, [id]);
 
     const handleBook = async (e) => {
@@ -64,12 +90,17 @@ export default function HotelDetail() {
                         <div style={{ padding: '1.5rem', background: 'var(--bg-color)', borderBottom: '1px solid var(--border-color)' }}>
                             <h4 style={{ fontSize: '1.25rem', marginBottom: '0.5rem' }}>{room.room_type} Room</h4>
                             <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
-                                <span style={{ fontWeight: '700', color: 'var(--primary-color)', fontSize: '1.2rem' }}>${room.price_per_night} <span style={{ fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: 'normal' }}>/ night</span></span>
+                                <span style={{ fontWeight: '700', color: 'var(--primary-color)', fontSize: '1.2rem' }}>${room.current_price ?? room.price_per_night} <span style={{ fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: 'normal' }}>/ night</span></span>
                                 <span style={{ fontSize: '0.9rem', color: 'var(--text-secondary)' }}>👥 {room.capacity} Guests</span>
                             </div>
                         </div>
 
                         <div style={{ padding: '1.5rem' }}>
+                            {Object.values(liveBookings).filter(b => b.room === room.id).map(b => (
+                                <p key={b.reservation} style={{ fontSize: '0.85rem', color: 'var(--text-secondary)', marginBottom: '0.5rem' }}>
+                                    Just booked: {b.check_in} → {b.check_out}
+                                </p>
+                            ))}
                             <form onSubmit={handleBook} className="booking-form">
                                 <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '10px' }}>
                                     <div>
@@ -99,6 +130,24 @@ export default function HotelDetail() {
                     </div>
                 ))}
             </div>
+
+            {similar.length > 0 && (
+                <>
+                    <h3 style={{ fontSize: '1.8rem', margin: '3rem 0 1.5rem' }}>Similar Hotels</h3>
+                    <div style={{ display: 'flex', gap: '1rem', overflowX: 'auto', paddingBottom: '1rem' }}>
+                        {similar.map(other => (
+                            <Link key={other.id} to={`/hotels/${other.id}`} className="hotel-card" style={{ minWidth: '220px', textDecoration: 'none', color: 'inherit' }}>
+                                <img src={mediaUrl(other.photo_url) || other.image || 'https://images.unsplash.com/photo-1566073771259-6a8506099945?ixlib=rb-4.0.3'} alt={other.name} style={{ width: '100%', height: '120px', objectFit: 'cover' }} />
+                                <div style={{ padding: '1rem' }}>
+                                    <h4 style={{ marginBottom: '0.25rem' }}>{other.name}</h4>
+                                    <div className="rating">★ {other.rating}</div>
+                                    <p style={{ fontSize: '0.85rem', color: 'var(--text-secondary)' }}>📍 {other.address}</p>
+                                </div>
+                            </Link>
+                        ))}
+                    </div>
+                </>
+            )}
         </div>
     );
 }
@@ -1,6 +1,8 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { getHotels } from '../services/api';
+import { getHotels, mediaUrl } from '../services/api';
+
+const mediaSrcSet = (srcset) => srcset && srcset.split(', ').map(mediaUrl).join(', ');
 
 export default function HotelList() {
     const [hotels, setHotels] = useState([]);
@@ -49,7 +51,14 @@ export default function HotelList() {
                         <div className="rating-badge">
                             <span>★</span> {hotel.rating}
                         </div>
-                        <img src={hotel.image || 'https://images.unsplash.com/photo-1566073771259-6a8506099945?ixlib=rb-4.0.3'} alt={hotel.name} className="hotel-img" />
+                        <img
+                            src={mediaUrl(hotel.photo_url) || hotel.image || 'https://images.unsplash.com/photo-1566073771259-6a8506099945?ixlib=rb-4.0.3'}
+                            srcSet={mediaSrcSet(hotel.photo_srcset) || undefined}
+                            sizes="(max-width: 640px) 100vw, 400px"
+                            loading="lazy"
+                            alt={hotel.name}
+                            className="hotel-img"
+                        />
                         <div className="hotel-info">
                             <h3>{hotel.name}</h3>
                             <p className="hotel-description">{hotel.description}</p>
@@ -1,19 +1,86 @@
 import React, { useEffect, useState } from 'react';
-import { getReservations } from '../services/api';
+import { getArchivedReservations, getReservations } from '../services/api';
+
+// Past stays are fetched a page at a time; a long history is never loaded whole
+const PAST_PAGE_SIZE = 10;
+
+const nextCursor = (next) => (next ? new URL(next).searchParams.get('cursor') : null);
+
+// Past stays run on into archived ones (moved out of the live table by the
+// backend) once the live pages run out. Resolves to the stays of one page
+// and where the next one starts, or null when there is nothing older.
+const fetchOlder = ({ source, cursor }) => {
+    const params = { page_size: PAST_PAGE_SIZE, ...(cursor && { cursor }) };
+    const request = source === 'past'
+        ? getReservations({ status: 'past', ...params })
+        : getArchivedReservations(params);
+    return request.then((res) => {
+        const next = nextCursor(res.data.next);
+        if (next || source === 'archived') {
+            return { results: res.data.results, older: next && { source, cursor: next } };
+        }
+        return fetchOlder({ source: 'archived', cursor: null })
+            .then(rest => ({ results: [...res.data.results, ...rest.results], older: rest.older }));
+    });
+};
 
 export default function Profile() {
-    const [reservations, setReservations] = useState([]);
+    const [upcoming, setUpcoming] = useState([]);
+    const [past, setPast] = useState([]);
+    const [older, setOlder] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const addPastPage = (page) => {
+        setPast(previous => [...previous, ...page.results]);
+        setOlder(page.older);
+    };
 
     useEffect(() => {
-        getReservations()
-            .then(res => {
-                setReservations(res.data);
+        Promise.all([
+            getReservations({ status: 'current' }),
+            getReservations({ status: 'upcoming' }),
+            fetchOlder({ source: 'past', cursor: null }),
+        ])
+            .then(([current, future, history]) => {
+                setUpcoming([...current.data, ...future.data]);
+                addPastPage(history);
                 setLoading(false);
             })
             .catch(() => setLoading(false));
     }, []);
 
+    const loadOlder = () => {
+        setLoadingMore(true);
+        fetchOlder(older)
+            .then(addPastPage)
+            .catch(() => { })
+            .finally(() => setLoadingMore(false));
+    };
+
+    const renderCard = (res) => (
+        <div key={res.id} className="reservation-card" style={{ borderLeft: '4px solid var(--primary-color)' }}>
+            <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '1rem' }}>
+                <span style={{ fontWeight: '700', color: 'var(--primary-color)' }}>#{res.id}</span>
+                <span style={{ fontSize: '0.85rem', color: 'var(--text-secondary)' }}>{new Date(res.created_at).toLocaleDateString()}</span>
+            </div>
+            <h4 style={{ margin: '0 0 1rem 0' }}>{res.hotel_name || 'Room Booking'}</h4>
+            <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '10px', fontSize: '0.95rem' }}>
+                <div>
+                    <span style={{ display: 'block', fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: '600' }}>CHECK-IN</span>
+                    {res.check_in}
+                </div>
+                <div>
+                    <span style={{ display: 'block', fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: '600' }}>CHECK-OUT</span>
+                    {res.check_out}
+                </div>
+            </div>
+            <div style={{ marginTop: '1.5rem', paddingTop: '1rem', borderTop: '1px solid var(--border-color)' }}>
+                <span style={{ fontSize: '0.9rem' }}>Room ID: {res.room}</span>
+            </div>
+        </div>
+    );
+
     if (loading) return <div className="container" style={{ textAlign: 'center', marginTop: '4rem' }}>Loading...</div>;
 
     return (
@@ -44,35 +111,32 @@ export default function Profile() {
                     Manage and track all your upcoming stays
                 </p>
             </div>
-            {reservations.length === 0 ? (
+            {upcoming.length === 0 && past.length === 0 ? (
                 <div style={{ textAlign: 'center', padding: '4rem', background: 'white', borderRadius: '1rem', boxShadow: 'var(--shadow-sm)' }}>
                     <p style={{ fontSize: '1.2rem', color: 'var(--text-secondary)' }}>You haven't made any reservations yet.</p>
                 </div>
             ) : (
-                <div className="hotel-grid">
-                    {reservations.map(res => (
-                        <div key={res.id} className="reservation-card" style={{ borderLeft: '4px solid var(--primary-color)' }}>
-                            <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '1rem' }}>
-                                <span style={{ fontWeight: '700', color: 'var(--primary-color)' }}>#{res.id}</span>
-                                <span style={{ fontSize: '0.85rem', color: 'var(--text-secondary)' }}>{new Date(res.created_at).toLocaleDateString()}</span>
-                            </div>
-                            <h4 style={{ margin: '0 0 1rem 0' }}>Room Booking</h4>
-                            <div style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '10px', fontSize: '0.95rem' }}>
-                                <div>
-                                    <span style={{ display: 'block', fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: '600' }}>CHECK-IN</span>
-                                    {res.check_in}
-                                </div>
-                                <div>
-                                    <span style={{ display: 'block', fontSize: '0.8rem', color: 'var(--text-secondary)', fontWeight: '600' }}>CHECK-OUT</span>
-                                    {res.check_out}
+                <>
+                    {upcoming.length > 0 && (
+                        <>
+                            <h3>Upcoming Stays</h3>
+                            <div className="hotel-grid">{upcoming.map(renderCard)}</div>
+                        </>
+                    )}
+                    {past.length > 0 && (
+                        <>
+                            <h3 style={{ marginTop: '2.5rem' }}>Past Stays</h3>
+                            <div className="hotel-grid">{past.map(renderCard)}</div>
+                            {older && (
+                                <div style={{ textAlign: 'center', marginTop: '2rem' }}>
+                                    <button className="btn-secondary" onClick={loadOlder} disabled={loadingMore}>
+                                        {loadingMore ? 'Loading older stays...' : 'Show older stays'}
+                                    </button>
                                 </div>
-                            </div>
-                            <div style={{ marginTop: '1.5rem', paddingTop: '1rem', borderTop: '1px solid var(--border-color)' }}>
-                                <span style={{ fontSize: '0.9rem' }}>Room ID: {res.room}</span>
-                            </div>
-                        </div>
-                    ))}
-                </div>
+                            )}
+                        </>
+                    )}
+                </>
             )}
         </div>
     );
@@ -16,25 +16,38 @@ api.interceptors.request.use(
 );
 
 export default api;
+
+// Uploaded photos are served by the backend (or a CDN when MEDIA_URL is absolute)
+const BACKEND_ORIGIN = new URL(api.defaults.baseURL, window.location.href).origin;
+export const mediaUrl = (url) => (url && url.startsWith('/') ? BACKEND_ORIGIN + url : url);
+
 export const register = (data) => api.post('register/', data);
 export const login = (data) => api.post('token/', data);
 export const refreshToken = (refresh) => api.post('token/refresh/', { refresh });
 export const getCurrentUser = () => api.get('me/');
 
 // Hotels
-export const getHotels = () => api.get('hotels/');
+export const getHotels = (params) => api.get('hotels/', { params });
 export const getHotel = (id) => api.get(`hotels/${id}/`);
+export const getSimilarHotels = (id) => api.get(`hotels/${id}/similar/`);
+// Server-sent events; open with new EventSource(url)
+export const availabilityStreamUrl = (id) => `${api.defaults.baseURL}hotels/${id}/availability/stream/`;
 export const createHotel = (data) => api.post('hotels/', data);
-export const updateHotel = (id, data) => api.put(`hotels/${id}/`, data);
+// Pass the version the form was loaded with to get a 412 instead of
+// overwriting someone else's changes
+const ifMatch = (version) => (version ? { headers: { 'If-Match': `"${version}"` } } : undefined);
+
+export const updateHotel = (id, data, version) => api.put(`hotels/${id}/`, data, ifMatch(version));
 export const deleteHotel = (id) => api.delete(`hotels/${id}/`);
 
 // Rooms
 export const getRooms = () => api.get('rooms/');
 export const createRoom = (data) => api.post('rooms/', data);
-export const updateRoom = (id, data) => api.put(`rooms/${id}/`, data);
+export const updateRoom = (id, data, version) => api.put(`rooms/${id}/`, data, ifMatch(version));
 export const deleteRoom = (id) => api.delete(`rooms/${id}/`);
 
 // Reservations
 export const createReservation = (data) => api.post('reservations/', data);
-export const getReservations = () => api.get('reservations/');
+export const getReservations = (params) => api.get('reservations/', { params });
+export const getArchivedReservations = (params) => api.get('reservations/archived/', { params });
 
@@ -6,10 +6,13 @@ import * as api from '../services/api';
 import { AuthContext } from '../context/AuthContext';
 
 // Mock dependencies
-vi.mock('../services/api', () => ({
+vi.mock('../services/api', async () => ({
+    mediaUrl: (await vi.importActual('../services/api')).mediaUrl,
     getHotel: vi.fn(),
+    getSimilarHotels: vi.fn(),
     createReservation: vi.fn(),
     getRoomAvailability: vi.fn(),
+    availabilityStreamUrl: vi.fn(),
 }));
 
 const mockNavigate = vi.fn();
@@ -52,6 +55,7 @@ describe('HotelDetail Component', () => {
     beforeEach(() => {
         vi.clearAllMocks();
         api.getHotel.mockResolvedValue({ data: mockHotel });
+        api.getSimilarHotels.mockResolvedValue({ data: [] });
         api.getRoomAvailability.mockResolvedValue({ data: [] });
     });
 
@@ -80,6 +84,25 @@ describe('HotelDetail Component', () => {
         expect(screen.getByText('$250')).toBeInTheDocument();
     });
 
+    it('renders similar hotels', async () => {
+        api.getSimilarHotels.mockResolvedValue({
+            data: [{ id: 2, name: 'Ocean View', address: '9 Shore St', rating: '4.5', image: null, photo_url: null, score: 0.9 }],
+        });
+        renderWithAuth();
+
+        expect(await screen.findByText('Similar Hotels')).toBeInTheDocument();
+        expect(screen.getByText('Ocean View').closest('a')).toHaveAttribute('href', '/hotels/2');
+    });
+
+    it('loads similar hotels\' uploaded photos from the backend', async () => {
+        api.getSimilarHotels.mockResolvedValue({
+            data: [{ id: 2, name: 'Ocean View', address: '9 Shore St', rating: '4.5', image: null, photo_url: '/media/hotels/2.webp', score: 0.9 }],
+        });
+        renderWithAuth();
+
+        expect(await screen.findByAltText('Ocean View')).toHaveAttribute('src', 'http://localhost:8000/media/hotels/2.webp');
+    });
+
     it('redirects to login if unauthenticated user tries to book', async () => {
         renderWithAuth(null); // No user
 
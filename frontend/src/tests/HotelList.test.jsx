@@ -5,7 +5,8 @@ import HotelList from '../pages/HotelList';
 import { getHotels } from '../services/api';
 
 // Mock API module
-vi.mock('../services/api', () => ({
+vi.mock('../services/api', async () => ({
+    mediaUrl: (await vi.importActual('../services/api')).mediaUrl,
     getHotels: vi.fn(),
 }));
 
@@ -1,11 +1,12 @@
-import { render, screen, waitForElementToBeRemoved, waitFor } from '@testing-library/react';
+import { render, screen, waitForElementToBeRemoved, waitFor, fireEvent } from '@testing-library/react';
 import { describe, it, expect, vi, beforeEach } from 'vitest';
 import Profile from './Profile';
 import * as api from '../services/api';
 
-// Mock getReservations API
+// Mock the reservation APIs
 vi.mock('../services/api', () => ({
     getReservations: vi.fn(),
+    getArchivedReservations: vi.fn(),
 }));
 
 const mockReservations = [
@@ -25,6 +26,16 @@ const mockReservations = [
     }
 ];
 
+// Answer each status like the API: current and upcoming as plain lists, past and archived in pages
+const mockByStatus = ({ current = [], upcoming = [], past = [], next = null, archived = [], archivedNext = null } = {}) => {
+    api.getReservations.mockImplementation(({ status }) => Promise.resolve({
+        data: status === 'past' ? { results: past, next, previous: null } : { current, upcoming }[status],
+    }));
+    api.getArchivedReservations.mockImplementation(() => Promise.resolve({
+        data: { results: archived, next: archivedNext, previous: null },
+    }));
+};
+
 describe('Profile Component', () => {
     beforeEach(() => {
         vi.clearAllMocks();
@@ -39,7 +50,7 @@ describe('Profile Component', () => {
     });
 
     it('renders empty state when no reservations found', async () => {
-        api.getReservations.mockResolvedValue({ data: [] });
+        mockByStatus();
 
         render(<Profile />);
 
@@ -50,7 +61,7 @@ describe('Profile Component', () => {
     });
 
     it('renders list of reservations', async () => {
-        api.getReservations.mockResolvedValue({ data: mockReservations });
+        mockByStatus({ upcoming: [mockReservations[1]], past: [mockReservations[0]] });
 
         render(<Profile />);
 
@@ -69,6 +80,63 @@ describe('Profile Component', () => {
         expect(screen.getByText('Room ID: 102')).toBeInTheDocument();
     });
 
+    it('requests upcoming stays and one page of past stays', async () => {
+        mockByStatus();
+
+        render(<Profile />);
+
+        await waitForElementToBeRemoved(() => screen.queryByText('Loading...'));
+
+        expect(api.getReservations).toHaveBeenCalledWith({ status: 'upcoming' });
+        expect(api.getReservations).toHaveBeenCalledWith({ status: 'past', page_size: 10 });
+        expect(api.getReservations).not.toHaveBeenCalledWith(undefined);
+        // The live history fit in one page, so archived stays follow right away
+        expect(api.getArchivedReservations).toHaveBeenCalledWith({ page_size: 10 });
+    });
+
+    it('loads older past stays with the next cursor', async () => {
+        mockByStatus({ past: [mockReservations[1]], next: 'http://localhost:8000/api/reservations/?cursor=abc&page_size=10&status=past' });
+
+        render(<Profile />);
+
+        await waitForElementToBeRemoved(() => screen.queryByText('Loading...'));
+
+        mockByStatus({ past: [mockReservations[0]] });
+        fireEvent.click(screen.getByText('Show older stays'));
+
+        await waitFor(() => expect(screen.getByText('#1')).toBeInTheDocument());
+        expect(api.getReservations).toHaveBeenLastCalledWith({ status: 'past', page_size: 10, cursor: 'abc' });
+        expect(screen.getByText('#2')).toBeInTheDocument();
+        expect(screen.queryByText('Show older stays')).not.toBeInTheDocument();
+    });
+
+    it('continues into archived stays when the past pages run out', async () => {
+        const archivedStay = { ...mockReservations[0], id: 3, room: 103 };
+        mockByStatus({ past: [mockReservations[1]], next: 'http://localhost:8000/api/reservations/?cursor=abc&page_size=10&status=past' });
+
+        render(<Profile />);
+
+        await waitForElementToBeRemoved(() => screen.queryByText('Loading...'));
+        expect(api.getArchivedReservations).not.toHaveBeenCalled();
+
+        mockByStatus({
+            past: [mockReservations[0]], archived: [archivedStay],
+            archivedNext: 'http://localhost:8000/api/reservations/archived/?cursor=def&page_size=10',
+        });
+        fireEvent.click(screen.getByText('Show older stays'));
+
+        await waitFor(() => expect(screen.getByText('#3')).toBeInTheDocument());
+        expect(screen.getByText('#1')).toBeInTheDocument();
+        expect(api.getArchivedReservations).toHaveBeenLastCalledWith({ page_size: 10 });
+
+        mockByStatus({ archived: [{ ...archivedStay, id: 4 }] });
+        fireEvent.click(screen.getByText('Show older stays'));
+
+        await waitFor(() => expect(screen.getByText('#4')).toBeInTheDocument());
+        expect(api.getArchivedReservations).toHaveBeenLastCalledWith({ page_size: 10, cursor: 'def' });
+        expect(screen.queryByText('Show older stays')).not.toBeInTheDocument();
+    });
+
     it('handles API error gracefully', async () => {
         api.getReservations.mockRejectedValue(new Error('API Error'));
 